@@ -0,0 +1,55 @@
+from typing import Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy import Row
+
+SERIES_COLUMNS = ('vwap', 'rolling_mean', 'change', 'change_pct')
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Скользящее среднее; первые window - 1 точек и окна с NaN - NaN."""
+    result = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        result[window - 1 :] = sliding_window_view(values, window).mean(axis=1)
+    return result
+
+
+def to_json_list(values: np.ndarray) -> list:
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def price_series(rows: Sequence[Row], window: int) -> dict[str, list]:
+    """Ценовой ряд по строкам (date, volume, total), отсортированным по дате.
+
+    VWAP за день - total / volume, изменение - разность с предыдущим
+    торговым днём, в процентах - относительно предыдущего VWAP.
+    """
+    if not rows:
+        return {
+            'date': [],
+            'volume': [],
+            'total': [],
+            **{name: [] for name in SERIES_COLUMNS},
+        }
+    dates, volume, total = zip(*rows)
+    volume = np.array(volume, dtype=np.float64)
+    total = np.array(total, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = np.where(volume > 0, total / volume, np.nan)
+        change = np.full(vwap.shape, np.nan)
+        change[1:] = np.diff(vwap)
+        change_pct = np.full(vwap.shape, np.nan)
+        change_pct[1:] = change[1:] / vwap[:-1] * 100
+    series = dict(
+        vwap=vwap,
+        rolling_mean=rolling_mean(vwap, window),
+        change=change,
+        change_pct=change_pct,
+    )
+    return {
+        'date': list(dates),
+        'volume': volume.astype(np.int64).tolist(),
+        'total': total.astype(np.int64).tolist(),
+        **{name: to_json_list(values) for name, values in series.items()},
+    }
@@ -1,20 +1,81 @@
 from datetime import date
+from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, Query
-from fastapi_cache.decorator import cache
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.analytics import price_series
+from app.batch import run_batch
+from app.cache import (
+    INVALIDATE_DATE_RANGE,
+    cache_stats,
+    cached,
+    cached_endpoints,
+    json_response,
+)
+from app.chunks import day_chunks
 from app.config import settings
-from app.crud import get_trading_dates, read_trading_results_from_db
-from app.db import get_async_session
+from app.crud import (
+    get_trading_dates,
+    read_aggregates,
+    read_price_rows,
+    read_trading_results_page,
+    stream_trading_results,
+)
+from app.db import (
+    engine,
+    get_async_session,
+    get_primary_session,
+    replica_router,
+)
+from app.export import FILENAME, MEDIA_TYPES, encode_stream
+from app.ingest import PARSERS, IngestError, ingest, read_lines
+from app.invalidation import (
+    closed_range_expire,
+    data_version_token,
+    data_watcher,
+)
+from app.pool import pool_stats
+from app.push import EVENT_STREAM, last_results_feed
 from app.schemas import (
+    AggregateQuery,
+    AggregateRow,
+    AnalyticsQuery,
+    BatchRequest,
     DynamicTradingResultsQuery,
-    TradingResultsDB,
+    ExportFormat,
+    ExportQuery,
+    IngestResult,
+    PaginationQuery,
+    PriceSeries,
+    ProjectionQuery,
+    TradingResultsPage,
     TradingResultsQuery,
 )
-from app.validators import query_filter_validators
+from app.tasks import apply_ingest_task
+from app.validators import (
+    valid_aggregate_filters,
+    valid_analytics_filters,
+    valid_batch,
+    valid_dynamic_filters,
+    valid_export_filters,
+    valid_filters,
+    valid_ingest_token,
+    valid_page,
+    valid_projection,
+)
 
 spimex_router = APIRouter(prefix='/api', tags=['Trading results'])
+service_router = APIRouter(prefix='/service', tags=['Service'])
 
 SLUG_TRADING_DATES = 'trading-dates'
 SUMMARY_TRADING_DATES = 'Cписок дат последних торговых дней'
@@ -25,13 +86,40 @@ SUMMARY_RESULTS_BY_DATE = 'Cписок торгов за заданный пер
 SLUG_LAST_RESULTS = 'last-results'
 SUMMARY_LAST_RESULTS = 'Cписок последних торгов'
 
+SLUG_LAST_RESULTS_STREAM = 'last-results/stream'
+SUMMARY_LAST_RESULTS_STREAM = 'Поток последних торгов (Server-Sent Events)'
+
+SLUG_BATCH = 'batch'
+SUMMARY_BATCH = 'Пакет запросов последних торгов и торгов за период'
+
+SLUG_EXPORT = 'export'
+SUMMARY_EXPORT = 'Потоковая выгрузка торгов за период (NDJSON/CSV)'
+
+SLUG_AGGREGATES = 'aggregates'
+SUMMARY_AGGREGATES = 'Итоги торгов за период по дням или неделям'
+
+SLUG_ANALYTICS = 'analytics'
+SUMMARY_ANALYTICS = 'Ценовой ряд инструмента: VWAP, скользящее среднее'
+
+SLUG_CACHE_STATS = 'cache-stats'
+SUMMARY_CACHE_STATS = 'Статистика попаданий в кэш'
+
+SLUG_POOL_STATS = 'pool-stats'
+SUMMARY_POOL_STATS = 'Состояние пула соединений с БД'
+
+SLUG_INGEST = 'ingest'
+SUMMARY_INGEST = 'Загрузка результатов торгов (CSV/NDJSON)'
+
+SLUG_REPLICAS = 'replicas'
+SUMMARY_REPLICAS = 'Состояние реплик БД'
+
 
 @spimex_router.get(
     f'/{SLUG_TRADING_DATES}',
     response_model=list[date],
     summary=SUMMARY_TRADING_DATES,
 )
-@cache(namespace=SLUG_TRADING_DATES)
+@cached(namespace=SLUG_TRADING_DATES, warm_up=True, version=data_version_token)
 async def get_last_trading_dates(
     session: AsyncSession = Depends(get_async_session),
     days: int = Query(..., gt=0, le=settings.max_days_limit),
@@ -41,29 +129,180 @@ async def get_last_trading_dates(
 
 @spimex_router.get(
     f'/{SLUG_RESULTS_BY_DATE}',
-    response_model=list[TradingResultsDB],
+    response_model=TradingResultsPage,
     summary=SUMMARY_RESULTS_BY_DATE,
 )
-@cache(namespace=SLUG_RESULTS_BY_DATE)
+@cached(
+    namespace=SLUG_RESULTS_BY_DATE,
+    expire=closed_range_expire,
+    version=data_version_token,
+    store=False,
+)
 async def get_dynamics(
     session: AsyncSession = Depends(get_async_session),
-    filters: DynamicTradingResultsQuery = Depends(),
+    filters: DynamicTradingResultsQuery = Depends(valid_dynamic_filters),
+    page: PaginationQuery = Depends(valid_page),
+    projection: ProjectionQuery = Depends(valid_projection),
 ):
-    return await read_trading_results_from_db(
-        session, query_filter_validators(filters)
+    return await day_chunks.read_page(
+        session,
+        filters,
+        page,
+        projection.names,
+        data_watcher.version.max_date,
     )
 
 
 @spimex_router.get(
     f'/{SLUG_LAST_RESULTS}',
-    response_model=list[TradingResultsDB],
+    response_model=TradingResultsPage,
     summary=SUMMARY_LAST_RESULTS,
 )
-@cache(namespace=SLUG_LAST_RESULTS)
+@cached(namespace=SLUG_LAST_RESULTS, warm_up=True, version=data_version_token)
 async def get_trading_results(
     session: AsyncSession = Depends(get_async_session),
-    filters: TradingResultsQuery = Depends(),
+    filters: TradingResultsQuery = Depends(valid_filters),
+    page: PaginationQuery = Depends(valid_page),
+    projection: ProjectionQuery = Depends(valid_projection),
 ):
-    return await read_trading_results_from_db(
-        session, query_filter_validators(filters), last=True
+    return await read_trading_results_page(
+        session, filters, page, last=True, fields=projection.names
     )
+
+
+@spimex_router.get(
+    f'/{SLUG_LAST_RESULTS_STREAM}',
+    response_class=StreamingResponse,
+    summary=SUMMARY_LAST_RESULTS_STREAM,
+)
+async def stream_last_results(
+    filters: TradingResultsQuery = Depends(valid_filters),
+    last_event_id: str | None = Header(None),
+):
+    return StreamingResponse(
+        last_results_feed.stream(filters, last_event_id),
+        media_type=EVENT_STREAM,
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@spimex_router.post(
+    f'/{SLUG_BATCH}',
+    response_model=dict[str, TradingResultsPage],
+    summary=SUMMARY_BATCH,
+)
+async def post_batch(
+    batch: BatchRequest = Depends(valid_batch),
+    session: AsyncSession = Depends(get_async_session),
+):
+    return json_response(
+        await run_batch(
+            session,
+            batch.queries,
+            cached_endpoints[SLUG_LAST_RESULTS],
+            data_watcher.version.max_date,
+        )
+    )
+
+
+@spimex_router.get(
+    f'/{SLUG_AGGREGATES}',
+    response_model=list[AggregateRow],
+    summary=SUMMARY_AGGREGATES,
+)
+@cached(
+    namespace=SLUG_AGGREGATES,
+    expire=closed_range_expire,
+    invalidate=INVALIDATE_DATE_RANGE,
+    version=data_version_token,
+)
+async def get_aggregates(
+    session: AsyncSession = Depends(get_async_session),
+    filters: AggregateQuery = Depends(valid_aggregate_filters),
+):
+    return await read_aggregates(session, filters)
+
+
+@spimex_router.get(
+    f'/{SLUG_ANALYTICS}',
+    response_model=PriceSeries,
+    summary=SUMMARY_ANALYTICS,
+)
+@cached(
+    namespace=SLUG_ANALYTICS,
+    expire=closed_range_expire,
+    invalidate=INVALIDATE_DATE_RANGE,
+    version=data_version_token,
+)
+async def get_analytics(
+    session: AsyncSession = Depends(get_async_session),
+    filters: AnalyticsQuery = Depends(valid_analytics_filters),
+):
+    return price_series(
+        await read_price_rows(session, filters), filters.window
+    )
+
+
+@spimex_router.get(
+    f'/{SLUG_EXPORT}',
+    response_class=StreamingResponse,
+    summary=SUMMARY_EXPORT,
+)
+async def export_trading_results(
+    session: AsyncSession = Depends(get_async_session),
+    filters: ExportQuery = Depends(valid_export_filters),
+    projection: ProjectionQuery = Depends(valid_projection),
+):
+    filename = FILENAME.format(
+        start_date=filters.start_date,
+        end_date=filters.end_date,
+        extension=filters.format.value,
+    )
+    return StreamingResponse(
+        encode_stream(
+            stream_trading_results(session, filters, fields=projection.names),
+            filters.format,
+            projection.names,
+        ),
+        media_type=MEDIA_TYPES[filters.format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+@service_router.get(f'/{SLUG_CACHE_STATS}', summary=SUMMARY_CACHE_STATS)
+async def get_cache_stats():
+    return cache_stats.as_dict()
+
+
+@service_router.get(f'/{SLUG_POOL_STATS}', summary=SUMMARY_POOL_STATS)
+async def get_pool_stats():
+    return pool_stats(engine)
+
+
+@service_router.get(f'/{SLUG_REPLICAS}', summary=SUMMARY_REPLICAS)
+async def get_replicas():
+    return replica_router.status()
+
+
+@service_router.post(
+    f'/{SLUG_INGEST}',
+    response_model=IngestResult,
+    summary=SUMMARY_INGEST,
+    dependencies=[Depends(valid_ingest_token)],
+)
+async def ingest_trading_results(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_primary_session),
+    format: ExportFormat = ExportFormat.CSV,
+):
+    try:
+        rows, dates = await ingest(
+            session, PARSERS[format](read_lines(request.stream()))
+        )
+        await session.commit()
+    except IngestError as error:
+        raise HTTPException(HTTPStatus.UNPROCESSABLE_ENTITY, str(error))
+    if dates:
+        background_tasks.add_task(apply_ingest_task, dates)
+    return IngestResult(rows=rows, dates=dates)
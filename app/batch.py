@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from datetime import date
+
+import orjson
+from fastapi_cache import FastAPICache
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import (
+    CachedEndpoint,
+    cache_stats,
+    encode_json,
+    get_many_with_ttl,
+    payload_coder,
+    request_frequencies,
+)
+from app.chunks import day_chunks
+from app.crud import read_trading_pages
+from app.schemas import BatchQuery, DynamicTradingResultsQuery
+
+logger = logging.getLogger(__name__)
+
+
+async def run_batch(
+    session: AsyncSession,
+    queries: dict[str, BatchQuery],
+    endpoint: CachedEndpoint,
+    max_date: date | None = None,
+) -> bytes:
+    """Ответы на пакет запросов одним JSON-объектом по ключам пакета.
+
+    Ключи кэша последних торгов совпадают с ключами одиночного
+    эндпоинта: попадания читаются одним обращением к кэшу, промахи -
+    одним SQL-запросом и сохраняются в кэш для последующих одиночных
+    запросов. Торги за период собираются из кэша по дням (day_chunks)
+    все вместе: окна дней всех запросов - одним обращением к кэшу
+    и одним SQL-запросом.
+    """
+    plan, ranges, payloads = {}, {}, {}
+    for query_id, query in queries.items():
+        filters, page, projection = query.filters, query.page, query.projection
+        if isinstance(filters, DynamicTradingResultsQuery):
+            ranges[query_id] = filters, page, projection.names
+            continue
+        kwargs = {
+            'session': session,
+            'filters': filters,
+            'page': page,
+            'projection': projection,
+        }
+        key = endpoint.key(kwargs)
+        if endpoint.warm_up:
+            request_frequencies.record(endpoint.namespace, key)
+        plan[query_id] = endpoint, kwargs, key
+    if ranges:
+        pages = await day_chunks.read_pages(
+            session, list(ranges.values()), max_date
+        )
+        for query_id, result in zip(ranges, pages):
+            payloads[query_id] = encode_json(result)
+    backend = FastAPICache.get_backend()
+    coder = payload_coder()
+    keys = [key for *_, key in plan.values()]
+    entries = [(0, None)] * len(keys)
+    if FastAPICache.get_enable():
+        try:
+            entries = await get_many_with_ttl(backend, keys)
+        except Exception:
+            logger.warning('Cache batch read failed', exc_info=True)
+    for (query_id, (endpoint, kwargs, key)), (remaining, payload) in zip(
+        plan.items(), entries
+    ):
+        if payload is None:
+            continue
+        if endpoint.stale and 0 < remaining <= endpoint.stale:
+            endpoint.schedule_revalidation(key, kwargs)
+        payloads[query_id] = coder.to_json(payload)
+    misses = [query_id for query_id in plan if query_id not in payloads]
+    if misses:
+        pages = await read_trading_pages(
+            session,
+            [
+                (
+                    plan[query_id][1]['filters'],
+                    plan[query_id][1]['page'],
+                    plan[query_id][1]['projection'].names,
+                )
+                for query_id in misses
+            ],
+        )
+        writes = []
+        for query_id, page in zip(misses, pages):
+            endpoint, kwargs, key = plan[query_id]
+            payloads[query_id] = encode_json(page)
+            if FastAPICache.get_enable():
+                value = coder.compress(payloads[query_id])
+                cache_stats.record_size(
+                    endpoint.namespace, len(payloads[query_id]), len(value)
+                )
+                writes.append(
+                    backend.set(key, value, endpoint.hard_ttl(kwargs))
+                )
+        for result in await asyncio.gather(*writes, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.warning('Cache batch write failed', exc_info=result)
+    return b'{%b}' % b','.join(
+        orjson.dumps(query_id) + b':' + payloads[query_id]
+        for query_id in queries
+    )
@@ -0,0 +1,827 @@
+import asyncio
+import hashlib
+import inspect
+import logging
+import time
+from collections import Counter, OrderedDict
+from datetime import date
+from enum import Enum
+from functools import wraps
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable
+from urllib.parse import quote, unquote
+
+import redis.asyncio as redis
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.types import Backend
+from pydantic import BaseModel, parse_obj_as
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.coders import CODERS, OrjsonCoder, accepts_encoding, encode_json
+from app.compression import choose_encoding, compress
+from app.config import settings
+from app.db import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'spimex'
+JSON_MEDIA_TYPE = 'application/json'
+CACHE_HIT = 'HIT'
+CACHE_MISS = 'MISS'
+CACHE_STALE = 'STALE'
+COALESCED = 'coalesced'
+NOT_MODIFIED = 'not_modified'
+PRECOMPRESSED = 'precompressed'
+RAW_BYTES = 'raw_bytes'
+STORED_BYTES = 'stored_bytes'
+REQUEST_PARAM = '__cache_request'
+ETAG = 'W/"{version}-{digest}"'
+KEY_PARAMS_SEPARATOR = '&'
+KEY_TYPES = (str, int, float, bool, date)
+
+INVALIDATE_ALL = 'all'
+INVALIDATE_DATE_RANGE = 'date-range'
+
+FREQUENCIES_KEY = '{prefix}-popular:{namespace}'
+REVALIDATE_LOCK_KEY = '{prefix}-lock:{key}'
+
+redis_client = redis.from_url(settings.redis_cache_url)
+
+Expire = int | Callable[[dict[str, Any]], int | None] | None
+
+
+def _canonical(value: Any) -> str:
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, date):
+        value = value.isoformat()
+    return quote(str(value), safe='')
+
+
+def request_key_builder(
+    func: Callable[..., Any],
+    namespace: str = '',
+    *,
+    request: Request | None = None,
+    response: Response | None = None,
+    args: tuple[Any, ...] = (),
+    kwargs: dict[str, Any] | None = None,
+) -> str:
+    """Ключ кэша из параметров запроса без сессии БД и прочих зависимостей.
+
+    Имена и значения параметров кодируются как в URL, поэтому '&', '='
+    и ':' внутри значения не смешиваются с разделителями ключа.
+    """
+    params = {}
+    for name, value in (kwargs or {}).items():
+        if isinstance(value, BaseModel):
+            params.update(value.dict(exclude_none=True))
+        elif isinstance(value, KEY_TYPES):
+            params[name] = value
+    query = KEY_PARAMS_SEPARATOR.join(
+        f'{quote(name, safe="")}={_canonical(value)}'
+        for name, value in sorted(params.items())
+    )
+    return f'{namespace}:{query}'
+
+
+def key_namespace(key: str) -> str:
+    return key.rsplit(':', 2)[-2]
+
+
+def key_params(key: str) -> dict[str, str]:
+    query = key.rsplit(':', 1)[-1]
+    return {
+        unquote(name): unquote(value)
+        for name, _, value in (
+            param.partition('=')
+            for param in query.split(KEY_PARAMS_SEPARATOR)
+            if param
+        )
+    }
+
+
+L1 = 'l1'
+L2 = 'l2'
+
+
+CacheEntry = tuple[int, bytes | None]
+CacheItem = tuple[str, bytes, int | None]
+
+
+async def get_many_with_ttl(
+    backend: Backend, keys: list[str]
+) -> list[CacheEntry]:
+    """TTL и значения нескольких ключей, пакетно, если бэкенд это умеет."""
+    if not keys:
+        return []
+    get_many = getattr(backend, 'get_many_with_ttl', None)
+    if get_many is not None:
+        return await get_many(keys)
+    return list(
+        await asyncio.gather(*(backend.get_with_ttl(key) for key in keys))
+    )
+
+
+async def get_many(backend: Backend, keys: list[str]) -> list[bytes | None]:
+    """Значения нескольких ключей без TTL, пакетно, если бэкенд это умеет."""
+    if not keys:
+        return []
+    get_many = getattr(backend, 'get_many', None)
+    if get_many is not None:
+        return await get_many(keys)
+    return list(await asyncio.gather(*(backend.get(key) for key in keys)))
+
+
+async def set_many(backend: Backend, items: list[CacheItem]) -> None:
+    """Записывает несколько ключей, пакетно, если бэкенд это умеет."""
+    if not items:
+        return
+    set_many = getattr(backend, 'set_many', None)
+    if set_many is not None:
+        await set_many(items)
+        return
+    await asyncio.gather(
+        *(backend.set(key, value, expire) for key, value, expire in items)
+    )
+
+
+class CacheStats:
+    """Счётчики попаданий и промахов кэша по пространствам имён и уровням.
+
+    Для записанных значений копится объём JSON до сжатия и после.
+    """
+
+    def __init__(self):
+        self.hits = Counter()
+        self.misses = Counter()
+        self.events = Counter()
+        self.sizes = Counter()
+
+    def record(self, namespace: str, hit: bool, tier: str = L2) -> None:
+        (self.hits if hit else self.misses)[namespace, tier] += 1
+
+    def record_event(self, namespace: str, event: str) -> None:
+        self.events[namespace, event] += 1
+
+    def record_size(self, namespace: str, raw: int, stored: int) -> None:
+        self.sizes[namespace, RAW_BYTES] += raw
+        self.sizes[namespace, STORED_BYTES] += stored
+
+    def reset(self) -> None:
+        self.hits.clear()
+        self.misses.clear()
+        self.events.clear()
+        self.sizes.clear()
+
+    def as_dict(self) -> dict[str, dict]:
+        stats = {}
+        for namespace, tier in sorted(self.hits.keys() | self.misses.keys()):
+            hits = self.hits[namespace, tier]
+            misses = self.misses[namespace, tier]
+            stats.setdefault(namespace, {})[tier] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': round(hits / (hits + misses), 4),
+            }
+        for (namespace, event), count in sorted(self.events.items()):
+            stats.setdefault(namespace, {})[event] = count
+        for (namespace, size), total in sorted(self.sizes.items()):
+            stats.setdefault(namespace, {})[size] = total
+        return stats
+
+
+cache_stats = CacheStats()
+
+
+class InstrumentedBackend(Backend):
+    """Обёртка над бэкендом кэша, считающая попадания и промахи."""
+
+    def __init__(
+        self,
+        backend: Backend,
+        tier: str = L2,
+        stats: CacheStats = cache_stats,
+    ):
+        self.backend = backend
+        self.tier = tier
+        self.stats = stats
+
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
+        ttl, value = await self.backend.get_with_ttl(key)
+        self.stats.record(key_namespace(key), value is not None, self.tier)
+        return ttl, value
+
+    async def get(self, key: str) -> bytes | None:
+        value = await self.backend.get(key)
+        self.stats.record(key_namespace(key), value is not None, self.tier)
+        return value
+
+    async def get_many_with_ttl(self, keys: list[str]) -> list[CacheEntry]:
+        entries = await get_many_with_ttl(self.backend, keys)
+        for key, (_, value) in zip(keys, entries):
+            self.stats.record(key_namespace(key), value is not None, self.tier)
+        return entries
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        values = await get_many(self.backend, keys)
+        for key, value in zip(keys, values):
+            self.stats.record(key_namespace(key), value is not None, self.tier)
+        return values
+
+    async def set(
+        self, key: str, value: bytes, expire: int | None = None
+    ) -> None:
+        await self.backend.set(key, value, expire)
+
+    async def set_many(self, items: list[CacheItem]) -> None:
+        await set_many(self.backend, items)
+
+    async def clear(
+        self, namespace: str | None = None, key: str | None = None
+    ) -> int:
+        return await self.backend.clear(namespace, key)
+
+
+class MemoryBackend(Backend):
+    """LRU-кэш в памяти процесса, ограниченный суммарным размером значений.
+
+    Запись живёт не дольше expire секунд, но сообщает исходный TTL,
+    с которым её положили, чтобы заголовки ответа совпадали с L2.
+    """
+
+    def __init__(self, max_size: int, expire: int):
+        self.max_size = max_size
+        self.expire = expire
+        self.size = 0
+        self._store: OrderedDict[str, tuple[float, float | None, bytes]] = (
+            OrderedDict()
+        )
+
+    def _pop(self, key: str) -> None:
+        *_, value = self._store.pop(key)
+        self.size -= len(value)
+
+    def _get(self, key: str) -> tuple[int, bytes | None]:
+        entry = self._store.get(key)
+        if entry is None:
+            return 0, None
+        evict_at, deadline, value = entry
+        now = time.monotonic()
+        if evict_at <= now:
+            self._pop(key)
+            return 0, None
+        self._store.move_to_end(key)
+        return (-1 if deadline is None else int(deadline - now)), value
+
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
+        return self._get(key)
+
+    async def get(self, key: str) -> bytes | None:
+        return self._get(key)[1]
+
+    async def get_many_with_ttl(self, keys: list[str]) -> list[CacheEntry]:
+        return [self._get(key) for key in keys]
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        return [self._get(key)[1] for key in keys]
+
+    async def set(
+        self, key: str, value: bytes, expire: int | None = None
+    ) -> None:
+        if key in self._store:
+            self._pop(key)
+        if len(value) > self.max_size:
+            return
+        now = time.monotonic()
+        deadline = now + expire if expire and expire > 0 else None
+        evict_at = now + self.expire
+        if deadline is not None:
+            evict_at = min(evict_at, deadline)
+        self._store[key] = (evict_at, deadline, value)
+        self.size += len(value)
+        while self.size > self.max_size:
+            self._pop(next(iter(self._store)))
+
+    async def clear(
+        self, namespace: str | None = None, key: str | None = None
+    ) -> int:
+        if namespace:
+            keys = [
+                stored
+                for stored in self._store
+                if stored.startswith(f'{namespace}:')
+            ]
+        else:
+            keys = [key] if key in self._store else []
+        for stored in keys:
+            self._pop(stored)
+        return len(keys)
+
+
+encoded_bodies = MemoryBackend(
+    settings.encoded_cache_size, settings.memory_cache_expire
+)
+
+
+async def encoded_body(
+    value: bytes, encoding: str, coder: type[OrjsonCoder]
+) -> bytes:
+    """Тело ответа из значения кэша, сжатое brotli или gzip.
+
+    Сжатые тела хранятся в памяти процесса по дайджесту значения,
+    поэтому популярные ключи не сжимаются заново при каждом попадании,
+    а обновлённое значение не получает старое тело.
+    """
+    digest = hashlib.blake2b(value, digest_size=16).hexdigest()
+    key = f'{encoding}:{digest}'
+    body = await encoded_bodies.get(key)
+    if body is None:
+        body = compress(coder.to_json(value), encoding)
+        await encoded_bodies.set(key, body)
+    return body
+
+
+class TieredBackend(Backend):
+    """Двухуровневый кэш: память процесса (L1) перед общим бэкендом (L2)."""
+
+    def __init__(self, memory: Backend, backend: Backend):
+        self.memory = memory
+        self.backend = backend
+
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
+        ttl, value = await self.memory.get_with_ttl(key)
+        if value is None:
+            ttl, value = await self.backend.get_with_ttl(key)
+            if value is not None:
+                await self.memory.set(key, value, ttl)
+        return ttl, value
+
+    async def get(self, key: str) -> bytes | None:
+        return (await self.get_with_ttl(key))[1]
+
+    async def get_many_with_ttl(self, keys: list[str]) -> list[CacheEntry]:
+        entries = await get_many_with_ttl(self.memory, keys)
+        missing = [
+            index for index, (_, value) in enumerate(entries) if value is None
+        ]
+        found = await get_many_with_ttl(
+            self.backend, [keys[index] for index in missing]
+        )
+        for index, (ttl, value) in zip(missing, found):
+            if value is not None:
+                await self.memory.set(keys[index], value, ttl)
+                entries[index] = ttl, value
+        return entries
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        values = await get_many(self.memory, keys)
+        missing = [
+            index for index, value in enumerate(values) if value is None
+        ]
+        found = await get_many(
+            self.backend, [keys[index] for index in missing]
+        )
+        for index, value in zip(missing, found):
+            if value is not None:
+                await self.memory.set(keys[index], value)
+                values[index] = value
+        return values
+
+    async def set(
+        self, key: str, value: bytes, expire: int | None = None
+    ) -> None:
+        await self.memory.set(key, value, expire)
+        await self.backend.set(key, value, expire)
+
+    async def set_many(self, items: list[CacheItem]) -> None:
+        await set_many(self.memory, items)
+        await set_many(self.backend, items)
+
+    async def clear(
+        self, namespace: str | None = None, key: str | None = None
+    ) -> int:
+        await self.memory.clear(namespace, key)
+        return await self.backend.clear(namespace, key)
+
+
+class PipelinedRedisBackend(RedisBackend):
+    """Redis-бэкенд, читающий несколько ключей за одно обращение к Redis."""
+
+    async def get_many_with_ttl(self, keys: list[str]) -> list[CacheEntry]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.ttl(key).get(key)
+            values = await pipe.execute()
+        return list(zip(values[::2], values[1::2]))
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        return await self.redis.mget(keys)
+
+    async def set_many(self, items: list[CacheItem]) -> None:
+        """Ключи без срока жизни пишутся одним MSET, остальные - SET EX."""
+        persistent = {key: value for key, value, expire in items if not expire}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if persistent:
+                pipe.mset(persistent)
+            for key, value, expire in items:
+                if expire:
+                    pipe.set(key, value, ex=expire)
+            await pipe.execute()
+
+
+class SingleFlight:
+    """Объединяет одновременные вычисления одного ключа в одно."""
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Future] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def run(self, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        while (future := self._calls.get(key)) is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+single_flight = SingleFlight()
+
+
+def init_cache(backend: Backend) -> None:
+    FastAPICache.init(
+        backend,
+        prefix=CACHE_PREFIX,
+        expire=settings.expire_cache,
+        coder=CODERS[settings.cache_compression],
+        key_builder=request_key_builder,
+    )
+
+
+def payload_coder() -> type[OrjsonCoder]:
+    coder = FastAPICache.get_coder()
+    return coder if issubclass(coder, OrjsonCoder) else OrjsonCoder
+
+
+def json_response(
+    payload: bytes, headers: dict[str, str] | None = None
+) -> Response:
+    return Response(payload, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+class RequestFrequencies:
+    """Частоты запросов по ключам кэша.
+
+    Счётчики копятся в памяти процесса и периодически сбрасываются
+    в Redis, чтобы не добавлять обращение к Redis в каждый запрос.
+    Считаются только прогреваемые эндпоинты, а при затухании в Redis
+    остаются только самые частые ключи, иначе каждый когда-либо
+    запрошенный ключ (и каждая страница курсора) хранился бы вечно.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def record(self, namespace: str, key: str) -> None:
+        self.counts[namespace, key] += 1
+
+    @staticmethod
+    def redis_key(namespace: str) -> str:
+        return FREQUENCIES_KEY.format(
+            prefix=FastAPICache.get_prefix(), namespace=namespace
+        )
+
+    async def flush(self) -> None:
+        if not self.counts:
+            return
+        counts, self.counts = self.counts, Counter()
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for (namespace, key), count in counts.items():
+                pipe.zincrby(self.redis_key(namespace), count, key)
+            await pipe.execute()
+
+    async def top(self, namespace: str, limit: int) -> list[str]:
+        keys = await redis_client.zrevrange(
+            self.redis_key(namespace), 0, limit - 1
+        )
+        return [key.decode() for key in keys]
+
+    async def decay(
+        self,
+        namespace: str,
+        factor: float,
+        keep: int = settings.warmup_tracked_keys,
+    ) -> None:
+        redis_key = self.redis_key(namespace)
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.zunionstore(redis_key, {redis_key: factor})
+            pipe.zremrangebyrank(redis_key, 0, -keep - 1)
+            await pipe.execute()
+
+
+request_frequencies = RequestFrequencies()
+
+
+def with_session(
+    kwargs: dict[str, Any], session: AsyncSession
+) -> dict[str, Any]:
+    return {
+        name: session if isinstance(value, AsyncSession) else value
+        for name, value in kwargs.items()
+    }
+
+
+class CachedEndpoint:
+    """Эндпоинт, ответ которого кэшируется в виде готовых JSON-байтов."""
+
+    def __init__(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        namespace: str,
+        expire: Expire,
+        invalidate: str,
+        warm_up: bool,
+        stale: int,
+        version: Callable[[], str | None] | None,
+        store: bool = True,
+    ):
+        self.func = func
+        self.namespace = namespace
+        self.expire = expire
+        self.invalidate = invalidate
+        self.warm_up = warm_up
+        self.stale = stale
+        self.version = version
+        self.store = store
+        self.signature = inspect.signature(func)
+        self.revalidations: set[asyncio.Task] = set()
+
+    def key(self, kwargs: dict[str, Any]) -> str:
+        return FastAPICache.get_key_builder()(
+            self.func,
+            f'{FastAPICache.get_prefix()}:{self.namespace}',
+            kwargs=kwargs,
+        )
+
+    def ttl(self, kwargs: dict[str, Any]) -> int | None:
+        if callable(self.expire):
+            return self.expire(kwargs)
+        return self.expire or FastAPICache.get_expire()
+
+    def kwargs_from_key(
+        self, key: str, session: AsyncSession
+    ) -> dict[str, Any]:
+        params = key_params(key)
+        kwargs = {}
+        for name, parameter in self.signature.parameters.items():
+            annotation = parameter.annotation
+            if annotation is AsyncSession:
+                kwargs[name] = session
+            elif isinstance(annotation, type) and issubclass(
+                annotation, BaseModel
+            ):
+                kwargs[name] = annotation.parse_obj(params)
+            elif name in params:
+                kwargs[name] = parse_obj_as(annotation, params[name])
+        return kwargs
+
+    def etag(self, key: str) -> str | None:
+        version = self.version and self.version()
+        if version is None:
+            return None
+        digest = hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+        return ETAG.format(version=version, digest=digest[:16])
+
+    def cache_control(self, etag: str | None, remaining: int) -> str:
+        """Cache-Control для клиента без серверного срока жизни записи.
+
+        С ETag клиент перепроверяет ответ на каждом запросе (304 без
+        обращения к кэшу), без него хранит ответ не дольше
+        client_max_age секунд: иначе после смены данных он отдавал бы
+        старый ответ до истечения expire.
+        """
+        if etag is not None:
+            return 'no-cache'
+        return f'max-age={min(remaining, settings.client_max_age)}'
+
+    def max_age(self, kwargs: dict[str, Any]) -> int:
+        ttl = self.ttl(kwargs)
+        return FastAPICache.get_expire() if ttl is None else ttl
+
+    def hard_ttl(self, kwargs: dict[str, Any]) -> int | None:
+        ttl = self.ttl(kwargs)
+        return ttl + self.stale if ttl else ttl
+
+    async def load(
+        self, key: str, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> bytes:
+        payload = encode_json(await self.func(*args, **kwargs))
+        if not self.store:
+            return payload
+        value = payload_coder().compress(payload)
+        cache_stats.record_size(self.namespace, len(payload), len(value))
+        try:
+            await FastAPICache.get_backend().set(
+                key, value, self.hard_ttl(kwargs)
+            )
+        except Exception:
+            logger.warning('Cache write failed: %s', key, exc_info=True)
+        return value
+
+    async def refresh(self, kwargs: dict[str, Any]) -> bytes:
+        key = self.key(kwargs)
+        return await single_flight.run(key, lambda: self.load(key, (), kwargs))
+
+    async def read(self, kwargs: dict[str, Any]) -> bytes:
+        """JSON-байты ответа из кэша, при промахе - вычисленные заново."""
+        key = self.key(kwargs)
+        value = None
+        try:
+            value = await FastAPICache.get_backend().get(key)
+        except Exception:
+            logger.warning('Cache read failed: %s', key, exc_info=True)
+        if value is None:
+            value = await self.refresh(kwargs)
+        return payload_coder().to_json(value)
+
+    async def revalidate(self, key: str, kwargs: dict[str, Any]) -> None:
+        if single_flight.in_flight(key):
+            return
+        lock_key = REVALIDATE_LOCK_KEY.format(
+            prefix=FastAPICache.get_prefix(), key=key
+        )
+        try:
+            if not await redis_client.set(
+                lock_key, 1, nx=True, ex=settings.revalidate_lock_timeout
+            ):
+                return
+            try:
+                async with AsyncSessionLocal() as session:
+                    await self.refresh(with_session(kwargs, session))
+            finally:
+                await redis_client.delete(lock_key)
+        except Exception:
+            logger.warning('Cache revalidation failed: %s', key, exc_info=True)
+
+    async def response(
+        self,
+        value: bytes,
+        request: Request | None,
+        headers: dict[str, str],
+    ) -> Response:
+        """Ответ из значения кэша в кодировке, которую принимает клиент.
+
+        Сжатое значение отдаётся как есть, если клиент принимает его
+        кодировку, иначе - сжатое brotli или gzip тело из encoded_bodies.
+        Сжатые значения кэша заведомо не короче порога сжатия ответов.
+        """
+        coder = payload_coder()
+        compressed = coder.is_compressed(value)
+        if not compressed and len(value) < settings.compression_min_size:
+            return json_response(value, headers)
+        headers['Vary'] = 'Accept-Encoding'
+        accept_encoding = (
+            request.headers.get('accept-encoding', '') if request else ''
+        )
+        if compressed and accepts_encoding(
+            accept_encoding, coder.content_encoding
+        ):
+            cache_stats.record_event(self.namespace, PRECOMPRESSED)
+            headers['Content-Encoding'] = coder.content_encoding
+            return json_response(value, headers)
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            return json_response(coder.to_json(value), headers)
+        headers['Content-Encoding'] = encoding
+        return json_response(
+            await encoded_body(value, encoding, coder), headers
+        )
+
+    def schedule_revalidation(self, key: str, kwargs: dict[str, Any]) -> None:
+        task = asyncio.create_task(self.revalidate(key, kwargs))
+        self.revalidations.add(task)
+        task.add_done_callback(self.revalidations.discard)
+
+    async def __call__(self, *args, **kwargs) -> Response:
+        request = kwargs.pop(REQUEST_PARAM, None)
+        if not FastAPICache.get_enable():
+            return json_response(encode_json(await self.func(*args, **kwargs)))
+        key = self.key(kwargs)
+        if self.store and self.warm_up:
+            request_frequencies.record(self.namespace, key)
+        etag = self.etag(key)
+        if etag is not None and request is not None:
+            if_none_match = {
+                tag.strip()
+                for tag in request.headers.get('if-none-match', '').split(',')
+            }
+            if etag in if_none_match or '*' in if_none_match:
+                cache_stats.record_event(self.namespace, NOT_MODIFIED)
+                return Response(
+                    status_code=HTTPStatus.NOT_MODIFIED,
+                    headers={
+                        'Cache-Control': self.cache_control(etag, 0),
+                        'ETag': etag,
+                    },
+                )
+        remaining, payload = 0, None
+        if self.store:
+            backend = FastAPICache.get_backend()
+            try:
+                remaining, payload = await backend.get_with_ttl(key)
+            except Exception:
+                logger.warning('Cache read failed: %s', key, exc_info=True)
+        status = CACHE_HIT
+        if payload is not None and remaining > 0 and self.stale:
+            remaining -= self.stale
+            if remaining <= 0:
+                remaining, status = 0, CACHE_STALE
+                cache_stats.record_event(self.namespace, CACHE_STALE.lower())
+                self.schedule_revalidation(key, kwargs)
+        if payload is None:
+            if single_flight.in_flight(key):
+                cache_stats.record_event(self.namespace, COALESCED)
+            payload = await single_flight.run(
+                key, lambda: self.load(key, args, kwargs)
+            )
+            remaining, status = self.max_age(kwargs), CACHE_MISS
+        if remaining < 0:
+            remaining = FastAPICache.get_expire()
+        headers = {'Cache-Control': self.cache_control(etag, remaining)}
+        if self.store:
+            headers[FastAPICache.get_cache_status_header()] = status
+        if etag is not None:
+            headers['ETag'] = etag
+        return await self.response(payload, request, headers)
+
+
+cached_endpoints: dict[str, CachedEndpoint] = {}
+
+
+def cached(
+    namespace: str,
+    expire: Expire = None,
+    invalidate: str = INVALIDATE_ALL,
+    warm_up: bool = False,
+    stale: int = settings.stale_cache,
+    version: Callable[[], str | None] | None = None,
+    store: bool = True,
+):
+    """Кэширует ответ эндпоинта в виде готовых JSON-байтов.
+
+    expire может быть функцией от параметров запроса; None в её ответе
+    означает запись без срока жизни. invalidate задаёт, какие ключи
+    пространства имён удаляются при появлении новых данных, warm_up -
+    прогревать ли популярные ключи после обновления данных. В течение
+    stale секунд после истечения expire запись отдаётся как устаревшая,
+    а обновляется в фоне. version возвращает токен версии данных для ETag:
+    при совпадении If-None-Match ответ 304 отдаётся без обращения к кэшу.
+    С store=False ответ целиком не сохраняется (эндпоинт кэширует
+    данные сам), остаются ETag, сжатие и объединение запросов.
+    """
+
+    def decorator(func):
+        endpoint = CachedEndpoint(
+            func, namespace, expire, invalidate, warm_up, stale, version, store
+        )
+        cached_endpoints[namespace] = endpoint
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await endpoint(*args, **kwargs)
+
+        wrapper.__signature__ = endpoint.signature.replace(
+            parameters=[
+                *endpoint.signature.parameters.values(),
+                inspect.Parameter(
+                    REQUEST_PARAM,
+                    inspect.Parameter.KEYWORD_ONLY,
+                    annotation=Request,
+                ),
+            ]
+        )
+        return wrapper
+
+    return decorator
@@ -0,0 +1,425 @@
+import logging
+from bisect import bisect_right
+from datetime import date, timedelta
+from math import ceil
+from typing import Sequence
+
+import orjson
+from fastapi_cache import FastAPICache
+from sqlalchemy import Select, Text, cast, func, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import (
+    cache_stats,
+    get_many,
+    payload_coder,
+    redis_client,
+    request_key_builder,
+)
+from app.config import settings
+from app.crud import (
+    BATCH_INDEX,
+    PageRequest,
+    filter_conditions,
+    output_columns,
+    read_trading_results_page,
+)
+from app.db import TradingResults
+from app.pagination import decode_cursor, encode_cursor
+from app.schemas import (
+    PROJECTION_SEPARATOR,
+    DynamicTradingResultsQuery,
+    PaginationQuery,
+    TradingResultsQuery,
+)
+
+logger = logging.getLogger(__name__)
+
+DAY_NAMESPACE = 'results-by-day'
+DAY_KEYS = '{prefix}-day-keys:{date}'
+DAY_GENERATION = '{prefix}-day-generation:{date}'
+STORE_SCRIPT = """
+local written = {}
+for index = 1, #KEYS, 3 do
+    if (redis.call('GET', KEYS[index]) or '0') == ARGV[index] then
+        redis.call('SADD', KEYS[index + 1], KEYS[index + 2])
+        if ARGV[index + 2] == '0' then
+            redis.call('SET', KEYS[index + 2], ARGV[index + 1])
+        else
+            redis.call('SET', KEYS[index + 2], ARGV[index + 1],
+                'EX', ARGV[index + 2])
+        end
+        written[#written + 1] = (index + 2) / 3
+    end
+end
+return written
+"""
+FIRST_WINDOW = 1
+CHUNK_SEPARATOR = b'\n'
+ROW_ALIAS = 'chunk_row'
+
+Chunk = tuple[list[str], list[bytes]]
+ChunkItem = tuple[date, str, bytes, int | None]
+Fields = tuple[str, ...] | None
+Selected = tuple[date, str, bytes]
+
+
+def day_expire(day: date, max_date: date | None) -> int | None:
+    """Прошедшие дни торгов не меняются и хранятся без срока жизни."""
+    if max_date is not None and day < max_date:
+        return None
+    return settings.expire_cache
+
+
+def encode_chunk(chunk: Chunk) -> bytes:
+    ids, rows = chunk
+    return CHUNK_SEPARATOR.join([orjson.dumps(ids), *rows])
+
+
+def decode_chunk(payload: bytes) -> Chunk:
+    ids, *rows = payload.split(CHUNK_SEPARATOR)
+    return orjson.loads(ids), rows
+
+
+def chunk_query(
+    filters: TradingResultsQuery,
+    fields: Fields,
+    days: list[date],
+    index: int = 0,
+) -> Select:
+    """Строки дней для частей: номер ветви, день, код и JSON записи."""
+    rows = (
+        select(*output_columns(fields))
+        .where(*filter_conditions(filters), TradingResults.date.in_(days))
+        .subquery(ROW_ALIAS)
+    )
+    return select(
+        literal(index).label(BATCH_INDEX),
+        rows.c.date,
+        rows.c.exchange_product_id,
+        cast(func.row_to_json(rows.table_valued()), Text),
+    )
+
+
+class PageBuilder:
+    """Сборка одной страницы из частей, окно дней за окном.
+
+    Первое окно - FIRST_WINDOW дней, следующие - по числу записей
+    в уже прочитанных днях.
+    """
+
+    def __init__(
+        self,
+        filters: DynamicTradingResultsQuery,
+        page: PaginationQuery,
+        fields: Sequence[str] | None = None,
+    ):
+        self.fields = None if fields is None else tuple(fields)
+        self.limit = page.limit
+        self.after = decode_cursor(page.cursor) if page.cursor else None
+        end_date = filters.end_date
+        if self.after is not None:
+            end_date = min(end_date, self.after[0])
+        self.days = [
+            end_date - timedelta(days=shift)
+            for shift in range((end_date - filters.start_date).days + 1)
+        ]
+        self.filters = TradingResultsQuery(
+            **filters.dict(include=set(TradingResultsQuery.__fields__))
+        )
+        self.wanted = page.limit + 1
+        self.selected: list[Selected] = []
+        self.consumed, self.window = 0, FIRST_WINDOW
+        self.pending: list[date] = []
+
+    @property
+    def done(self) -> bool:
+        return not self.days or len(self.selected) >= self.wanted
+
+    def next_window(self) -> list[date]:
+        self.pending = self.days[: self.window]
+        self.days = self.days[self.window :]
+        return self.pending
+
+    def add(self, chunks: dict[date, Chunk]) -> None:
+        for day in self.pending:
+            ids, rows = chunks[day]
+            start = 0
+            if self.after is not None and day == self.after[0]:
+                start = bisect_right(ids, self.after[1])
+            stop = min(len(rows), start + self.wanted - len(self.selected))
+            self.selected.extend(
+                (day, ids[index], rows[index]) for index in range(start, stop)
+            )
+            self.consumed += 1
+            if len(self.selected) == self.wanted:
+                break
+        if self.selected:
+            self.window = ceil(
+                (self.wanted - len(self.selected))
+                * self.consumed
+                / len(self.selected)
+            )
+        else:
+            self.window *= 2
+
+    def result(self) -> dict:
+        next_cursor = None
+        if len(self.selected) > self.limit:
+            day, product_id, _ = self.selected[self.limit - 1]
+            next_cursor = encode_cursor((day, product_id))
+        rows = b'[%b]' % b','.join(
+            row for *_, row in self.selected[: self.limit]
+        )
+        return {'results': orjson.Fragment(rows), 'next_cursor': next_cursor}
+
+
+class DayChunks:
+    """Кэш торгов по дням: страница за период собирается из частей.
+
+    Часть - все строки одного дня для набора фильтров и выбранных полей
+    по возрастанию exchange_product_id: первой строкой JSON-список кодов
+    инструментов для поиска курсора, дальше по строке JSON на запись
+    только с выбранными полями (из БД читаются только их столбцы).
+    Страница склеивается из готовых байтов записей.
+    Части читаются окнами дней (PageBuilder): каждое окно - одним MGET,
+    недостающие дни окна - одним запросом к БД и одной пакетной записью
+    в кэш. Окна нескольких страниц пакета читаются вместе. Ключи частей
+    каждого дня перечислены в множестве Redis (DAY_KEYS): оно дополняется
+    до записи частей, поэтому при изменении дня удаляются все его части.
+    Поколение дня (DAY_GENERATION) растёт при каждом удалении, и часть
+    не записывается, если поколение сменилось после её чтения из БД.
+    """
+
+    def __init__(self, namespace: str = DAY_NAMESPACE):
+        self.namespace = namespace
+
+    def prefix(self) -> str:
+        return f'{FastAPICache.get_prefix()}:{self.namespace}'
+
+    def key(
+        self, filters: TradingResultsQuery, day: date, fields: Fields = None
+    ) -> str:
+        kwargs = {'filters': filters, 'date': day}
+        if fields is not None:
+            kwargs['fields'] = PROJECTION_SEPARATOR.join(fields)
+        return request_key_builder(None, self.prefix(), kwargs=kwargs)
+
+    @staticmethod
+    def index_key(day: date) -> str:
+        return DAY_KEYS.format(
+            prefix=FastAPICache.get_prefix(), date=day.isoformat()
+        )
+
+    @staticmethod
+    def generation_key(day: date) -> str:
+        return DAY_GENERATION.format(
+            prefix=FastAPICache.get_prefix(), date=day.isoformat()
+        )
+
+    async def generations(self, days: list[date]) -> dict[date, bytes] | None:
+        try:
+            values = await redis_client.mget(
+                [self.generation_key(day) for day in days]
+            )
+        except Exception:
+            logger.warning('Cache chunk read failed', exc_info=True)
+            return None
+        return {day: value or b'0' for day, value in zip(days, values)}
+
+    async def store(
+        self, items: list[ChunkItem], generations: dict[date, bytes] | None
+    ) -> None:
+        """Записывает части дней, не менявшихся с начала их чтения.
+
+        Скрипт сверяет поколение дня с прочитанным до запроса к БД
+        и только тогда добавляет ключ в множество дня и пишет часть:
+        иначе строки, прочитанные до изменения дня, остались бы в кэше,
+        а прошедшие дни хранятся без срока жизни. Записанные части
+        кладутся и в L1 воркера.
+        """
+        if not items or generations is None:
+            return
+        keys, args = [], []
+        for day, key, value, expire in items:
+            keys.extend((self.generation_key(day), self.index_key(day), key))
+            args.extend((generations[day], value, expire or 0))
+        try:
+            written = await redis_client.eval(
+                STORE_SCRIPT, len(keys), *keys, *args
+            )
+            memory = getattr(FastAPICache.get_backend(), 'memory', None)
+            if memory is not None:
+                for number in written:
+                    _, key, value, expire = items[number - 1]
+                    await memory.set(key, value, expire)
+        except Exception:
+            logger.warning('Cache chunk write failed', exc_info=True)
+
+    async def load(
+        self,
+        session: AsyncSession,
+        missing: dict[str, tuple[TradingResultsQuery, Fields, date]],
+        max_date: date | None,
+    ) -> dict[str, Chunk]:
+        """Части по ключам одним запросом к БД и одной записью в кэш.
+
+        Дни каждого набора фильтров и полей выбираются отдельной ветвью
+        UNION ALL, строки раскладываются по номеру ветви.
+        """
+        groups: dict[
+            tuple[str, Fields], tuple[TradingResultsQuery, list[date]]
+        ] = {}
+        for filters, fields, day in missing.values():
+            group = request_key_builder(None, kwargs={'filters': filters})
+            groups.setdefault((group, fields), (filters, []))[1].append(day)
+        generations = await self.generations(
+            sorted({day for *_, day in missing.values()})
+        )
+        queries = [
+            chunk_query(filters, fields, days, index)
+            for index, ((_, fields), (filters, days)) in enumerate(
+                groups.items()
+            )
+        ]
+        grouped = {
+            (index, day): ([], [])
+            for index, (_, days) in enumerate(groups.values())
+            for day in days
+        }
+        for index, day, product_id, row in await session.execute(
+            union_all(*queries)
+        ):
+            ids, encoded = grouped[index, day]
+            ids.append(product_id)
+            encoded.append(row.encode())
+        filters_by_index = [
+            (filters, fields) for (_, fields), (filters, _) in groups.items()
+        ]
+        coder = payload_coder()
+        chunks, items = {}, []
+        for (index, day), (ids, encoded) in grouped.items():
+            order = sorted(range(len(ids)), key=ids.__getitem__)
+            filters, fields = filters_by_index[index]
+            key = self.key(filters, day, fields)
+            chunks[key] = (
+                [ids[position] for position in order],
+                [encoded[position] for position in order],
+            )
+            payload = encode_chunk(chunks[key])
+            value = coder.compress(payload)
+            cache_stats.record_size(self.namespace, len(payload), len(value))
+            items.append((day, key, value, day_expire(day, max_date)))
+        await self.store(items, generations)
+        return chunks
+
+    async def read(
+        self,
+        session: AsyncSession,
+        windows: list[tuple[TradingResultsQuery, Fields, list[date]]],
+        max_date: date | None,
+    ) -> list[dict[date, Chunk]]:
+        """Части окон нескольких страниц.
+
+        Все дни читаются одним MGET, недостающие - одним запросом к БД.
+        """
+        keys = [
+            [self.key(filters, day, fields) for day in days]
+            for filters, fields, days in windows
+        ]
+        flat = [key for window_keys in keys for key in window_keys]
+        try:
+            values = await get_many(FastAPICache.get_backend(), flat)
+        except Exception:
+            logger.warning('Cache chunk read failed', exc_info=True)
+            values = [None] * len(flat)
+        coder = payload_coder()
+        found, missing = {}, {}
+        for key, value in zip(flat, values):
+            if value is not None:
+                found[key] = decode_chunk(coder.to_json(value))
+        for (filters, fields, days), window_keys in zip(windows, keys):
+            for day, key in zip(days, window_keys):
+                if key not in found:
+                    missing[key] = filters, fields, day
+        if missing:
+            found.update(await self.load(session, missing, max_date))
+        return [
+            {day: found[key] for day, key in zip(days, window_keys)}
+            for (*_, days), window_keys in zip(windows, keys)
+        ]
+
+    async def read_pages(
+        self,
+        session: AsyncSession,
+        requests: list[PageRequest],
+        max_date: date | None = None,
+    ) -> list[dict]:
+        """Страницы торгов за период, как read_trading_results_page.
+
+        Все страницы собираются вместе: очередные окна дней всех
+        страниц читаются одним обращением к кэшу и одним запросом к БД.
+        """
+        if not FastAPICache.get_enable():
+            return [
+                await read_trading_results_page(
+                    session, filters, page, fields=fields
+                )
+                for filters, page, fields in requests
+            ]
+        builders = [
+            PageBuilder(filters, page, fields)
+            for filters, page, fields in requests
+        ]
+        while active := [builder for builder in builders if not builder.done]:
+            windows = [
+                (builder.filters, builder.fields, builder.next_window())
+                for builder in active
+            ]
+            chunks = await self.read(session, windows, max_date)
+            for builder, window in zip(active, chunks):
+                builder.add(window)
+        return [builder.result() for builder in builders]
+
+    async def read_page(
+        self,
+        session: AsyncSession,
+        filters: DynamicTradingResultsQuery,
+        page: PaginationQuery,
+        fields: Sequence[str] | None = None,
+        max_date: date | None = None,
+    ) -> dict:
+        """Страница торгов за период, как read_trading_results_page."""
+        (result,) = await self.read_pages(
+            session, [(filters, page, fields)], max_date
+        )
+        return result
+
+    async def invalidate(self, dates: list[date]) -> None:
+        """Удаляет части изменившихся дат.
+
+        Множества ключей дат читаются и удаляются одной транзакцией
+        вместе с увеличением поколений дат, сами части - одним DEL,
+        из L1 воркера - по тем же ключам.
+        """
+        if not dates:
+            return
+        index_keys = [self.index_key(day) for day in dates]
+        async with redis_client.pipeline(transaction=True) as pipe:
+            for index_key in index_keys:
+                pipe.smembers(index_key)
+            for day in dates:
+                pipe.incr(self.generation_key(day))
+            pipe.delete(*index_keys)
+            members = (await pipe.execute())[: len(index_keys)]
+        keys = [key.decode() for day_keys in members for key in day_keys]
+        if not keys:
+            return
+        await redis_client.delete(*keys)
+        memory = getattr(FastAPICache.get_backend(), 'memory', None)
+        if memory is not None:
+            for key in keys:
+                await memory.clear(key=key)
+
+
+day_chunks = DayChunks()
@@ -0,0 +1,109 @@
+from typing import Any
+
+import orjson
+import zstandard
+from fastapi_cache.coder import Coder
+from sqlalchemy import Row
+
+from app.config import settings
+
+ZSTD = 'zstd'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def _encode_default(value: Any) -> Any:
+    if isinstance(value, Row):
+        return value._asdict()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def encode_json(value: Any) -> bytes:
+    return orjson.dumps(value, default=_encode_default)
+
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """Допускает ли заголовок Accept-Encoding кодировку (q=0 - запрет).
+
+    Явно названная кодировка важнее '*' независимо от порядка.
+    """
+    wildcard = None
+    for item in accept_encoding.split(','):
+        name, *params = (part.strip() for part in item.split(';'))
+        name = name.lower()
+        if name not in (encoding, '*'):
+            continue
+        accepted = True
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    accepted = float(value) > 0
+                except ValueError:
+                    accepted = False
+                break
+        if name == encoding:
+            return accepted
+        wildcard = accepted
+    return bool(wildcard)
+
+
+class OrjsonCoder(Coder):
+    """Значение кэша - готовые JSON-байты ответа без сжатия."""
+
+    content_encoding: str | None = None
+
+    @classmethod
+    def compress(cls, payload: bytes) -> bytes:
+        return payload
+
+    @classmethod
+    def is_compressed(cls, value: bytes) -> bool:
+        return False
+
+    @classmethod
+    def to_json(cls, value: bytes) -> bytes:
+        return value
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        return cls.compress(encode_json(value))
+
+    @classmethod
+    def decode(cls, value: bytes) -> Any:
+        return orjson.loads(cls.to_json(value))
+
+
+class ZstdCoder(OrjsonCoder):
+    """JSON-байты, сжатые zstd, если они не короче threshold и сжимаются.
+
+    Сжатое значение отличается от JSON сигнатурой кадра zstd, поэтому
+    записи, сохранённые без сжатия, читаются как есть. Сжатые байты
+    отдаются клиенту без распаковки, если он принимает zstd.
+    """
+
+    content_encoding = ZSTD
+    threshold = settings.cache_compress_threshold
+    level = settings.cache_compress_level
+
+    @classmethod
+    def compress(cls, payload: bytes) -> bytes:
+        if len(payload) < cls.threshold:
+            return payload
+        value = zstandard.ZstdCompressor(level=cls.level).compress(payload)
+        return value if len(value) < len(payload) else payload
+
+    @classmethod
+    def is_compressed(cls, value: bytes) -> bool:
+        return value[:4] == ZSTD_MAGIC
+
+    @classmethod
+    def to_json(cls, value: bytes) -> bytes:
+        if cls.is_compressed(value):
+            return zstandard.ZstdDecompressor().decompress(value)
+        return value
+
+
+CODERS: dict[str | None, type[OrjsonCoder]] = {
+    None: OrjsonCoder,
+    ZSTD: ZstdCoder,
+}
@@ -0,0 +1,120 @@
+import zlib
+from typing import Callable
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.coders import accepts_encoding
+from app.config import settings
+
+BROTLI = 'br'
+GZIP = 'gzip'
+ENCODINGS = (BROTLI, GZIP)
+GZIP_WBITS = zlib.MAX_WBITS | 16
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+
+StreamCompressor = tuple[Callable[[bytes], bytes], Callable[[], bytes]]
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """Кодировка ответа: brotli, затем gzip, если клиент их принимает."""
+    for encoding in ENCODINGS:
+        if accepts_encoding(accept_encoding, encoding):
+            return encoding
+    return None
+
+
+def stream_compressor(encoding: str) -> StreamCompressor:
+    if encoding == BROTLI:
+        compressor = brotli.Compressor(quality=settings.brotli_quality)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(
+        settings.gzip_level, zlib.DEFLATED, GZIP_WBITS
+    )
+    return compressor.compress, compressor.flush
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    process, finish = stream_compressor(encoding)
+    return process(body) + finish()
+
+
+class CompressionMiddleware:
+    """Сжимает ответы brotli или gzip по заголовку Accept-Encoding.
+
+    Ответы с уже заданным Content-Encoding (сжатые тела из кэша),
+    ответы короче minimum_size и потоки событий, которые должны
+    доходить до клиента без задержки в буфере сжатия, передаются
+    как есть. Потоковые ответы сжимаются по частям.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = settings.compression_min_size,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(
+            Headers(scope=scope).get('accept-encoding', '')
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start: Message | None = None
+        self.compressor: StreamCompressor | None = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message['type'] == 'http.response.start':
+            self.start = message
+            return
+        if message['type'] != 'http.response.body' or self.passthrough:
+            await self._send(message)
+            return
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start['headers'])
+            if (
+                'content-encoding' in headers
+                or headers.get('content-type', '').startswith(
+                    UNCOMPRESSED_TYPES
+                )
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                self.passthrough = True
+                await self._send(self.start)
+                await self._send(message)
+                return
+            self.compressor = stream_compressor(self.encoding)
+            headers['Content-Encoding'] = self.encoding
+            headers.add_vary_header('Accept-Encoding')
+            del headers['content-length']
+            if not more_body:
+                body = compress(body, self.encoding)
+                headers['Content-Length'] = str(len(body))
+                await self._send(self.start)
+                await self._send({**message, 'body': body})
+                return
+            await self._send(self.start)
+        process, finish = self.compressor
+        body = process(body)
+        if not more_body:
+            body += finish()
+        await self._send({**message, 'body': body})
@@ -1,13 +1,57 @@
+from typing import Literal
+
 from pydantic import BaseSettings
 
 
 class Settings(BaseSettings):
     app_title: str = 'SPIMEX API'
     description: str = 'Cервис для получения данных по итогам торгов'
-    max_days_range: int = 7
+    max_days_range: int = 31
     max_days_limit: int = 365
+    page_size: int = 500
+    max_page_size: int = 5000
+    max_batch_size: int = 50
+    max_export_days_range: int = 366 * 5
+    export_chunk_size: int = 1000
+    max_aggregate_days_range: int = 366 * 5
+    analytics_window: int = 5
     expire_cache: int = 60 * 60 * 24
-    clear_cache_time: dict = {'hour': 14, 'minute': 11}
+    stale_cache: int = 60 * 60
+    client_max_age: int = 60
+    revalidate_lock_timeout: int = 60
+    memory_cache_size: int = 64 * 1024 * 1024
+    memory_cache_expire: int = 60
+    cache_compression: Literal['zstd'] | None = 'zstd'
+    cache_compress_threshold: int = 1024
+    cache_compress_level: int = 3
+    compression_min_size: int = 1024
+    gzip_level: int = 6
+    brotli_quality: int = 4
+    encoded_cache_size: int = 32 * 1024 * 1024
+    data_check_interval: int = 60
+    leader_lease: int = 30
+    sse_heartbeat: float = 15
+    warmup_keys: int = 20
+    warmup_tracked_keys: int = 1000
+    warmup_concurrency: int = 4
+    warmup_decay: float = 0.5
+    partition_interval: Literal['month', 'year'] | None = None
+    partitions_ahead: int = 2
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 30 * 60
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 100
+    db_prepared_statement_cache_size: int = 100
+    db_unique_statement_names: bool = False
+    replica_urls: list[str] = []
+    replica_routing: Literal['round-robin', 'least-connections'] = (
+        'round-robin'
+    )
+    replica_check_timeout: float = 5
+    ingest_token: str | None = None
+    ingest_batch_size: int = 50_000
     mode: str
     database_url: str
     redis_cache_url: str
@@ -1,20 +1,75 @@
-from datetime import date
+from datetime import date, datetime
+from operator import itemgetter
+from typing import AsyncIterator, Sequence
 
-from sqlalchemy import desc, distinct, func, select
+from sqlalchemy import (
+    BigInteger,
+    CompoundSelect,
+    Date,
+    Float,
+    Row,
+    Select,
+    and_,
+    cast,
+    delete,
+    desc,
+    exists,
+    func,
+    literal,
+    or_,
+    select,
+    union,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import TradingResults
-from app.schemas import DynamicTradingResultsQuery, TradingResultsQuery
+from app.config import settings
+from app.db import DailyRollup, TradingResults
+from app.pagination import SortKey, decode_cursor, paginate
+from app.schemas import (
+    AggregatePeriod,
+    AggregateQuery,
+    AnalyticsQuery,
+    DynamicTradingResultsQuery,
+    PaginationQuery,
+    TradingResultsDB,
+    TradingResultsQuery,
+)
+from app.trading_calendar import trading_calendar
 
+OUTPUT_COLUMNS = tuple(
+    getattr(TradingResults, name) for name in TradingResultsDB.__fields__
+)
+OUTPUT_NAMES = tuple(TradingResultsDB.__fields__)
+PageRequest = tuple[
+    TradingResultsQuery | DynamicTradingResultsQuery,
+    PaginationQuery,
+    Sequence[str] | None,
+]
+ORDERING = (desc(TradingResults.date), TradingResults.exchange_product_id)
+BATCH_INDEX = 'batch_index'
+ROLLUP_GROUP = ('date', 'oil_id', 'delivery_basis_id', 'delivery_type_id')
+ROLLUP_SUMS = ('volume', 'total', 'count')
+AGGREGATE_PERIODS = {
+    AggregatePeriod.DAY: DailyRollup.date,
+    AggregatePeriod.WEEK: cast(
+        func.date_trunc('week', DailyRollup.date), Date
+    ),
+}
 
-async def read_trading_results_from_db(
-    session: AsyncSession,
+
+def filter_conditions(
     filters: TradingResultsQuery | DynamicTradingResultsQuery,
     *,
     last: bool = False,
-) -> list[TradingResults]:
+    after: SortKey | None = None,
+    trading_date: date | None = None,
+) -> list:
     conditions = []
-    if last:
+    if trading_date is not None:
+        conditions.append(TradingResults.date == trading_date)
+    elif last:
         max_date = select(func.max(TradingResults.date)).scalar_subquery()
         conditions.append(TradingResults.date == max_date)
     if filters.oil_id is not None:
@@ -31,22 +86,331 @@ async def read_trading_results_from_db(
         conditions.append(
             TradingResults.date.between(filters.start_date, filters.end_date)
         )
+    if after is not None:
+        after_date, after_product_id = after
+        conditions.append(TradingResults.date <= after_date)
+        conditions.append(
+            or_(
+                TradingResults.date < after_date,
+                and_(
+                    TradingResults.date == after_date,
+                    TradingResults.exchange_product_id > after_product_id,
+                ),
+            )
+        )
+    return conditions
+
+
+async def read_trading_results_from_db(
+    session: AsyncSession,
+    filters: TradingResultsQuery | DynamicTradingResultsQuery,
+    *,
+    last: bool = False,
+    limit: int | None = None,
+    after: SortKey | None = None,
+) -> list[TradingResults]:
     request = (
         select(TradingResults)
+        .where(*filter_conditions(filters, last=last, after=after))
+        .order_by(*ORDERING)
+        .limit(limit)
+    )
+    result = await session.execute(request)
+    return result.scalars().all()
+
+
+def output_columns(fields: Sequence[str] | None = None) -> tuple:
+    if fields is None:
+        return OUTPUT_COLUMNS
+    return tuple(getattr(TradingResults, name) for name in fields)
+
+
+def trading_rows_query(
+    filters: TradingResultsQuery | DynamicTradingResultsQuery,
+    *,
+    last: bool = False,
+    limit: int | None = None,
+    after: SortKey | None = None,
+    trading_date: date | None = None,
+    fields: Sequence[str] | None = None,
+) -> Select:
+    conditions = filter_conditions(
+        filters, last=last, after=after, trading_date=trading_date
+    )
+    return (
+        select(*output_columns(fields))
         .where(*conditions)
-        .order_by(
-            desc(TradingResults.date), TradingResults.exchange_product_id
+        .order_by(*ORDERING)
+        .limit(limit)
+    )
+
+
+async def read_trading_rows(
+    session: AsyncSession,
+    filters: TradingResultsQuery | DynamicTradingResultsQuery,
+    *,
+    last: bool = False,
+    limit: int | None = None,
+    after: SortKey | None = None,
+    trading_date: date | None = None,
+    fields: Sequence[str] | None = None,
+) -> list[Row]:
+    request = trading_rows_query(
+        filters,
+        last=last,
+        limit=limit,
+        after=after,
+        trading_date=trading_date,
+        fields=fields,
+    )
+    result = await session.execute(request)
+    return result.all()
+
+
+async def stream_trading_results(
+    session: AsyncSession,
+    filters: DynamicTradingResultsQuery,
+    chunk_size: int = settings.export_chunk_size,
+    fields: Sequence[str] | None = None,
+) -> AsyncIterator[list[Row]]:
+    request = (
+        select(*output_columns(fields))
+        .where(*filter_conditions(filters))
+        .order_by(*ORDERING)
+        .execution_options(yield_per=chunk_size)
+    )
+    result = await session.stream(request)
+    async for rows in result.partitions():
+        yield rows
+
+
+async def read_trading_results_page(
+    session: AsyncSession,
+    filters: TradingResultsQuery | DynamicTradingResultsQuery,
+    page: PaginationQuery,
+    *,
+    last: bool = False,
+    fields: Sequence[str] | None = None,
+) -> dict:
+    rows = await read_trading_rows(
+        session,
+        filters,
+        last=last,
+        limit=page.limit + 1,
+        after=decode_cursor(page.cursor) if page.cursor else None,
+        trading_date=await trading_calendar.latest(session) if last else None,
+        fields=fields,
+    )
+    return paginate(rows, page.limit)
+
+
+async def read_trading_pages(
+    session: AsyncSession,
+    requests: list[PageRequest],
+) -> list[dict]:
+    """Страницы нескольких выборок одним запросом (UNION ALL).
+
+    Выборки без периода - последние торги. Строки каждой выборки
+    помечаются её номером, по нему результат раскладывается обратно.
+    Все выборки читают полный набор столбцов, а выбранные поля
+    оставляются уже при раскладке.
+    """
+    last = any(
+        not isinstance(filters, DynamicTradingResultsQuery)
+        for filters, *_ in requests
+    )
+    trading_date = await trading_calendar.latest(session) if last else None
+    queries = []
+    for index, (filters, page, _) in enumerate(requests):
+        dynamic = isinstance(filters, DynamicTradingResultsQuery)
+        queries.append(
+            trading_rows_query(
+                filters,
+                last=not dynamic,
+                limit=page.limit + 1,
+                after=decode_cursor(page.cursor) if page.cursor else None,
+                trading_date=None if dynamic else trading_date,
+            ).add_columns(literal(index).label(BATCH_INDEX))
         )
+    grouped = [[] for _ in requests]
+    for row in await session.execute(union_all(*queries)):
+        grouped[row[-1]].append(row)
+    pages = []
+    for rows, (_, page, fields) in zip(grouped, requests):
+        result = paginate(rows, page.limit)
+        names = OUTPUT_NAMES if fields is None else tuple(fields)
+        values = itemgetter(*map(OUTPUT_NAMES.index, names))
+        result['results'] = [
+            dict(zip(names, values(row))) for row in result['results']
+        ]
+        pages.append(result)
+    return pages
+
+
+async def get_trading_dates(session: AsyncSession, days: int) -> list[date]:
+    return await trading_calendar.last_dates(session, days)
+
+
+async def get_data_version(
+    session: AsyncSession,
+) -> tuple[date | None, datetime | None]:
+    request = select(
+        func.max(TradingResults.date), func.max(TradingResults.updated_on)
     )
     result = await session.execute(request)
+    return tuple(result.one())
+
+
+def changed_dates_query(
+    max_date: date | None, updated_on: datetime | None
+) -> Select | CompoundSelect:
+    """Даты новее max_date и даты строк, обновлённых после updated_on.
+
+    Условия объединяются через UNION, а не OR: так каждое читает свой
+    индекс (uix_date_product и ix_updated_on_date), а не весь индекс
+    дат с фильтром по updated_on. Повторы дат убирает сам UNION.
+    """
+    conditions = []
+    if max_date is not None:
+        conditions.append(TradingResults.date > max_date)
+    if updated_on is not None:
+        conditions.append(TradingResults.updated_on > updated_on)
+    if len(conditions) < 2:
+        return (
+            select(TradingResults.date)
+            .distinct()
+            .where(*conditions)
+            .order_by(TradingResults.date)
+        )
+    return union(
+        *(select(TradingResults.date).where(cond) for cond in conditions)
+    ).order_by(TradingResults.date.name)
+
+
+async def get_changed_dates(
+    session: AsyncSession,
+    max_date: date | None,
+    updated_on: datetime | None,
+) -> list[date]:
+    result = await session.execute(changed_dates_query(max_date, updated_on))
     return result.scalars().all()
 
 
-async def get_trading_dates(session: AsyncSession, days: int) -> list[date]:
+async def sync_rollups(
+    session: AsyncSession, dates: list[date] | None = None
+) -> list[date]:
+    """Пересчитывает дневные итоги для дат, изменившихся с прошлого раза.
+
+    Отметка - последняя дата и максимальный updated_on уже посчитанных
+    итогов, поэтому пустая таблица итогов заполняется целиком. Даты,
+    изменённые известным источником (загрузкой), передаются в dates
+    и пересчитываются без поиска по отметке.
+    """
+    full = False
+    if dates is None:
+        watermark = await session.execute(
+            select(
+                func.max(DailyRollup.date), func.max(DailyRollup.updated_on)
+            )
+        )
+        max_date, updated_on = watermark.one()
+        dates = await get_changed_dates(session, max_date, updated_on)
+        full = max_date is None
+    if not dates:
+        return []
+    conditions = [] if full else [TradingResults.date.in_(dates)]
+    group = [getattr(TradingResults, name) for name in ROLLUP_GROUP]
+    source = (
+        select(
+            *group,
+            *(func.sum(getattr(TradingResults, name)) for name in ROLLUP_SUMS),
+            func.max(TradingResults.updated_on),
+        )
+        .where(*conditions)
+        .group_by(*group)
+    )
+    columns = [*ROLLUP_GROUP, *ROLLUP_SUMS, 'updated_on']
+    request = insert(DailyRollup).from_select(columns, source)
+    await session.execute(
+        request.on_conflict_do_update(
+            index_elements=ROLLUP_GROUP,
+            set_={
+                name: request.excluded[name]
+                for name in (*ROLLUP_SUMS, 'updated_on')
+            },
+        )
+    )
+    await session.execute(
+        delete(DailyRollup).where(
+            DailyRollup.date.in_(dates),
+            ~exists().where(
+                *(
+                    getattr(TradingResults, name) == getattr(DailyRollup, name)
+                    for name in ROLLUP_GROUP
+                )
+            ),
+        )
+    )
+    await session.commit()
+    return dates
+
+
+async def read_aggregates(
+    session: AsyncSession, filters: AggregateQuery
+) -> list[Row]:
+    period = AGGREGATE_PERIODS[filters.period]
+    key = getattr(DailyRollup, filters.group_by.value)
+    volume = func.sum(DailyRollup.volume)
+    total = func.sum(DailyRollup.total)
+    conditions = [
+        DailyRollup.date.between(filters.start_date, filters.end_date)
+    ]
+    for name in ('oil_id', 'delivery_basis_id', 'delivery_type_id'):
+        value = getattr(filters, name)
+        if value is not None:
+            conditions.append(getattr(DailyRollup, name) == value)
+    request = (
+        select(
+            period.label('date'),
+            key.label('key'),
+            cast(volume, BigInteger).label('volume'),
+            cast(total, BigInteger).label('total'),
+            cast(func.sum(DailyRollup.count), BigInteger).label('count'),
+            (cast(total, Float) / func.nullif(volume, 0)).label('avg_price'),
+        )
+        .where(*conditions)
+        .group_by(period, key)
+        .order_by(desc(period), key)
+    )
+    result = await session.execute(request)
+    return result.all()
+
+
+async def read_price_rows(
+    session: AsyncSession, filters: AnalyticsQuery
+) -> list[Row]:
+    """Дневные (date, volume, total) по инструменту в порядке дат.
+
+    Ряд по нефтепродукту собирается из дневных итогов, по конкретному
+    инструменту - из исходной таблицы.
+    """
+    table = DailyRollup
+    conditions = []
+    if filters.exchange_product_id is not None:
+        table = TradingResults
+        conditions.append(
+            TradingResults.exchange_product_id == filters.exchange_product_id
+        )
+    conditions.append(table.date.between(filters.start_date, filters.end_date))
+    for name in ('oil_id', 'delivery_basis_id', 'delivery_type_id'):
+        value = getattr(filters, name)
+        if value is not None:
+            conditions.append(getattr(table, name) == value)
     request = (
-        select(distinct(TradingResults.date))
-        .order_by(desc(TradingResults.date))
-        .limit(days)
+        select(table.date, func.sum(table.volume), func.sum(table.total))
+        .where(*conditions)
+        .group_by(table.date)
+        .order_by(table.date)
     )
     result = await session.execute(request)
-    return result.scalars().all()
+    return result.all()
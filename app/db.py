@@ -1,10 +1,12 @@
 from datetime import datetime as dt
 
 from sqlalchemy import (
+    BigInteger,
     Column,
     Computed,
     Date,
     DateTime,
+    Index,
     Integer,
     String,
     UniqueConstraint,
@@ -13,24 +15,39 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from app.config import settings
+from app.pool import engine_options
+from app.replicas import ReplicaRouter
 
 Base = declarative_base()
-engine = create_async_engine(settings.database_url)
+engine = create_async_engine(settings.database_url, **engine_options())
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession)
+replica_router = ReplicaRouter(
+    AsyncSessionLocal, settings.replica_urls, settings.replica_routing
+)
 
 
-async def get_async_session():
+async def get_primary_session():
     async with AsyncSessionLocal() as session:
         yield session
 
 
+async def get_async_session():
+    """Сессия для эндпоинтов чтения: на реплике, если она не отстаёт."""
+    async with replica_router.session_factory()() as session:
+        yield session
+
+
 UNIQUE_COLUMNS = ('date', 'exchange_product_id')
+UNIQUE_CONSTRAINT = 'uix_date_product'
 
 
 class TradingResults(Base):
     __tablename__ = 'spimex_trading_results'
     __table_args__ = (
-        UniqueConstraint(*UNIQUE_COLUMNS, name='uix_date_product'),
+        UniqueConstraint(*UNIQUE_COLUMNS, name=UNIQUE_CONSTRAINT),
+        Index('ix_oil_date', 'oil_id', 'date'),
+        Index('ix_delivery_basis_date', 'delivery_basis_id', 'date'),
+        Index('ix_updated_on_date', 'updated_on', postgresql_include=['date']),
     )
 
     id = Column(Integer, primary_key=True, comment='Уникальный идентификатор')
@@ -69,3 +86,23 @@ class TradingResults(Base):
         onupdate=dt.now,
         comment='Дата и время обновления записи',
     )
+
+
+class DailyRollup(Base):
+    __tablename__ = 'spimex_daily_rollups'
+    __table_args__ = (Index('ix_rollup_updated_on', 'updated_on'),)
+
+    date = Column(Date, primary_key=True, comment='Дата торгов')
+    oil_id = Column(String, primary_key=True, comment='ID нефтепродукта')
+    delivery_basis_id = Column(
+        String, primary_key=True, comment='ID базиса поставки'
+    )
+    delivery_type_id = Column(
+        String, primary_key=True, comment='ID типа поставки'
+    )
+    volume = Column(BigInteger, comment='Суммарный объем Договоров')
+    total = Column(BigInteger, comment='Суммарный объем Договоров, руб.')
+    count = Column(BigInteger, comment='Суммарное количество Договоров')
+    updated_on = Column(
+        DateTime, comment='Максимальный updated_on строк группы'
+    )
@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+from datetime import date
+from typing import AsyncIterator, Callable, Iterable, Sequence
+
+from sqlalchemy import Row
+
+from app.schemas import ExportFormat, TradingResultsDB
+
+EXPORT_COLUMNS = tuple(TradingResultsDB.__fields__)
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: 'application/x-ndjson',
+    ExportFormat.CSV: 'text/csv',
+}
+FILENAME = 'spimex_{start_date}_{end_date}.{extension}'
+
+
+def encode_ndjson(rows: Iterable[Row]) -> bytes:
+    return b''.join(
+        json.dumps(
+            dict(row._mapping), ensure_ascii=False, default=date.isoformat
+        ).encode()
+        + b'\n'
+        for row in rows
+    )
+
+
+def encode_csv(rows: Iterable[Row]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def csv_header(columns: Sequence[str] = EXPORT_COLUMNS) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns)
+    return buffer.getvalue().encode()
+
+
+ENCODERS: dict[ExportFormat, Callable[[Iterable[Row]], bytes]] = {
+    ExportFormat.NDJSON: encode_ndjson,
+    ExportFormat.CSV: encode_csv,
+}
+
+
+async def encode_stream(
+    chunks: AsyncIterator[list[Row]],
+    export_format: ExportFormat,
+    columns: Sequence[str] | None = None,
+) -> AsyncIterator[bytes]:
+    if export_format is ExportFormat.CSV:
+        yield csv_header(columns or EXPORT_COLUMNS)
+    encode = ENCODERS[export_format]
+    async for rows in chunks:
+        yield encode(rows)
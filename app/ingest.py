@@ -0,0 +1,275 @@
+"""Загрузка результатов торгов: COPY во временную таблицу и слияние.
+
+Принимает CSV с заголовком или NDJSON в формате выгрузки /api/export
+(лишние столбцы игнорируются, одна запись на строку):
+    python -m app.ingest results.csv --format csv
+    python -m app.ingest - --format ndjson < results.ndjson
+"""
+
+import argparse
+import asyncio
+import csv
+import sys
+from datetime import date, datetime
+from typing import AsyncIterator, Iterable
+
+import orjson
+from fastapi_cache import FastAPICache
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Date,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    distinct,
+    func,
+    literal,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import PipelinedRedisBackend, init_cache, redis_client
+from app.config import settings
+from app.db import UNIQUE_CONSTRAINT, AsyncSessionLocal, TradingResults
+from app.partitions import MONTH, TABLE, create_partitions, is_partitioned
+from app.schemas import ExportFormat
+from app.tasks import apply_ingest_task
+
+INGEST_COLUMNS = (
+    'exchange_product_id',
+    'exchange_product_name',
+    'delivery_basis_name',
+    'volume',
+    'total',
+    'count',
+    'date',
+)
+UPDATE_COLUMNS = INGEST_COLUMNS[1:-1]
+POSITION = 'position'
+STAGING_COLUMNS = (POSITION, *INGEST_COLUMNS)
+READ_CHUNK_SIZE = 1024 * 1024
+ROW_ERROR = 'Строка {line}: {error}'
+HEADER_ERROR = 'В заголовке CSV нет столбцов: {}'
+
+staging = Table(
+    'spimex_ingest',
+    MetaData(),
+    Column(POSITION, BigInteger),
+    Column('exchange_product_id', String),
+    Column('exchange_product_name', String),
+    Column('delivery_basis_name', String),
+    Column('volume', Integer),
+    Column('total', Integer),
+    Column('count', Integer),
+    Column('date', Date),
+    prefixes=['TEMPORARY'],
+)
+
+
+class IngestError(ValueError):
+    pass
+
+
+def to_record(line: int, values: Iterable) -> tuple:
+    try:
+        product, name, basis, volume, total, count, day = values
+        return (
+            line,
+            product,
+            name,
+            basis,
+            int(volume),
+            int(total),
+            int(count),
+            date.fromisoformat(day),
+        )
+    except (TypeError, ValueError) as error:
+        raise IngestError(ROW_ERROR.format(line=line, error=error)) from None
+
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[str]]:
+    """Полные строки из потока байтов, пачками по мере поступления."""
+    tail = b''
+    async for chunk in chunks:
+        *lines, tail = (tail + chunk).split(b'\n')
+        if lines:
+            yield [line.decode() for line in lines if line.strip()]
+    if tail.strip():
+        yield [tail.decode()]
+
+
+async def parse_ndjson(
+    lines: AsyncIterator[list[str]],
+) -> AsyncIterator[list[tuple]]:
+    number = 0
+    async for batch in lines:
+        records = []
+        for line in batch:
+            number += 1
+            try:
+                row = orjson.loads(line)
+                values = [row[name] for name in INGEST_COLUMNS]
+            except (orjson.JSONDecodeError, KeyError, TypeError) as error:
+                raise IngestError(
+                    ROW_ERROR.format(line=number, error=error)
+                ) from None
+            records.append(to_record(number, values))
+        yield records
+
+
+async def parse_csv(
+    lines: AsyncIterator[list[str]],
+) -> AsyncIterator[list[tuple]]:
+    indices, number = None, 0
+    async for batch in lines:
+        rows = csv.reader(batch)
+        if indices is None:
+            header = next(rows, None)
+            if header is None:
+                continue
+            number += 1
+            missing = set(INGEST_COLUMNS) - set(header)
+            if missing:
+                raise IngestError(HEADER_ERROR.format(', '.join(missing)))
+            indices = [header.index(name) for name in INGEST_COLUMNS]
+        records = []
+        for row in rows:
+            number += 1
+            try:
+                values = [row[index] for index in indices]
+            except IndexError as error:
+                raise IngestError(
+                    ROW_ERROR.format(line=number, error=error)
+                ) from None
+            records.append(to_record(number, values))
+        yield records
+
+
+PARSERS = {ExportFormat.NDJSON: parse_ndjson, ExportFormat.CSV: parse_csv}
+
+
+async def ingest(
+    session: AsyncSession, batches: AsyncIterator[list[tuple]]
+) -> tuple[int, list[date]]:
+    """Загружает записи и возвращает их число и изменившиеся даты.
+
+    Записи копируются во временную таблицу через COPY и сливаются
+    в spimex_trading_results по uix_date_product одним запросом.
+    Из повторов одного инструмента за дату берётся последний, строки
+    без изменений не обновляются и не меняют updated_on. Отметки
+    времени ставятся по часам приложения, как у значений по умолчанию
+    модели, а не LOCALTIMESTAMP базы. В секционированную таблицу
+    до слияния добавляются секции на весь диапазон дат загрузки,
+    иначе загрузка истории вне созданных секций упала бы. Фиксирует
+    транзакцию вызывающий код.
+    """
+    connection = await session.connection()
+    await connection.run_sync(staging.create)
+    driver = (await connection.get_raw_connection()).driver_connection
+    rows, buffer = 0, []
+    async for batch in batches:
+        buffer.extend(batch)
+        if len(buffer) < settings.ingest_batch_size:
+            continue
+        await driver.copy_records_to_table(
+            staging.name, records=buffer, columns=STAGING_COLUMNS
+        )
+        rows, buffer = rows + len(buffer), []
+    if buffer:
+        await driver.copy_records_to_table(
+            staging.name, records=buffer, columns=STAGING_COLUMNS
+        )
+        rows += len(buffer)
+    if await is_partitioned(connection, TABLE):
+        first, last = (
+            await session.execute(
+                select(func.min(staging.c.date), func.max(staging.c.date))
+            )
+        ).one()
+        if first is not None:
+            await create_partitions(
+                connection, first, last, settings.partition_interval or MONTH
+            )
+    now = literal(datetime.now(), DateTime)
+    source = (
+        select(*(staging.c[name] for name in INGEST_COLUMNS), now, now)
+        .distinct(staging.c.date, staging.c.exchange_product_id)
+        .order_by(
+            staging.c.date,
+            staging.c.exchange_product_id,
+            staging.c[POSITION].desc(),
+        )
+    )
+    request = insert(TradingResults).from_select(
+        [*INGEST_COLUMNS, 'created_on', 'updated_on'], source
+    )
+    merged = (
+        request.on_conflict_do_update(
+            constraint=UNIQUE_CONSTRAINT,
+            set_={
+                name: request.excluded[name]
+                for name in (*UPDATE_COLUMNS, 'updated_on')
+            },
+            where=tuple_(
+                *(getattr(TradingResults, name) for name in UPDATE_COLUMNS)
+            ).is_distinct_from(
+                tuple_(*(request.excluded[name] for name in UPDATE_COLUMNS))
+            ),
+        )
+        .returning(TradingResults.date)
+        .cte('merged')
+    )
+    changed = await session.execute(
+        select(distinct(merged.c.date)).order_by(merged.c.date)
+    )
+    dates = changed.scalars().all()
+    await connection.run_sync(staging.drop)
+    return rows, dates
+
+
+async def read_file(path: str) -> AsyncIterator[bytes]:
+    stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    try:
+        while chunk := stream.read(READ_CHUNK_SIZE):
+            yield chunk
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+async def main():
+    import app.api  # noqa: F401 - регистрирует кэшируемые эндпоинты
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='файл или - для stdin')
+    parser.add_argument(
+        '--format',
+        type=ExportFormat,
+        choices=list(ExportFormat),
+        default=ExportFormat.CSV,
+    )
+    args = parser.parse_args()
+    init_cache(PipelinedRedisBackend(redis_client))
+    try:
+        async with AsyncSessionLocal() as session:
+            rows, dates = await ingest(
+                session,
+                PARSERS[args.format](read_lines(read_file(args.path))),
+            )
+            await session.commit()
+        print(f'Загружено строк: {rows}, изменились даты: {len(dates)}')
+        if dates and FastAPICache.get_enable():
+            await apply_ingest_task(dates)
+    except IngestError as error:
+        sys.exit(str(error))
+    finally:
+        await redis_client.aclose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Iterable, NamedTuple
+
+import orjson
+from fastapi_cache import FastAPICache
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import (
+    INVALIDATE_ALL,
+    INVALIDATE_DATE_RANGE,
+    cached_endpoints,
+    key_params,
+    redis_client,
+)
+from app.chunks import day_chunks
+from app.config import settings
+from app.crud import get_changed_dates, get_data_version
+from app.trading_calendar import trading_calendar
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSION_KEY = '{prefix}-data-version'
+DATA_VERSION_CHANNEL = '{prefix}-data-version-changed'
+LISTEN_RETRY_DELAY = 5
+VERSION_BUMP = timedelta(seconds=1)
+
+
+class DataVersion(NamedTuple):
+    max_date: date | None = None
+    updated_on: datetime | None = None
+
+    @property
+    def token(self) -> str | None:
+        if self.max_date is None:
+            return None
+        updated_on = self.updated_on and int(self.updated_on.timestamp())
+        return f'{self.max_date:%Y%m%d}.{updated_on}'
+
+    def since(self, stored: 'DataVersion', bump: timedelta) -> 'DataVersion':
+        """Версия с updated_on не меньше сохранённой плюс bump.
+
+        Сохранённая версия могла быть сдвинута вперёд (apply_changes),
+        и возврат к updated_on из базы вернул бы прежний ETag.
+        """
+        if self.updated_on is None or stored.updated_on is None:
+            return self
+        return self._replace(
+            updated_on=max(self.updated_on, stored.updated_on + bump)
+        )
+
+    def dumps(self) -> bytes:
+        return orjson.dumps(self._asdict())
+
+    @classmethod
+    def loads(cls, raw: bytes) -> 'DataVersion':
+        version = orjson.loads(raw)
+        return cls(
+            max_date=version['max_date']
+            and date.fromisoformat(version['max_date']),
+            updated_on=version['updated_on']
+            and datetime.fromisoformat(version['updated_on']),
+        )
+
+
+def key_covers(key: str, dates: Iterable[date]) -> bool:
+    params = key_params(key)
+    if 'start_date' not in params or 'end_date' not in params:
+        return True
+    start_date = date.fromisoformat(params['start_date'])
+    end_date = date.fromisoformat(params['end_date'])
+    return any(start_date <= changed <= end_date for changed in dates)
+
+
+class DataWatcher:
+    """Следит за версией данных торгов и удаляет устаревшие ключи кэша.
+
+    Версия (последняя дата торгов и максимальный updated_on) хранится
+    в Redis, поэтому изменения, пропущенные во время простоя сервиса,
+    обнаруживаются при следующей проверке. Календарь торгов обновляется
+    до удаления ключей, чтобы пересчитанные ответы уже видели новые
+    даты. Новая версия публикуется в канал Redis, остальные воркеры
+    узнают о ней через listen.
+    """
+
+    def __init__(self):
+        self.version = DataVersion()
+
+    @property
+    def version_key(self) -> str:
+        return DATA_VERSION_KEY.format(prefix=FastAPICache.get_prefix())
+
+    @property
+    def channel(self) -> str:
+        return DATA_VERSION_CHANNEL.format(prefix=FastAPICache.get_prefix())
+
+    async def stored(self) -> DataVersion | None:
+        raw = await redis_client.get(self.version_key)
+        return None if raw is None else DataVersion.loads(raw)
+
+    async def listen(
+        self, on_change: Callable[[DataVersion], Awaitable[None]]
+    ) -> None:
+        """Вызывает on_change для каждой опубликованной новой версии."""
+        while True:
+            try:
+                async with redis_client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message['type'] != 'message':
+                            continue
+                        version = DataVersion.loads(message['data'])
+                        if version != self.version:
+                            await on_change(version)
+            except Exception:
+                logger.warning('Data version listener failed', exc_info=True)
+                await asyncio.sleep(LISTEN_RETRY_DELAY)
+
+    async def refresh(self, session: AsyncSession) -> list[date]:
+        current = DataVersion(*await get_data_version(session))
+        stored = await self.stored()
+        if stored is not None:
+            current = current.since(stored, timedelta())
+        if current == stored:
+            self.version = current
+            return []
+        if stored is None:
+            await trading_calendar.update(session)
+            await FastAPICache.clear()
+            changed = []
+        else:
+            changed = await get_changed_dates(
+                session, stored.max_date, stored.updated_on
+            )
+            await trading_calendar.update(session, changed)
+            await self.invalidate(changed)
+        await self.save(current)
+        return changed
+
+    async def apply_changes(
+        self, session: AsyncSession, dates: list[date]
+    ) -> None:
+        """Удаляет ключи дат, изменённых известным источником (загрузкой).
+
+        Даты не ищутся по updated_on, поэтому не теряются и строки
+        с отметкой времени ниже сохранённой версии (часы другого
+        процесса отстают). Версия данных сдвигается не меньше чем на
+        VERSION_BUMP, даже если max(updated_on) в базе не вырос: иначе
+        ETag остался бы прежним.
+        """
+        current = DataVersion(*await get_data_version(session))
+        stored = await self.stored() or self.version
+        current = current.since(stored, VERSION_BUMP)
+        await trading_calendar.update(session, dates)
+        await self.invalidate(dates)
+        await self.save(current)
+
+    async def save(self, version: DataVersion) -> None:
+        await redis_client.set(self.version_key, version.dumps())
+        await redis_client.publish(self.channel, version.dumps())
+        self.version = version
+
+    async def invalidate(self, dates: list[date]) -> None:
+        if not dates:
+            return
+        backend = FastAPICache.get_backend()
+        prefix = FastAPICache.get_prefix()
+        for namespace, endpoint in cached_endpoints.items():
+            if not endpoint.store:
+                continue
+            if endpoint.invalidate == INVALIDATE_ALL:
+                await FastAPICache.clear(namespace=namespace)
+            elif endpoint.invalidate == INVALIDATE_DATE_RANGE:
+                async for key in redis_client.scan_iter(
+                    match=f'{prefix}:{namespace}:*'
+                ):
+                    key = key.decode()
+                    if key_covers(key, dates):
+                        await backend.clear(key=key)
+        await day_chunks.invalidate(dates)
+
+
+data_watcher = DataWatcher()
+
+
+def data_version_token() -> str | None:
+    return data_watcher.version.token
+
+
+def closed_range_expire(kwargs: dict[str, Any]) -> int | None:
+    max_date = data_watcher.version.max_date
+    filters = kwargs['filters']
+    if max_date is not None and filters.end_date < max_date:
+        return None
+    return settings.expire_cache
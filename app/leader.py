@@ -0,0 +1,92 @@
+import logging
+from functools import wraps
+from typing import Any, Awaitable, Callable
+from uuid import uuid4
+
+from fastapi_cache import FastAPICache
+
+from app.cache import redis_client
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY = '{prefix}-leader'
+ACQUIRE_SCRIPT = """
+local owner = redis.call('GET', KEYS[1])
+if owner and owner ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return 1
+"""
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderLease:
+    """Аренда лидерства воркера в Redis для периодических задач.
+
+    Ключ хранит идентификатор воркера-лидера и истекает через lease
+    секунд. Каждый воркер раз в renew_interval занимает свободный ключ
+    или продлевает свой; если лидер перестал продлевать аренду, после
+    её истечения лидером становится первый продливший воркер.
+    """
+
+    def __init__(self, lease: int):
+        self.lease = lease
+        self.token = uuid4().hex
+        self.is_leader = False
+
+    @property
+    def key(self) -> str:
+        return LEADER_KEY.format(prefix=FastAPICache.get_prefix())
+
+    @property
+    def renew_interval(self) -> float:
+        return self.lease / 3
+
+    async def renew(self) -> bool:
+        try:
+            acquired = await redis_client.eval(
+                ACQUIRE_SCRIPT, 1, self.key, self.token, self.lease * 1000
+            )
+        except Exception:
+            logger.warning('Leader lease renewal failed', exc_info=True)
+            acquired = False
+        if bool(acquired) != self.is_leader:
+            logger.info(
+                'Worker %s %s leadership',
+                self.token,
+                'acquired' if acquired else 'lost',
+            )
+        self.is_leader = bool(acquired)
+        return self.is_leader
+
+    async def release(self) -> None:
+        if self.is_leader:
+            self.is_leader = False
+            await redis_client.eval(RELEASE_SCRIPT, 1, self.key, self.token)
+
+    def only(
+        self, job: Callable[..., Awaitable[Any]]
+    ) -> Callable[..., Awaitable[Any]]:
+        """Обёртка задачи, которую выполняет только лидер.
+
+        Аренда продлевается перед запуском, поэтому воркер, потерявший
+        её между продлениями, задачу пропускает.
+        """
+
+        @wraps(job)
+        async def wrapper(*args, **kwargs):
+            if await self.renew():
+                return await job(*args, **kwargs)
+            return None
+
+        return wrapper
+
+
+leader_lease = LeaderLease(settings.leader_lease)
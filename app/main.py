@@ -1,37 +1,103 @@
-import redis.asyncio as redis
+import asyncio
+import logging
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from fastapi import FastAPI
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 
-from app.api import spimex_router
+from app.api import service_router, spimex_router
+from app.cache import (
+    L1,
+    InstrumentedBackend,
+    MemoryBackend,
+    PipelinedRedisBackend,
+    TieredBackend,
+    init_cache,
+    redis_client,
+)
+from app.compression import CompressionMiddleware
 from app.config import settings
-from app.tasks import clear_cache_task
+from app.db import replica_router
+from app.invalidation import data_watcher
+from app.leader import leader_lease
+from app.tasks import (
+    apply_data_version,
+    create_partitions_task,
+    refresh_cache_task,
+    sync_worker_task,
+)
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title=settings.app_title, description=settings.description)
+app.add_middleware(CompressionMiddleware)
 app.include_router(spimex_router)
+app.include_router(service_router)
 
-redis_client = redis.from_url(settings.redis_cache_url)
 scheduler = AsyncIOScheduler()
+background_tasks: set[asyncio.Task] = set()
 
 
 @app.on_event('startup')
 async def startup():
-    FastAPICache.init(
-        RedisBackend(redis_client),
-        prefix='spimex',
-        expire=settings.expire_cache,
+    init_cache(
+        TieredBackend(
+            InstrumentedBackend(
+                MemoryBackend(
+                    settings.memory_cache_size, settings.memory_cache_expire
+                ),
+                tier=L1,
+            ),
+            InstrumentedBackend(PipelinedRedisBackend(redis_client)),
+        )
+    )
+    background_tasks.add(
+        asyncio.create_task(data_watcher.listen(apply_data_version))
+    )
+    is_leader = await leader_lease.renew()
+    try:
+        await (refresh_cache_task() if is_leader else sync_worker_task())
+    except Exception:
+        logger.warning('Initial cache refresh failed', exc_info=True)
+    scheduler.add_job(
+        leader_lease.renew,
+        IntervalTrigger(seconds=leader_lease.renew_interval),
+        id='leader_lease',
+    )
+    scheduler.add_job(
+        leader_lease.only(refresh_cache_task),
+        IntervalTrigger(seconds=settings.data_check_interval),
+        id='refresh_cache',
     )
     scheduler.add_job(
-        clear_cache_task,
-        CronTrigger(**settings.clear_cache_time),
-        id='clear_cache',
+        sync_worker_task,
+        IntervalTrigger(seconds=settings.data_check_interval),
+        id='sync_worker',
     )
+    if settings.partition_interval:
+        if is_leader:
+            try:
+                await create_partitions_task()
+            except Exception:
+                logger.warning('Partition creation failed', exc_info=True)
+        scheduler.add_job(
+            leader_lease.only(create_partitions_task),
+            IntervalTrigger(days=1),
+            id='create_partitions',
+        )
     scheduler.start()
 
 
 @app.on_event('shutdown')
 async def shutdown():
     scheduler.shutdown(wait=False)
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    try:
+        await leader_lease.release()
+    except Exception:
+        logger.warning('Leader lease release failed', exc_info=True)
     await redis_client.aclose()
+    await replica_router.dispose()
@@ -0,0 +1,34 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+
+from sqlalchemy import Row
+
+CURSOR_SEPARATOR = '|'
+
+SortKey = tuple[date, str]
+
+
+def encode_cursor(sort_key: SortKey) -> str:
+    trading_date, exchange_product_id = sort_key
+    raw = f'{trading_date.isoformat()}{CURSOR_SEPARATOR}{exchange_product_id}'
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    raw = urlsafe_b64decode(cursor.encode()).decode()
+    trading_date, separator, exchange_product_id = raw.partition(
+        CURSOR_SEPARATOR
+    )
+    if not separator or not exchange_product_id:
+        raise ValueError(cursor)
+    return date.fromisoformat(trading_date), exchange_product_id
+
+
+def paginate(rows: list[Row], limit: int) -> dict:
+    if len(rows) <= limit:
+        return {'results': rows, 'next_cursor': None}
+    last = rows[limit - 1]
+    return {
+        'results': rows[:limit],
+        'next_cursor': encode_cursor((last.date, last.exchange_product_id)),
+    }
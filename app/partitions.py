@@ -0,0 +1,223 @@
+"""Секционирование spimex_trading_results по диапазонам дат.
+
+Перевод существующей таблицы и создание секций наперёд:
+    python -m app.partitions migrate --interval month
+    python -m app.partitions ensure --interval month --ahead 3
+"""
+
+import argparse
+import asyncio
+from datetime import date
+
+from sqlalchemy import UniqueConstraint, text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from app.config import settings
+from app.db import TradingResults
+
+TABLE = TradingResults.__tablename__
+MONTH = 'month'
+YEAR = 'year'
+INTERVALS = (MONTH, YEAR)
+SUFFIX_FORMATS = {MONTH: '%Y_%m', YEAR: '%Y'}
+UNPARTITIONED = '{table}_unpartitioned'
+ALREADY_PARTITIONED = 'Таблица {table} уже секционирована'
+UNKNOWN_INTERVAL = 'Неизвестный интервал секционирования: {interval}'
+INSERT_COLUMNS = ', '.join(
+    column.name
+    for column in TradingResults.__table__.columns
+    if column.computed is None
+)
+
+
+def partition_start(day: date, interval: str) -> date:
+    if interval == MONTH:
+        return day.replace(day=1)
+    if interval == YEAR:
+        return day.replace(month=1, day=1)
+    raise ValueError(UNKNOWN_INTERVAL.format(interval=interval))
+
+
+def next_partition_start(start: date, interval: str) -> date:
+    if interval == YEAR:
+        return start.replace(year=start.year + 1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_ranges(
+    first: date, last: date, interval: str
+) -> list[tuple[date, date]]:
+    """Границы [начало, конец) секций, покрывающих даты first..last."""
+    ranges = []
+    start = partition_start(first, interval)
+    while start <= last:
+        end = next_partition_start(start, interval)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def partition_name(table: str, start: date, interval: str) -> str:
+    return f'{table}_{start.strftime(SUFFIX_FORMATS[interval])}'
+
+
+async def is_partitioned(connection: AsyncConnection, table: str) -> bool:
+    result = await connection.execute(
+        text(
+            'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table '
+            'WHERE partrelid = to_regclass(:table))'
+        ),
+        {'table': table},
+    )
+    return result.scalar()
+
+
+async def create_partitions(
+    connection: AsyncConnection,
+    first: date,
+    last: date,
+    interval: str,
+    table: str = TABLE,
+) -> list[str]:
+    names = []
+    for start, end in partition_ranges(first, last, interval):
+        name = partition_name(table, start, interval)
+        await connection.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} '
+                f"FOR VALUES FROM ('{start}') TO ('{end}')"
+            )
+        )
+        names.append(name)
+    return names
+
+
+def ahead_date(today: date, interval: str, ahead: int) -> date:
+    start = partition_start(today, interval)
+    for _ in range(ahead):
+        start = next_partition_start(start, interval)
+    return start
+
+
+async def ensure_partitions(
+    connection: AsyncConnection,
+    interval: str,
+    ahead: int = settings.partitions_ahead,
+    table: str = TABLE,
+    today: date | None = None,
+) -> list[str]:
+    """Секции от текущей до текущей + ahead, чтобы вставка не падала."""
+    today = today or date.today()
+    return await create_partitions(
+        connection, today, ahead_date(today, interval, ahead), interval, table
+    )
+
+
+async def migrate_table(
+    connection: AsyncConnection,
+    interval: str,
+    ahead: int = settings.partitions_ahead,
+    table: str = TABLE,
+    today: date | None = None,
+) -> int:
+    """Переводит обычную таблицу в секционированную по date.
+
+    Выполняется в транзакции connection: при ошибке таблица остаётся
+    прежней. На время копирования запись в таблицу блокируется.
+    Возвращает количество перенесённых строк.
+    """
+    if await is_partitioned(connection, table):
+        raise ValueError(ALREADY_PARTITIONED.format(table=table))
+    today = today or date.today()
+    old = UNPARTITIONED.format(table=table)
+    old_name = old.rpartition('.')[2]
+    await connection.execute(text(f'ALTER TABLE {table} RENAME TO {old_name}'))
+    await connection.execute(
+        text(
+            f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS '
+            'INCLUDING GENERATED INCLUDING COMMENTS) '
+            'PARTITION BY RANGE (date)'
+        )
+    )
+    first, last = (
+        await connection.execute(
+            text(f'SELECT min(date), max(date) FROM {old}')
+        )
+    ).one()
+    await create_partitions(
+        connection,
+        first or today,
+        max(last or today, ahead_date(today, interval, ahead)),
+        interval,
+        table,
+    )
+    moved = await connection.execute(
+        text(
+            f'INSERT INTO {table} ({INSERT_COLUMNS}) '
+            f'SELECT {INSERT_COLUMNS} FROM {old}'
+        )
+    )
+    sequence = (
+        await connection.execute(
+            text('SELECT pg_get_serial_sequence(:table, :column)'),
+            {'table': old, 'column': 'id'},
+        )
+    ).scalar()
+    if sequence is not None:
+        await connection.execute(
+            text(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+        )
+    await connection.execute(text(f'DROP TABLE {old}'))
+    await connection.execute(
+        text(f'ALTER TABLE {table} ADD PRIMARY KEY (id, date)')
+    )
+    for constraint in TradingResults.__table__.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            columns = ', '.join(column.name for column in constraint.columns)
+            await connection.execute(
+                text(
+                    f'ALTER TABLE {table} ADD CONSTRAINT {constraint.name} '
+                    f'UNIQUE ({columns})'
+                )
+            )
+    for index in TradingResults.__table__.indexes:
+        columns = ', '.join(column.name for column in index.expressions)
+        include = index.dialect_options['postgresql']['include']
+        include = f' INCLUDE ({", ".join(include)})' if include else ''
+        await connection.execute(
+            text(f'CREATE INDEX {index.name} ON {table} ({columns}){include}')
+        )
+    return moved.rowcount
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=('migrate', 'ensure'))
+    parser.add_argument(
+        '--interval',
+        choices=INTERVALS,
+        default=settings.partition_interval or MONTH,
+    )
+    parser.add_argument('--ahead', type=int, default=settings.partitions_ahead)
+    args = parser.parse_args()
+    engine = create_async_engine(settings.database_url)
+    try:
+        async with engine.begin() as connection:
+            if args.command == 'migrate':
+                moved = await migrate_table(
+                    connection, args.interval, args.ahead
+                )
+                print(f'Перенесено строк: {moved}')
+            else:
+                names = await ensure_partitions(
+                    connection, args.interval, args.ahead
+                )
+                print(f'Секции: {", ".join(names)}')
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
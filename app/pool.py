@@ -0,0 +1,90 @@
+import time
+import uuid
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import settings
+
+
+def unique_statement_name() -> str:
+    return f'__asyncpg_{uuid.uuid4()}__'
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул соединений, считающий ожидание выдачи соединения.
+
+    Время ожидания включает открытие нового соединения и pre-ping.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def connect(self):
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.waiting -= 1
+            self.checkouts += 1
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            'size': self.size(),
+            'max_overflow': self._max_overflow,
+            'checked_in': self.checkedin(),
+            'checked_out': self.checkedout(),
+            'overflow': self.overflow(),
+            'waiting': self.waiting,
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'wait_time_avg': round(self.wait_time / (self.checkouts or 1), 6),
+            'wait_time_max': round(self.max_wait_time, 6),
+        }
+
+
+def engine_options() -> dict[str, Any]:
+    """Параметры create_async_engine: пул и кэши подготовленных запросов.
+
+    statement_cache_size - кэш asyncpg, prepared_statement_cache_size -
+    кэш диалекта SQLAlchemy. За pgbouncer в режиме transaction оба
+    кэша отключаются (0) и включаются уникальные имена запросов.
+    """
+    connect_args = {
+        'statement_cache_size': settings.db_statement_cache_size,
+        'prepared_statement_cache_size': (
+            settings.db_prepared_statement_cache_size
+        ),
+    }
+    if settings.db_unique_statement_names:
+        connect_args['prepared_statement_name_func'] = unique_statement_name
+    return {
+        'poolclass': InstrumentedPool,
+        'pool_size': settings.db_pool_size,
+        'max_overflow': settings.db_max_overflow,
+        'pool_timeout': settings.db_pool_timeout,
+        'pool_recycle': settings.db_pool_recycle,
+        'pool_pre_ping': settings.db_pool_pre_ping,
+        'connect_args': connect_args,
+    }
+
+
+def pool_stats(engine: AsyncEngine) -> dict[str, Any]:
+    pool = engine.sync_engine.pool
+    if isinstance(pool, InstrumentedPool):
+        return pool.stats()
+    return {'status': pool.status()}
@@ -0,0 +1,111 @@
+import asyncio
+from collections import Counter
+from typing import AsyncIterator
+
+from app.cache import cached_endpoints, request_key_builder, single_flight
+from app.config import settings
+from app.db import AsyncSessionLocal
+from app.invalidation import data_version_token
+from app.schemas import PaginationQuery, ProjectionQuery, TradingResultsQuery
+
+EVENT_STREAM = 'text/event-stream'
+LAST_RESULTS = 'last-results'
+SSE_EVENT = b'id: %b\nevent: %b\ndata: %b\n\n'
+SSE_PING = b': ping\n\n'
+
+
+class LastResultsFeed:
+    """Общий источник событий с последними торгами для подписчиков SSE.
+
+    Снимок первой страницы last-results для набора фильтров готовится
+    один раз на версию данных (через кэш эндпоинта) и отдаётся всем
+    подписчикам этого набора одними и теми же байтами события. Все
+    подписчики ждут один future, который notify завершает при смене
+    версии данных, поэтому у простаивающего соединения нет ни своей
+    очереди, ни фоновой задачи. Комментарий отправляется сразу, если
+    поток открылся без снимка (иначе клиент не получит заголовки), и
+    раз в SSE_HEARTBEAT секунд без событий, чтобы прокси не закрывали
+    соединение.
+    """
+
+    def __init__(self, namespace: str = LAST_RESULTS):
+        self.namespace = namespace
+        self.subscribers: Counter[str] = Counter()
+        self.snapshots: dict[str, tuple[str, bytes]] = {}
+        self.changed: asyncio.Future | None = None
+
+    def key(self, filters: TradingResultsQuery) -> str:
+        return request_key_builder(
+            None, f'{self.namespace}-feed', kwargs={'filters': filters}
+        )
+
+    def notify(self) -> None:
+        """Будит подписчиков: каждый сверит версию данных с отправленной."""
+        if self.changed is not None and not self.changed.done():
+            self.changed.set_result(None)
+        self.changed = None
+
+    def wait(self) -> asyncio.Future:
+        if self.changed is None:
+            self.changed = asyncio.get_running_loop().create_future()
+        return self.changed
+
+    async def render(self, filters: TradingResultsQuery, token: str) -> bytes:
+        async with AsyncSessionLocal() as session:
+            payload = await cached_endpoints[self.namespace].read(
+                {
+                    'session': session,
+                    'filters': filters,
+                    'page': PaginationQuery(),
+                    'projection': ProjectionQuery(),
+                }
+            )
+        return SSE_EVENT % (token.encode(), self.namespace.encode(), payload)
+
+    async def snapshot(
+        self, filters: TradingResultsQuery, token: str
+    ) -> bytes:
+        key = self.key(filters)
+        cached = self.snapshots.get(key)
+        if cached is not None and cached[0] == token:
+            return cached[1]
+        event = await single_flight.run(
+            f'{key}:{token}', lambda: self.render(filters, token)
+        )
+        self.snapshots[key] = token, event
+        return event
+
+    async def stream(
+        self, filters: TradingResultsQuery, last_event_id: str | None = None
+    ) -> AsyncIterator[bytes]:
+        """События подписчика: снимок при каждой новой версии данных.
+
+        Снимок версии last_event_id (заголовок Last-Event-ID при
+        переподключении) повторно не отправляется.
+        """
+        key = self.key(filters)
+        self.subscribers[key] += 1
+        try:
+            sent, opening = last_event_id, True
+            while True:
+                token = data_version_token()
+                if token is not None and token != sent:
+                    yield await self.snapshot(filters, token)
+                    sent = token
+                elif opening:
+                    yield SSE_PING
+                opening = False
+                try:
+                    await asyncio.wait_for(
+                        asyncio.shield(self.wait()), settings.sse_heartbeat
+                    )
+                except TimeoutError:
+                    yield SSE_PING
+        finally:
+            self.subscribers[key] -= 1
+            if not self.subscribers[key]:
+                del self.subscribers[key]
+                self.snapshots.pop(key, None)
+
+
+last_results_feed = LastResultsFeed()
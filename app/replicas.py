@@ -0,0 +1,115 @@
+import asyncio
+import itertools
+import logging
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.pool import engine_options, pool_stats
+
+logger = logging.getLogger(__name__)
+
+ROUND_ROBIN = 'round-robin'
+LEAST_CONNECTIONS = 'least-connections'
+
+Version = tuple[date | None, datetime | None]
+ReadVersion = Callable[[AsyncSession], Awaitable[Version]]
+
+
+def is_fresh(replica: Version, primary: Version) -> bool:
+    """Реплика догнала основную БД по дате торгов и updated_on."""
+    return all(
+        latest is None or (value is not None and value >= latest)
+        for value, latest in zip(replica, primary)
+    )
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = make_url(url)
+        self.engine = create_async_engine(self.url, **engine_options())
+        self.session_factory = sessionmaker(self.engine, class_=AsyncSession)
+        self.healthy = False
+        self.version: Version | None = None
+
+    def connections(self) -> int:
+        return self.engine.sync_engine.pool.checkedout()
+
+    def status(self) -> dict[str, Any]:
+        max_date, updated_on = self.version or (None, None)
+        return {
+            'url': self.url.render_as_string(hide_password=True),
+            'healthy': self.healthy,
+            'max_date': max_date,
+            'updated_on': updated_on,
+            'pool': pool_stats(self.engine),
+        }
+
+
+class ReplicaRouter:
+    """Распределяет сессии чтения по репликам.
+
+    Состояние реплик обновляет check: реплика, недоступная или
+    отстающая от основной БД, исключается до следующей проверки.
+    Если подходящих реплик нет, сессии открываются на основной БД.
+    """
+
+    def __init__(
+        self,
+        primary: sessionmaker,
+        urls: list[str],
+        strategy: str = ROUND_ROBIN,
+    ):
+        self.primary = primary
+        self.replicas = [Replica(url) for url in urls]
+        self.strategy = strategy
+        self._turns = itertools.count()
+
+    def session_factory(self) -> sessionmaker:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return self.primary
+        if self.strategy == LEAST_CONNECTIONS:
+            return min(healthy, key=Replica.connections).session_factory
+        return healthy[next(self._turns) % len(healthy)].session_factory
+
+    async def check_replica(
+        self, replica: Replica, primary: Version, read_version: ReadVersion
+    ) -> None:
+        try:
+            async with asyncio.timeout(settings.replica_check_timeout):
+                async with replica.session_factory() as session:
+                    replica.version = await read_version(session)
+        except Exception:
+            logger.warning(
+                'Replica check failed: %s', replica.url, exc_info=True
+            )
+            replica.healthy = False
+            return
+        replica.healthy = is_fresh(replica.version, primary)
+        if not replica.healthy:
+            logger.warning(
+                'Replica %s lags behind primary: %s < %s',
+                replica.url,
+                replica.version,
+                primary,
+            )
+
+    async def check(self, primary: Version, read_version: ReadVersion) -> None:
+        await asyncio.gather(
+            *(
+                self.check_replica(replica, primary, read_version)
+                for replica in self.replicas
+            )
+        )
+
+    def status(self) -> list[dict[str, Any]]:
+        return [replica.status() for replica in self.replicas]
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
@@ -1,7 +1,10 @@
 import datetime as dt
+from enum import Enum
 
 from pydantic import BaseModel, Field
 
+from app.config import settings
+
 
 class TradingResultsDB(BaseModel):
     """Схема вывода результатов торгов."""
@@ -34,3 +37,146 @@ class DynamicTradingResultsQuery(TradingResultsQuery):
 
     start_date: dt.date
     end_date: dt.date
+
+
+PROJECTION_SEPARATOR = ','
+KEYSET_FIELDS = ('exchange_product_id', 'date')
+
+
+class PaginationQuery(BaseModel):
+    """Схема постраничной выборки по курсору."""
+
+    limit: int = Field(settings.page_size, gt=0, le=settings.max_page_size)
+    cursor: str | None = Field(None, min_length=1)
+
+
+class ProjectionQuery(BaseModel):
+    """Схема выбора полей результатов торгов."""
+
+    fields: str | None = Field(
+        None,
+        min_length=1,
+        description=(
+            'Поля через запятую; exchange_product_id и date выводятся всегда'
+        ),
+    )
+
+    @property
+    def names(self) -> tuple[str, ...] | None:
+        if self.fields is None:
+            return None
+        return tuple(self.fields.split(PROJECTION_SEPARATOR))
+
+
+class TradingResultsPage(BaseModel):
+    """Схема страницы результатов торгов."""
+
+    results: list[TradingResultsDB] = Field(..., title='Результаты торгов')
+    next_cursor: str | None = Field(None, title='Курсор следующей страницы')
+
+
+class BatchQuery(TradingResultsQuery):
+    """Схема запроса в пакете: торги за период или последние торги."""
+
+    start_date: dt.date | None = None
+    end_date: dt.date | None = None
+    limit: int = Field(settings.page_size, gt=0, le=settings.max_page_size)
+    cursor: str | None = Field(None, min_length=1)
+    fields: str | None = Field(None, min_length=1)
+
+    @property
+    def filters(self) -> TradingResultsQuery | DynamicTradingResultsQuery:
+        fields = self.dict(
+            exclude={'limit', 'cursor', 'fields'}, exclude_none=True
+        )
+        if self.start_date is None and self.end_date is None:
+            return TradingResultsQuery(**fields)
+        return DynamicTradingResultsQuery(**fields)
+
+    @property
+    def page(self) -> PaginationQuery:
+        return PaginationQuery(limit=self.limit, cursor=self.cursor)
+
+    @property
+    def projection(self) -> ProjectionQuery:
+        return ProjectionQuery(fields=self.fields)
+
+
+class BatchRequest(BaseModel):
+    """Схема пакета запросов, ответы возвращаются по тем же ключам."""
+
+    queries: dict[str, BatchQuery] = Field(..., title='Запросы по ключам')
+
+
+class ExportFormat(str, Enum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+
+class ExportQuery(DynamicTradingResultsQuery):
+    """Схема выгрузки торгов за период."""
+
+    format: ExportFormat = ExportFormat.NDJSON
+
+
+class AggregatePeriod(str, Enum):
+    DAY = 'day'
+    WEEK = 'week'
+
+
+class AggregateField(str, Enum):
+    OIL_ID = 'oil_id'
+    DELIVERY_BASIS_ID = 'delivery_basis_id'
+    DELIVERY_TYPE_ID = 'delivery_type_id'
+
+
+class AggregateQuery(DynamicTradingResultsQuery):
+    """Схема агрегации торгов за период."""
+
+    period: AggregatePeriod = AggregatePeriod.DAY
+    group_by: AggregateField = AggregateField.OIL_ID
+
+
+class AggregateRow(BaseModel):
+    """Схема вывода агрегированных итогов торгов."""
+
+    date: dt.date = Field(..., title='Начало периода')
+    key: str = Field(..., title='Значение поля группировки')
+    volume: int = Field(..., title='Объем')
+    total: int = Field(..., title='Сумма, руб.')
+    count: int = Field(..., title='Количество договоров')
+    avg_price: float | None = Field(None, title='Средняя цена, руб.')
+
+
+class AnalyticsQuery(DynamicTradingResultsQuery):
+    """Схема ценового ряда по инструменту или нефтепродукту за период."""
+
+    exchange_product_id: str | None = Field(None, min_length=1)
+    window: int = Field(
+        settings.analytics_window, gt=1, le=settings.max_days_limit
+    )
+
+
+class PriceSeries(BaseModel):
+    """Схема ценового ряда, по столбцу на показатель."""
+
+    date: list[dt.date] = Field(..., title='Даты торгов')
+    volume: list[int] = Field(..., title='Объем')
+    total: list[int] = Field(..., title='Сумма, руб.')
+    vwap: list[float | None] = Field(..., title='VWAP (total/volume)')
+    rolling_mean: list[float | None] = Field(
+        ..., title='Скользящее среднее VWAP за window торговых дней'
+    )
+    change: list[float | None] = Field(
+        ..., title='Изменение VWAP к предыдущему дню'
+    )
+    change_pct: list[float | None] = Field(
+        ..., title='Изменение VWAP к предыдущему дню, %'
+    )
+
+
+class IngestResult(BaseModel):
+    """Схема итога загрузки результатов торгов."""
+
+    rows: int = Field(..., title='Загружено записей')
+    dates: list[dt.date] = Field(..., title='Изменившиеся даты торгов')
@@ -1,5 +1,99 @@
+import logging
+from datetime import date
+
 from fastapi_cache import FastAPICache
 
+from app.cache import request_frequencies
+from app.config import settings
+from app.crud import get_data_version, sync_rollups
+from app.db import AsyncSessionLocal, engine, replica_router
+from app.invalidation import DataVersion, data_watcher
+from app.leader import leader_lease
+from app.partitions import TABLE, ensure_partitions, is_partitioned
+from app.push import last_results_feed
+from app.trading_calendar import trading_calendar
+from app.warmup import warm_up_cache
+
+logger = logging.getLogger(__name__)
+
+
+async def refresh_cache_task():
+    """Обновляет итоги и версию данных, удаляет устаревшие ключи.
+
+    Итоги пересчитываются до удаления ключей, чтобы агрегаты
+    пересчитывались уже по ним. Ошибка пересчёта только логируется:
+    проверка версии данных и удаление ключей от неё не зависят.
+    """
+    await request_frequencies.flush()
+    async with AsyncSessionLocal() as session:
+        try:
+            await sync_rollups(session)
+        except Exception:
+            logger.warning('Rollup sync failed', exc_info=True)
+            await session.rollback()
+        if replica_router.replicas:
+            await replica_router.check(
+                await get_data_version(session), get_data_version
+            )
+        previous = data_watcher.version
+        changed = await data_watcher.refresh(session)
+    if data_watcher.version != previous:
+        last_results_feed.notify()
+    if changed:
+        await warm_up_cache()
+
+
+async def apply_ingest_task(dates: list[date]) -> None:
+    """Обновляет итоги и кэш по датам, изменённым загрузкой данных.
+
+    Даты известны из RETURNING загрузки, поэтому не ищутся по
+    updated_on. Прогрев не выполняется: его сделает задача лидера.
+    Данные к этому моменту уже зафиксированы, поэтому ошибка только
+    логируется.
+    """
+    try:
+        async with AsyncSessionLocal() as session:
+            await sync_rollups(session, dates)
+            await data_watcher.apply_changes(session, dates)
+    except Exception:
+        logger.warning('Ingest cache invalidation failed', exc_info=True)
+        return
+    last_results_feed.notify()
+
+
+async def apply_data_version(version: DataVersion) -> None:
+    """Принимает версию данных, найденную другим воркером.
+
+    Реплики проверяются по новой версии до её применения, чтобы
+    отстающая реплика не отдавала старые данные под новым ETag,
+    а записи L1 этого воркера удаляются: ключи в Redis уже очистил
+    воркер, обнаруживший изменения. Изменившиеся даты здесь
+    неизвестны, поэтому календарь торгов загружается заново.
+    """
+    if replica_router.replicas:
+        await replica_router.check(version, get_data_version)
+    async with AsyncSessionLocal() as session:
+        await trading_calendar.update(session)
+    memory = getattr(FastAPICache.get_backend(), 'memory', None)
+    if memory is not None:
+        await memory.clear(namespace=FastAPICache.get_prefix())
+    data_watcher.version = version
+    last_results_feed.notify()
+
+
+async def sync_worker_task():
+    """Состояние воркера, которое не обновляет задача лидера."""
+    if leader_lease.is_leader:
+        return
+    await request_frequencies.flush()
+    version = await data_watcher.stored()
+    if version is not None and version != data_watcher.version:
+        await apply_data_version(version)
+    elif replica_router.replicas:
+        await replica_router.check(data_watcher.version, get_data_version)
+
 
-async def clear_cache_task():
-    await FastAPICache.clear()
+async def create_partitions_task():
+    async with engine.begin() as connection:
+        if await is_partitioned(connection, TABLE):
+            await ensure_partitions(connection, settings.partition_interval)
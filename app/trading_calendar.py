@@ -0,0 +1,71 @@
+import asyncio
+from datetime import date
+
+from sqlalchemy import desc, distinct, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import TradingResults
+
+
+class TradingCalendar:
+    """Последние даты торгов в памяти процесса, по убыванию.
+
+    Загружается целиком при первом обращении, дальше обновляется
+    только при смене версии данных (update): дочитываются даты новее
+    последней известной - диапазонный запрос по индексу
+    uix_date_product. Чтения отдают даты из памяти без блокировки и
+    запросов к базе.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.dates: list[date] = []
+        self.loaded = False
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, session: AsyncSession) -> list[date]:
+        async with self._lock:
+            request = (
+                select(distinct(TradingResults.date))
+                .order_by(desc(TradingResults.date))
+                .limit(self.size)
+            )
+            if self.loaded and self.dates:
+                request = request.where(TradingResults.date > self.dates[0])
+            new_dates = (await session.execute(request)).scalars().all()
+            self.dates = (new_dates + self.dates)[: self.size]
+            self.loaded = True
+            return new_dates
+
+    def reset(self) -> None:
+        self.dates = []
+        self.loaded = False
+
+    async def update(
+        self, session: AsyncSession, changed: list[date] | None = None
+    ) -> list[date]:
+        """Обновляет календарь после смены версии данных.
+
+        Если изменились даты не новее последней известной (торги
+        загружены или удалены задним числом) или они неизвестны
+        (changed=None), календарь загружается заново.
+        """
+        if changed is None or (
+            self.dates and any(day <= self.dates[0] for day in changed)
+        ):
+            self.reset()
+        return await self.refresh(session)
+
+    async def last_dates(self, session: AsyncSession, days: int) -> list[date]:
+        if not self.loaded:
+            await self.refresh(session)
+        return self.dates[:days]
+
+    async def latest(self, session: AsyncSession) -> date | None:
+        if not self.loaded:
+            await self.refresh(session)
+        return self.dates[0] if self.dates else None
+
+
+trading_calendar = TradingCalendar(settings.max_days_limit)
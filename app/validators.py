@@ -1,18 +1,45 @@
+import secrets
 from datetime import timedelta
 from http import HTTPStatus
 
-from fastapi import HTTPException
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import ValidationError
 
 from app.config import settings
-from app.schemas import DynamicTradingResultsQuery, TradingResultsQuery
+from app.pagination import decode_cursor
+from app.schemas import (
+    KEYSET_FIELDS,
+    PROJECTION_SEPARATOR,
+    AggregateQuery,
+    AnalyticsQuery,
+    BatchRequest,
+    DynamicTradingResultsQuery,
+    ExportQuery,
+    PaginationQuery,
+    ProjectionQuery,
+    TradingResultsDB,
+    TradingResultsQuery,
+)
 
 DATE_ERROR = 'start_date={} больше end_date={}'
 RANGE_ERROR = 'Выборка не может превышать {} дней'
+CURSOR_ERROR = 'Некорректный курсор: {}'
+BATCH_SIZE_ERROR = 'Пакет должен содержать от 1 до {} запросов'
+FIELDS_ERROR = 'Неизвестные поля: {}'
+INSTRUMENT_ERROR = 'Нужно указать exchange_product_id или oil_id'
+INGEST_DISABLED_ERROR = 'Загрузка данных отключена'
+TOKEN_ERROR = 'Неверный токен загрузки'
+
+bearer = HTTPBearer(auto_error=False)
 
 
 def query_filter_validators(
     filters: TradingResultsQuery | DynamicTradingResultsQuery,
+    max_days_range: int | None = None,
 ):
+    if max_days_range is None:
+        max_days_range = settings.max_days_range
     if isinstance(filters, DynamicTradingResultsQuery):
         if filters.start_date > filters.end_date:
             raise HTTPException(
@@ -20,10 +47,110 @@ def query_filter_validators(
                 DATE_ERROR.format(filters.start_date, filters.end_date),
             )
         if (filters.end_date - filters.start_date) > timedelta(
-            days=settings.max_days_range
+            days=max_days_range
         ):
             raise HTTPException(
                 HTTPStatus.UNPROCESSABLE_ENTITY,
-                RANGE_ERROR.format(settings.max_days_range),
+                RANGE_ERROR.format(max_days_range),
             )
     return filters
+
+
+def valid_filters(
+    filters: TradingResultsQuery = Depends(),
+) -> TradingResultsQuery:
+    return query_filter_validators(filters)
+
+
+def valid_dynamic_filters(
+    filters: DynamicTradingResultsQuery = Depends(),
+) -> DynamicTradingResultsQuery:
+    return query_filter_validators(filters)
+
+
+def valid_export_filters(filters: ExportQuery = Depends()) -> ExportQuery:
+    return query_filter_validators(filters, settings.max_export_days_range)
+
+
+def valid_aggregate_filters(
+    filters: AggregateQuery = Depends(),
+) -> AggregateQuery:
+    return query_filter_validators(filters, settings.max_aggregate_days_range)
+
+
+def valid_analytics_filters(
+    filters: AnalyticsQuery = Depends(),
+) -> AnalyticsQuery:
+    if filters.exchange_product_id is None and filters.oil_id is None:
+        raise HTTPException(HTTPStatus.UNPROCESSABLE_ENTITY, INSTRUMENT_ERROR)
+    return query_filter_validators(filters, settings.max_aggregate_days_range)
+
+
+def valid_page(page: PaginationQuery = Depends()) -> PaginationQuery:
+    if page.cursor is not None:
+        try:
+            decode_cursor(page.cursor)
+        except ValueError:
+            raise HTTPException(
+                HTTPStatus.UNPROCESSABLE_ENTITY,
+                CURSOR_ERROR.format(page.cursor),
+            )
+    return page
+
+
+def valid_projection(
+    projection: ProjectionQuery = Depends(),
+) -> ProjectionQuery:
+    """Приводит список полей к порядку схемы, добавляя поля курсора."""
+    if projection.fields is None:
+        return projection
+    requested = {
+        name.strip() for name in projection.fields.split(PROJECTION_SEPARATOR)
+    }
+    unknown = requested - set(TradingResultsDB.__fields__)
+    if unknown:
+        raise HTTPException(
+            HTTPStatus.UNPROCESSABLE_ENTITY,
+            FIELDS_ERROR.format(', '.join(sorted(unknown))),
+        )
+    return ProjectionQuery(
+        fields=PROJECTION_SEPARATOR.join(
+            name
+            for name in TradingResultsDB.__fields__
+            if name in requested or name in KEYSET_FIELDS
+        )
+    )
+
+
+def valid_batch(batch: BatchRequest) -> BatchRequest:
+    if not 0 < len(batch.queries) <= settings.max_batch_size:
+        raise HTTPException(
+            HTTPStatus.UNPROCESSABLE_ENTITY,
+            BATCH_SIZE_ERROR.format(settings.max_batch_size),
+        )
+    for query in batch.queries.values():
+        try:
+            filters = query.filters
+        except ValidationError as error:
+            raise HTTPException(
+                HTTPStatus.UNPROCESSABLE_ENTITY, error.errors()
+            )
+        query_filter_validators(filters)
+        valid_page(query.page)
+        query.fields = valid_projection(query.projection).fields
+    return batch
+
+
+def valid_ingest_token(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer),
+) -> None:
+    if settings.ingest_token is None:
+        raise HTTPException(HTTPStatus.FORBIDDEN, INGEST_DISABLED_ERROR)
+    if credentials is None or not secrets.compare_digest(
+        credentials.credentials.encode(), settings.ingest_token.encode()
+    ):
+        raise HTTPException(
+            HTTPStatus.UNAUTHORIZED,
+            TOKEN_ERROR,
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
@@ -0,0 +1,35 @@
+import asyncio
+import logging
+
+from app.cache import CachedEndpoint, cached_endpoints, request_frequencies
+from app.config import settings
+from app.db import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up_key(
+    endpoint: CachedEndpoint, key: str, semaphore: asyncio.Semaphore
+) -> None:
+    async with semaphore:
+        async with AsyncSessionLocal() as session:
+            await endpoint.refresh(endpoint.kwargs_from_key(key, session))
+
+
+async def warm_up_cache() -> int:
+    await request_frequencies.flush()
+    semaphore = asyncio.Semaphore(settings.warmup_concurrency)
+    jobs = []
+    for namespace, endpoint in cached_endpoints.items():
+        if not endpoint.warm_up:
+            continue
+        for key in await request_frequencies.top(
+            namespace, settings.warmup_keys
+        ):
+            jobs.append(warm_up_key(endpoint, key, semaphore))
+        await request_frequencies.decay(namespace, settings.warmup_decay)
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning('Cache warm-up failed', exc_info=result)
+    return sum(not isinstance(result, Exception) for result in results)
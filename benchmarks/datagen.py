@@ -0,0 +1,224 @@
+"""Генератор реалистичных данных торгов и быстрая загрузка через COPY.
+
+Инструменты собираются из кодов нефтепродуктов, базисов и видов
+поставки с неравномерной популярностью (закон Ципфа); каждый торговый
+день (будни) торгуется часть инструментов, цена идёт случайным
+блужданием. Запуск на тестовой БД (MODE=test), по умолчанию 3 года
+и 3000 инструментов (~1 млн строк). После прогонов таблицы нужно
+удалить, иначе тесты увидят сгенерированные строки:
+    python -m benchmarks.datagen --years 3 --products 3000
+    python -m benchmarks.datagen --drop
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as day_time
+from typing import Iterator
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.crud import sync_rollups
+from app.db import Base, TradingResults
+
+YEARS = 3
+PRODUCTS = 3000
+SEED = 42
+COPY_BATCH = 100_000
+OIL_GROUPS = {
+    'A': ('Бензин', 60_000),
+    'D': ('Дизельное топливо', 65_000),
+    'M': ('Мазут', 25_000),
+    'T': ('Авиакеросин', 70_000),
+    'P': ('Сжиженный газ', 20_000),
+}
+OIL_CODES_PER_GROUP = 40
+BASIS_CODES = 300
+LOT_CODES = ('001', '005', '010', '020', '060', '065')
+LOT_SIZES = (1, 5, 10, 20, 60, 65)
+DELIVERY_TYPES = ('F', 'A', 'J', 'K', 'L')
+DELIVERY_TYPE_WEIGHTS = (0.5, 0.25, 0.15, 0.07, 0.03)
+MAX_TOTAL = 2**31 - 1
+COLUMNS = (
+    'exchange_product_id',
+    'exchange_product_name',
+    'delivery_basis_name',
+    'volume',
+    'total',
+    'count',
+    'date',
+    'created_on',
+    'updated_on',
+)
+LETTERS = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+
+
+def zipf_weights(size: int, exponent: float = 1.1) -> np.ndarray:
+    weights = 1 / np.arange(1, size + 1) ** exponent
+    return weights / weights.sum()
+
+
+def trading_days(years: int, end: date) -> list[date]:
+    start = end.replace(year=end.year - years)
+    days = (end - start).days + 1
+    return [
+        day
+        for day in (start + timedelta(days=shift) for shift in range(days))
+        if day.weekday() < 5
+    ]
+
+
+class Catalog:
+    """Инструменты с параметрами торговли: активность, цена, лот."""
+
+    def __init__(self, products: int, rng: np.random.Generator):
+        groups = list(OIL_GROUPS)
+        oil_ids = [
+            f'{group}{number:03d}'
+            for group in groups
+            for number in rng.choice(1000, OIL_CODES_PER_GROUP, replace=False)
+        ]
+        basis_ids = sorted(
+            {''.join(rng.choice(LETTERS, 3)) for _ in range(BASIS_CODES * 2)}
+        )[:BASIS_CODES]
+        oil_weights = zipf_weights(len(oil_ids))
+        basis_weights = zipf_weights(len(basis_ids))
+        ids: dict[str, tuple[str, str, int]] = {}
+        while len(ids) < products:
+            oil_id = oil_ids[rng.choice(len(oil_ids), p=oil_weights)]
+            basis_id = basis_ids[rng.choice(len(basis_ids), p=basis_weights)]
+            lot = rng.integers(len(LOT_CODES))
+            delivery_type = rng.choice(DELIVERY_TYPES, p=DELIVERY_TYPE_WEIGHTS)
+            product_id = f'{oil_id}{basis_id}{LOT_CODES[lot]}{delivery_type}'
+            ids.setdefault(product_id, (oil_id, basis_id, int(lot)))
+        self.ids = list(ids)
+        self.names = [
+            f'{OIL_GROUPS[oil_id[0]][0]} {oil_id}, {basis_id}'
+            for oil_id, basis_id, _ in ids.values()
+        ]
+        self.basis_names = [
+            f'Базис поставки {basis_id}' for _, basis_id, _ in ids.values()
+        ]
+        self.lots = np.array(
+            [LOT_SIZES[lot] for *_, lot in ids.values()], dtype=np.int64
+        )
+        self.activity = rng.beta(0.8, 1.2, len(self.ids))
+        self.prices = np.array(
+            [OIL_GROUPS[oil_id[0]][1] for oil_id, *_ in ids.values()],
+            dtype=float,
+        ) * rng.uniform(0.8, 1.2, len(self.ids))
+
+
+def generate_records(
+    catalog: Catalog,
+    days: list[date],
+    rng: np.random.Generator,
+) -> Iterator[tuple]:
+    prices = catalog.prices.copy()
+    for day in days:
+        prices *= np.exp(rng.normal(0, 0.01, len(prices)))
+        traded = np.flatnonzero(rng.random(len(prices)) < catalog.activity)
+        lots = catalog.lots[traded]
+        count = rng.geometric(0.3, len(traded))
+        volume = lots * count * rng.integers(1, 4, len(traded))
+        total = np.minimum(
+            (volume * prices[traded]).astype(np.int64), MAX_TOTAL
+        )
+        stamp = datetime.combine(day, day_time(18))
+        for product, product_volume, product_total, deals in zip(
+            traded, volume, total, count
+        ):
+            yield (
+                catalog.ids[product],
+                catalog.names[product],
+                catalog.basis_names[product],
+                int(product_volume),
+                int(product_total),
+                int(deals),
+                day,
+                stamp,
+                stamp,
+            )
+
+
+async def load(
+    years: int, products: int, seed: int, end: date, append: bool
+) -> int:
+    rng = np.random.default_rng(seed)
+    catalog = Catalog(products, rng)
+    records = generate_records(catalog, trading_days(years, end), rng)
+    engine = create_async_engine(settings.database_url)
+    loaded = 0
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            if not append:
+                await connection.execute(
+                    text(f'TRUNCATE {TradingResults.__tablename__}')
+                )
+            driver = (await connection.get_raw_connection()).driver_connection
+            while batch := [
+                record for _, record in zip(range(COPY_BATCH), records)
+            ]:
+                await driver.copy_records_to_table(
+                    TradingResults.__tablename__,
+                    records=batch,
+                    columns=COLUMNS,
+                )
+                loaded += len(batch)
+        async with engine.connect() as connection:
+            await connection.execution_options(isolation_level='AUTOCOMMIT')
+            await connection.execute(
+                text(f'VACUUM ANALYZE {TradingResults.__tablename__}')
+            )
+        async with sessionmaker(engine, class_=AsyncSession)() as session:
+            await sync_rollups(session)
+    finally:
+        await engine.dispose()
+    return loaded
+
+
+async def drop() -> None:
+    engine = create_async_engine(settings.database_url)
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+    finally:
+        await engine.dispose()
+
+
+async def main():
+    assert settings.mode == 'test', 'Генератор запускается только на MODE=test'
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--years', type=int, default=YEARS)
+    parser.add_argument('--products', type=int, default=PRODUCTS)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--end', type=date.fromisoformat, default=date.today())
+    parser.add_argument(
+        '--append', action='store_true', help='не очищать таблицу'
+    )
+    parser.add_argument(
+        '--drop', action='store_true', help='удалить таблицы и выйти'
+    )
+    args = parser.parse_args()
+    if args.drop:
+        await drop()
+        return
+    started = time.perf_counter()
+    loaded = await load(
+        args.years, args.products, args.seed, args.end, args.append
+    )
+    elapsed = time.perf_counter() - started
+    print(
+        f'Загружено строк: {loaded} за {elapsed:.1f} с '
+        f'({loaded / elapsed:,.0f} строк/с)'
+    )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,281 @@
+"""Нагрузочный прогон trading-dates, results-by-date и last-results.
+
+Каждый эндпоинт прогоняется дважды на одном и том же наборе запросов:
+с холодным кэшем (кэш очищается перед прогоном) и с прогретым.
+Для каждого прогона считаются p50/p95/p99 и пропускная способность,
+результат сохраняется в JSON для сравнения между версиями.
+
+По умолчанию приложение запускается в процессе бенчмарка (MODE=test),
+данные - из benchmarks.datagen. Для запущенного сервиса - --url
+(L1-кэш его воркеров не очищается, он живёт MEMORY_CACHE_EXPIRE с):
+    python -m benchmarks.load run --requests 2000 --concurrency 32
+    python -m benchmarks.load run --url http://127.0.0.1:8000
+    python -m benchmarks.load compare base.json new.json --threshold 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator
+
+import numpy as np
+from asgi_lifespan import LifespanManager
+from fastapi_cache import FastAPICache
+from httpx import ASGITransport, AsyncClient
+
+from app.cache import redis_client
+from app.config import settings
+
+REQUESTS = 1000
+CONCURRENCY = 16
+SEED = 42
+THRESHOLD = 0.1
+RESULTS_DIR = Path(__file__).parent / 'results'
+COLD = 'cold'
+WARM = 'warm'
+PHASES = (COLD, WARM)
+ENDPOINTS = ('trading-dates', 'results-by-date', 'last-results')
+PERCENTILES = (50, 95, 99)
+FILTERS = ('oil_id', 'delivery_basis_id', 'delivery_type_id')
+CODES_FIELDS = ','.join(FILTERS)
+
+
+@asynccontextmanager
+async def open_client(url: str | None) -> AsyncIterator[AsyncClient]:
+    if url is not None:
+        async with AsyncClient(base_url=url, timeout=60) as client:
+            yield client
+        return
+    from app.main import app
+
+    async with LifespanManager(app):
+        async with AsyncClient(
+            transport=ASGITransport(app=app),
+            base_url='http://bench',
+            timeout=60,
+        ) as client:
+            yield client
+
+
+async def clear_cache(url: str | None) -> None:
+    if url is None:
+        await FastAPICache.clear()
+        return
+    async for key in redis_client.scan_iter(match='spimex:*'):
+        await redis_client.delete(key)
+
+
+async def sample_space(client: AsyncClient) -> tuple[list[date], dict]:
+    """Даты торгов и коды фильтров, встречающиеся в данных."""
+    dates = (
+        await client.get(
+            '/api/trading-dates', params={'days': settings.max_days_limit}
+        )
+    ).json()
+    results = (
+        await client.get(
+            '/api/last-results',
+            params={
+                'limit': settings.max_page_size,
+                'fields': CODES_FIELDS,
+            },
+        )
+    ).json()['results']
+    codes = {name: sorted({row[name] for row in results}) for name in FILTERS}
+    return [date.fromisoformat(day) for day in dates], codes
+
+
+def random_filters(rng: random.Random, codes: dict) -> dict:
+    filters = {}
+    for name in FILTERS:
+        if codes[name] and rng.random() < 0.3:
+            filters[name] = rng.choice(codes[name])
+    return filters
+
+
+def build_requests(
+    endpoint: str,
+    count: int,
+    dates: list[date],
+    codes: dict,
+    rng: random.Random,
+) -> list[dict]:
+    requests = []
+    for _ in range(count):
+        if endpoint == 'trading-dates':
+            params = {'days': rng.randint(1, settings.max_days_limit)}
+        elif endpoint == 'results-by-date':
+            end_date = rng.choice(dates)
+            start_date = end_date - timedelta(
+                days=rng.randint(0, settings.max_days_range - 1)
+            )
+            params = {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                **random_filters(rng, codes),
+            }
+        else:
+            params = random_filters(rng, codes)
+        requests.append(params)
+    return requests
+
+
+async def drive(
+    client: AsyncClient, endpoint: str, requests: list[dict], concurrency: int
+) -> dict:
+    latencies, errors = [], 0
+    queue = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for params in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.get(f'/api/{endpoint}', params=params)
+                response.raise_for_status()
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    milliseconds = np.array(latencies) * 1000
+    return {
+        'requests': len(requests),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'mean_ms': round(float(milliseconds.mean()), 3) if latencies else None,
+        **{
+            f'p{percentile}_ms': (
+                round(float(np.percentile(milliseconds, percentile)), 3)
+                if latencies
+                else None
+            )
+            for percentile in PERCENTILES
+        },
+    }
+
+
+def git_version() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.url is None:
+        assert settings.mode == 'test', (
+            'Прогон в процессе запускается только на MODE=test'
+        )
+    rng = random.Random(args.seed)
+    results = {phase: {} for phase in PHASES}
+    async with open_client(args.url) as client:
+        dates, codes = await sample_space(client)
+        assert dates, 'Нет данных: загрузите их через benchmarks.datagen'
+        for endpoint in ENDPOINTS:
+            requests = build_requests(
+                endpoint, args.requests, dates, codes, rng
+            )
+            await clear_cache(args.url)
+            for phase in PHASES:
+                results[phase][endpoint] = await drive(
+                    client, endpoint, requests, args.concurrency
+                )
+    return {
+        'meta': {
+            'version': git_version(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'target': args.url or 'asgi',
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'seed': args.seed,
+            'trading_days': len(dates),
+        },
+        'results': results,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(
+        f'{report["meta"]["version"]}: {report["meta"]["requests"]} '
+        f'запросов, параллельно {report["meta"]["concurrency"]}'
+    )
+    for phase, endpoints in report['results'].items():
+        for endpoint, stats in endpoints.items():
+            print(
+                f'{phase:<5} {endpoint:<16} '
+                f'p50 {stats["p50_ms"]:>8} мс  p95 {stats["p95_ms"]:>8} мс  '
+                f'p99 {stats["p99_ms"]:>8} мс  {stats["rps"]:>8} rps  '
+                f'ошибок {stats["errors"]}'
+            )
+
+
+def compare(base: dict, new: dict, threshold: float) -> list[str]:
+    """Строки сравнения; регрессии (хуже порога) помечены '!'."""
+    lines = []
+    for phase, endpoints in new['results'].items():
+        for endpoint, stats in endpoints.items():
+            old = base['results'].get(phase, {}).get(endpoint)
+            if old is None:
+                continue
+            for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'rps'):
+                if not old[metric] or stats[metric] is None:
+                    continue
+                change = stats[metric] / old[metric] - 1
+                worse = -change if metric == 'rps' else change
+                mark = '!' if worse > threshold else ' '
+                lines.append(
+                    f'{mark} {phase:<5} {endpoint:<16} {metric:<6} '
+                    f'{old[metric]:>10} -> {stats[metric]:>10} '
+                    f'({change:+.1%})'
+                )
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run')
+    run_parser.add_argument('--url')
+    run_parser.add_argument('--requests', type=int, default=REQUESTS)
+    run_parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    run_parser.add_argument('--seed', type=int, default=SEED)
+    run_parser.add_argument('--output', type=Path)
+    compare_parser = commands.add_parser('compare')
+    compare_parser.add_argument('base', type=Path)
+    compare_parser.add_argument('new', type=Path)
+    compare_parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = parser.parse_args()
+    if args.command == 'compare':
+        lines = compare(
+            json.loads(args.base.read_text()),
+            json.loads(args.new.read_text()),
+            args.threshold,
+        )
+        print('\n'.join(lines))
+        sys.exit(any(line.startswith('!') for line in lines))
+    report = asyncio.run(run(args))
+    print_report(report)
+    output = args.output or RESULTS_DIR / f'{report["meta"]["version"]}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    print(f'Результаты: {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Задержка запросов: обычная таблица против секционированной по месяцам.
+
+Запуск на тестовой БД (MODE=test), по умолчанию 10 млн строк:
+    python -m benchmarks.partitioning --rows 10000000
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.crud import read_trading_rows
+from app.db import Base
+from app.partitions import MONTH, TABLE, migrate_table
+from app.schemas import DynamicTradingResultsQuery, TradingResultsQuery
+
+ROWS = 10_000_000
+PRODUCTS_PER_DAY = 1000
+REPEATS = 5
+FIRST_DATE = date(2000, 1, 1)
+PLAIN = 'bench_plain'
+PARTITIONED = 'bench_partitioned'
+FILL = f"""
+INSERT INTO {TABLE} (
+    exchange_product_id, exchange_product_name, delivery_basis_name,
+    volume, total, count, date, created_on, updated_on
+)
+SELECT
+    'A' || lpad((n % {PRODUCTS_PER_DAY} % 100)::text, 3, '0')
+        || 'B' || chr(65 + n % {PRODUCTS_PER_DAY} % 26) || 'C'
+        || lpad((n % {PRODUCTS_PER_DAY})::text, 3, '0')
+        || (ARRAY['F', 'J'])[n % 2 + 1],
+    'Инструмент ' || n % {PRODUCTS_PER_DAY},
+    'Базис поставки ' || n % {PRODUCTS_PER_DAY} % 26,
+    n % {PRODUCTS_PER_DAY} + 1,
+    (n % {PRODUCTS_PER_DAY} + 1) * 1000,
+    n % 10 + 1,
+    DATE '{FIRST_DATE}' + (n / {PRODUCTS_PER_DAY})::int,
+    now(),
+    now()
+FROM generate_series(0, :rows - 1) AS n
+"""
+
+
+def schema_engine(schema: str):
+    return create_async_engine(
+        settings.database_url,
+        connect_args={'server_settings': {'search_path': schema}},
+    )
+
+
+async def fill(schema: str, rows: int) -> None:
+    engine = schema_engine(schema)
+    async with engine.begin() as connection:
+        await connection.execute(
+            text(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+        )
+        await connection.execute(text(f'CREATE SCHEMA {schema}'))
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(text(FILL), {'rows': rows})
+        if schema == PARTITIONED:
+            started = time.perf_counter()
+            await migrate_table(connection, MONTH)
+            print(f'Перевод в секции: {time.perf_counter() - started:.1f} с')
+    async with engine.connect() as connection:
+        await connection.execution_options(isolation_level='AUTOCOMMIT')
+        await connection.execute(text(f'VACUUM ANALYZE {TABLE}'))
+    await engine.dispose()
+
+
+async def measure(session_factory, filters, **kwargs) -> float:
+    best = float('inf')
+    for _ in range(REPEATS):
+        async with session_factory() as session:
+            started = time.perf_counter()
+            await read_trading_rows(session, filters, **kwargs)
+            best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+async def run_queries(schema: str, last_date: date) -> dict[str, float]:
+    engine = schema_engine(schema)
+    session_factory = sessionmaker(engine, class_=AsyncSession)
+    page = settings.page_size + 1
+    week = DynamicTradingResultsQuery(
+        start_date=last_date - timedelta(days=6), end_date=last_date
+    )
+    year = DynamicTradingResultsQuery(
+        start_date=last_date - timedelta(days=364),
+        end_date=last_date,
+        oil_id='A042',
+    )
+    timings = {
+        'results-by-date, неделя': await measure(
+            session_factory, week, limit=page
+        ),
+        'results-by-date, год, oil_id': await measure(
+            session_factory, year, limit=page
+        ),
+        'last-results, max(date)': await measure(
+            session_factory, TradingResultsQuery(), last=True, limit=page
+        ),
+        'last-results, дата из календаря': await measure(
+            session_factory,
+            TradingResultsQuery(),
+            trading_date=last_date,
+            limit=page,
+        ),
+    }
+    await engine.dispose()
+    return timings
+
+
+async def main():
+    assert settings.mode == 'test', 'Бенчмарк запускается только на MODE=test'
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=ROWS)
+    args = parser.parse_args()
+    last_date = FIRST_DATE + timedelta(
+        days=(args.rows - 1) // PRODUCTS_PER_DAY
+    )
+    try:
+        results = {}
+        for schema in (PLAIN, PARTITIONED):
+            await fill(schema, args.rows)
+            results[schema] = await run_queries(schema, last_date)
+        print(f'{args.rows} строк, лучшее из {REPEATS}, мс:')
+        for query, plain in results[PLAIN].items():
+            partitioned = results[PARTITIONED][query]
+            print(
+                f'{query:<34} обычная {plain:8.2f}, '
+                f'секционированная {partitioned:8.2f}'
+            )
+    finally:
+        engine = create_async_engine(settings.database_url)
+        async with engine.begin() as connection:
+            for schema in (PLAIN, PARTITIONED):
+                await connection.execute(
+                    text(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+                )
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""Стоимость строки ответа: ORM + Pydantic против кортежей + orjson.
+
+Запуск на тестовой БД (MODE=test):
+    python -m benchmarks.serialization
+"""
+
+import asyncio
+import time
+from datetime import date, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi_cache.coder import JsonCoder
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.responses import JSONResponse
+
+from app.cache import encode_json
+from app.config import settings
+from app.crud import read_trading_results_from_db, read_trading_rows
+from app.db import Base, TradingResults
+from app.schemas import DynamicTradingResultsQuery, TradingResultsDB
+
+ROW_COUNTS = (10_000, 100_000)
+PRODUCTS_PER_DAY = 1000
+REPEATS = 3
+INSERT_BATCH = 5000
+FIRST_DATE = date(2020, 1, 1)
+
+
+def synthetic_rows(count: int) -> list[dict]:
+    rows = []
+    for number in range(count):
+        day, product = divmod(number, PRODUCTS_PER_DAY)
+        rows.append(
+            dict(
+                exchange_product_id=(
+                    f'A{product % 100:03d}B{product % 26 + 65:c}C'
+                    f'{product:03d}{"FJ"[product % 2]}'
+                ),
+                exchange_product_name=f'Инструмент {product}',
+                delivery_basis_name=f'Базис поставки {product % 26}',
+                volume=product + 1,
+                total=(product + 1) * 1000,
+                count=product % 10 + 1,
+                date=FIRST_DATE + timedelta(days=day),
+            )
+        )
+    return rows
+
+
+async def orm_path(session: AsyncSession, filters) -> bytes:
+    rows = await read_trading_results_from_db(session, filters)
+    JsonCoder.encode(rows)
+    return JSONResponse(
+        jsonable_encoder([TradingResultsDB.from_orm(row) for row in rows])
+    ).body
+
+
+async def row_path(session: AsyncSession, filters) -> bytes:
+    return encode_json(await read_trading_rows(session, filters))
+
+
+async def measure(session_factory, path, filters, count: int) -> float:
+    best = float('inf')
+    for _ in range(REPEATS):
+        async with session_factory() as session:
+            started = time.perf_counter()
+            await path(session, filters)
+            best = min(best, time.perf_counter() - started)
+    return best / count * 1_000_000
+
+
+async def main():
+    assert settings.mode == 'test', 'Бенчмарк запускается только на MODE=test'
+    engine = create_async_engine(settings.database_url)
+    session_factory = sessionmaker(engine, class_=AsyncSession)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    try:
+        for count in ROW_COUNTS:
+            async with engine.begin() as connection:
+                await connection.execute(TradingResults.__table__.delete())
+                rows = synthetic_rows(count)
+                for start in range(0, count, INSERT_BATCH):
+                    await connection.execute(
+                        insert(TradingResults),
+                        rows[start : start + INSERT_BATCH],
+                    )
+            filters = DynamicTradingResultsQuery(
+                start_date=FIRST_DATE, end_date=rows[-1]['date']
+            )
+            orm = await measure(session_factory, orm_path, filters, count)
+            fast = await measure(session_factory, row_path, filters, count)
+            print(
+                f'{count:>7} строк: ORM+Pydantic {orm:.2f} мкс/строка, '
+                f'кортежи+orjson {fast:.2f} мкс/строка, '
+                f'ускорение x{orm / fast:.1f}'
+            )
+    finally:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""Таблица результатов торгов.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Для уже существующей таблицы достаточно `alembic stamp 0001`.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'spimex_trading_results',
+        sa.Column(
+            'id',
+            sa.Integer(),
+            primary_key=True,
+            comment='Уникальный идентификатор',
+        ),
+        sa.Column(
+            'exchange_product_id', sa.String(), comment='Код Инструмента'
+        ),
+        sa.Column(
+            'exchange_product_name',
+            sa.String(),
+            comment='Наименование Инструмента',
+        ),
+        sa.Column(
+            'oil_id',
+            sa.String(),
+            sa.Computed(
+                'substring(exchange_product_id from 1 for 4)', persisted=True
+            ),
+            comment='exchange_product_id[:4]',
+        ),
+        sa.Column(
+            'delivery_basis_id',
+            sa.String(),
+            sa.Computed(
+                'substring(exchange_product_id from 5 for 3)', persisted=True
+            ),
+            comment='exchange_product_id[4:7]',
+        ),
+        sa.Column(
+            'delivery_basis_name', sa.String(), comment='Базис поставки'
+        ),
+        sa.Column(
+            'delivery_type_id',
+            sa.String(),
+            sa.Computed('right(exchange_product_id, 1)', persisted=True),
+            comment='exchange_product_id[-1]',
+        ),
+        sa.Column(
+            'volume',
+            sa.Integer(),
+            comment='Объем Договоров в единицах измерения',
+        ),
+        sa.Column('total', sa.Integer(), comment='Объем Договоров, руб.'),
+        sa.Column('count', sa.Integer(), comment='Количество Договоров, шт.'),
+        sa.Column('date', sa.Date(), comment='Дата торгов'),
+        sa.Column(
+            'created_on', sa.DateTime(), comment='Дата и время создания записи'
+        ),
+        sa.Column(
+            'updated_on',
+            sa.DateTime(),
+            comment='Дата и время обновления записи',
+        ),
+        sa.UniqueConstraint(
+            'date', 'exchange_product_id', name='uix_date_product'
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('spimex_trading_results')
@@ -0,0 +1,54 @@
+"""Индексы под запросы app/crud.py.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Диапазон дат, `date = max(date)` и сортировку обслуживает
+uix_date_product (date, exchange_product_id). Добавляются:
+- ix_oil_date, ix_delivery_basis_date - фильтр по инструменту или
+  базису на длинном периоде (выгрузка, динамика);
+- ix_updated_on_date - поиск изменённых дат по updated_on без чтения
+  таблицы (покрывающий, INCLUDE date).
+
+delivery_type_id - одна буква, отдельный индекс по нему не окупается.
+Индексы строятся CONCURRENTLY, чтобы не блокировать запись в таблицу.
+"""
+
+from alembic import op
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+TABLE = 'spimex_trading_results'
+INDEXES = (
+    ('ix_oil_date', ['oil_id', 'date'], {}),
+    ('ix_delivery_basis_date', ['delivery_basis_id', 'date'], {}),
+    ('ix_updated_on_date', ['updated_on'], {'postgresql_include': ['date']}),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns, options in INDEXES:
+            op.create_index(
+                name,
+                TABLE,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **options,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.drop_index(
+                name,
+                table_name=TABLE,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,62 @@
+"""Дневные итоги торгов для агрегатов.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Таблица заполняется сервисом (app.crud.sync_rollups) при первой
+проверке данных и дальше пересчитывается только по изменённым датам.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'spimex_daily_rollups',
+        sa.Column('date', sa.Date(), primary_key=True, comment='Дата торгов'),
+        sa.Column(
+            'oil_id', sa.String(), primary_key=True, comment='ID нефтепродукта'
+        ),
+        sa.Column(
+            'delivery_basis_id',
+            sa.String(),
+            primary_key=True,
+            comment='ID базиса поставки',
+        ),
+        sa.Column(
+            'delivery_type_id',
+            sa.String(),
+            primary_key=True,
+            comment='ID типа поставки',
+        ),
+        sa.Column(
+            'volume', sa.BigInteger(), comment='Суммарный объем Договоров'
+        ),
+        sa.Column(
+            'total', sa.BigInteger(), comment='Суммарный объем Договоров, руб.'
+        ),
+        sa.Column(
+            'count',
+            sa.BigInteger(),
+            comment='Суммарное количество Договоров',
+        ),
+        sa.Column(
+            'updated_on',
+            sa.DateTime(),
+            comment='Максимальный updated_on строк группы',
+        ),
+    )
+    op.create_index(
+        'ix_rollup_updated_on', 'spimex_daily_rollups', ['updated_on']
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('spimex_daily_rollups')
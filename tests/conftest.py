@@ -1,15 +1,22 @@
+import asyncio
+from pathlib import Path
+
 import pytest_asyncio
+from alembic import command
+from alembic.config import Config
 from asgi_lifespan import LifespanManager
+from fastapi_cache import FastAPICache
 from httpx import ASGITransport, AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
-from app.db import Base
 from app.main import app
 
 pytest_plugins = ['fixtures.data']
 
+MIGRATIONS = Path(__file__).parent.parent / 'migrations'
+
 engine = create_async_engine(settings.database_url)
 
 TestingSessionLocal = sessionmaker(
@@ -20,14 +27,28 @@ TestingSessionLocal = sessionmaker(
 )
 
 
+def migrate(revision: str) -> None:
+    """Применяет миграции Alembic к тестовой базе.
+
+    Схема строится миграциями, а не по моделям, чтобы тесты проверяли
+    те же таблицы и индексы, что и в рабочей базе. env.py запускает
+    свой цикл событий, поэтому вызывается в отдельном потоке.
+    """
+    config = Config()
+    config.set_main_option('script_location', str(MIGRATIONS))
+    if revision == 'base':
+        command.downgrade(config, revision)
+    else:
+        command.upgrade(config, revision)
+
+
 @pytest_asyncio.fixture(scope='session', autouse=True)
 async def setup_db():
     assert settings.mode == 'test'
-    async with engine.begin() as connection:
-        await connection.run_sync(Base.metadata.create_all)
+    await asyncio.to_thread(migrate, 'head')
     yield
-    async with engine.begin() as connection:
-        await connection.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+    await asyncio.to_thread(migrate, 'base')
 
 
 @pytest_asyncio.fixture(scope='session', autouse=True)
@@ -40,6 +61,7 @@ async def load_trading_results(setup_db, trading_results):
 @pytest_asyncio.fixture(scope='session')
 async def client(setup_db):
     async with LifespanManager(app):
+        await FastAPICache.clear()
         async with AsyncClient(
             transport=ASGITransport(app=app),
             base_url='http://test',
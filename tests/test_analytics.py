@@ -0,0 +1,39 @@
+from datetime import date
+
+import pytest
+
+from app.analytics import price_series
+
+ROWS = [
+    (date(2025, 7, 14), 100, 1000),
+    (date(2025, 7, 15), 0, 0),
+    (date(2025, 7, 16), 50, 600),
+    (date(2025, 7, 17), 200, 2200),
+    (date(2025, 7, 18), 100, 1320),
+]
+
+
+def test_price_series():
+    series = price_series(ROWS, window=2)
+    assert series['date'] == [row[0] for row in ROWS], 'Даты не совпадают'
+    assert series['vwap'] == [10.0, None, 12.0, 11.0, 13.2], 'Неверный VWAP'
+    assert series['rolling_mean'] == pytest.approx(
+        [None, None, None, 11.5, 12.1]
+    ), 'Неверное скользящее среднее'
+    assert series['change'] == pytest.approx([None, None, None, -1.0, 2.2]), (
+        'Неверное изменение за день'
+    )
+    assert series['change_pct'][3:] == pytest.approx([-100 / 12, 20.0]), (
+        'Неверное изменение за день в процентах'
+    )
+
+
+@pytest.mark.parametrize('window, expected', [(5, 2), (6, 1), (7, 0)])
+def test_rolling_mean_needs_full_window(window, expected):
+    series = price_series(ROWS[2:] * 2, window=window)
+    filled = [value for value in series['rolling_mean'] if value is not None]
+    assert len(filled) == expected, 'Среднее посчитано по неполному окну'
+
+
+def test_empty_series():
+    assert price_series([], window=5)['vwap'] == [], 'Пустой ряд не пуст'
@@ -1,3 +1,5 @@
+import csv
+import io
 from datetime import date
 from http import HTTPStatus
 
@@ -5,7 +7,12 @@ import pytest
 from pydantic import ValidationError, parse_raw_as
 
 from app.config import settings
-from app.schemas import TradingResultsDB
+from app.schemas import (
+    AggregateRow,
+    PriceSeries,
+    TradingResultsDB,
+    TradingResultsPage,
+)
 
 
 class TestGetLastTradingDates:
@@ -66,12 +73,12 @@ class TestGetDynamics:
         if response.status_code == HTTPStatus.OK:
             try:
                 trading_results = parse_raw_as(
-                    list[TradingResultsDB], response.text
-                )
+                    TradingResultsPage, response.text
+                ).results
             except ValidationError as error:  # pragma: no cover
                 pytest.fail(
                     f'JSON не соответствует формату '
-                    f'[list[TradingResultsDB]]: {error}'
+                    f'[TradingResultsPage]: {error}'
                 )   
             assert len(trading_results) == expected_count, (
                 f'Ожидали {expected_count} записей, '
@@ -118,12 +125,12 @@ class TestGetTradingResults:
         if response.status_code == HTTPStatus.OK:
             try:
                 trading_results = parse_raw_as(
-                    list[TradingResultsDB], response.text
-                )
+                    TradingResultsPage, response.text
+                ).results
             except ValidationError as error:  # pragma: no cover
                 pytest.fail(
                     f'JSON не соответствует формату '
-                    f'[list[TradingResultsDB]]: {error}'
+                    f'[TradingResultsPage]: {error}'
                 )
             assert len(trading_results) == expected_count, (
                 f'Ожидали {expected_count} записей, '
@@ -134,3 +141,330 @@ class TestGetTradingResults:
                     -tr.date.toordinal(), tr.exchange_product_id
                 )
             ), 'Нарушен порядок сортировки'
+
+
+class TestPagination:
+    # fmt: off
+    @pytest.mark.parametrize('url, params, expected_count', [
+            ('/api/results-by-date', {'start_date': '2025-07-16', 'end_date': '2025-07-18'}, 5),  # noqa: E501
+            ('/api/last-results', {}, 2),
+    ])
+    # fmt: on
+    async def test_pages_cover_whole_result(
+        self, client, url, params, expected_count
+    ):
+        full = parse_raw_as(
+            TradingResultsPage, (await client.get(url, params=params)).text
+        )
+        assert full.next_cursor is None, 'Лишний курсор у полной выборки'
+        collected, cursor = [], None
+        while True:
+            page_params = {**params, 'limit': 2}
+            if cursor is not None:
+                page_params['cursor'] = cursor
+            page = parse_raw_as(
+                TradingResultsPage,
+                (await client.get(url, params=page_params)).text,
+            )
+            assert len(page.results) <= 2, 'Страница больше limit'
+            collected.extend(page.results)
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+        assert len(collected) == expected_count, (
+            f'Ожидали {expected_count} записей, получили {len(collected)}'
+        )
+        assert collected == full.results, 'Страницы не совпадают с выборкой'
+
+    # fmt: off
+    @pytest.mark.parametrize('params', [
+            {'limit': 0},
+            {'limit': settings.max_page_size + 1},
+            {'cursor': 'not-a-cursor'},
+            {'cursor': ''},
+    ])
+    # fmt: on
+    async def test_invalid_page_params(self, client, params):
+        response = await client.get('/api/last-results', params=params)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, (
+            f'Статус {response.status_code} вместо 422'
+        )
+
+
+class TestProjection:
+    # fmt: off
+    @pytest.mark.parametrize('url, params', [
+            ('/api/results-by-date', {'start_date': '2025-07-16', 'end_date': '2025-07-18'}),  # noqa: E501
+            ('/api/last-results', {}),
+    ])
+    # fmt: on
+    async def test_projection_narrows_results(self, client, url, params):
+        full = (await client.get(url, params=params)).json()
+        response = await client.get(
+            url, params={**params, 'fields': 'total,oil_id'}
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            f'Статус {response.status_code} вместо 200'
+        )
+        expected = ['exchange_product_id', 'oil_id', 'total', 'date']
+        projected = response.json()['results']
+        assert [list(row) for row in projected] == [expected] * len(
+            full['results']
+        ), 'Лишние или недостающие поля в ответе'
+        assert projected == [
+            {name: row[name] for name in expected} for row in full['results']
+        ], 'Значения полей отличаются от полного ответа'
+
+    async def test_projection_is_part_of_cache_key(self, client):
+        first = await client.get(
+            '/api/last-results', params={'fields': 'total'}
+        )
+        other = await client.get(
+            '/api/last-results', params={'fields': 'volume'}
+        )
+        assert other.headers['X-FastAPI-Cache'] == 'MISS', (
+            'Ответ с другими полями взят из кэша'
+        )
+        same = await client.get(
+            '/api/last-results', params={'fields': 'date, total'}
+        )
+        assert same.headers['X-FastAPI-Cache'] == 'HIT', (
+            'Тот же набор полей не попал в кэш'
+        )
+        assert same.json() == first.json(), 'Ответы из кэша отличаются'
+
+    # fmt: off
+    @pytest.mark.parametrize('fields', [
+            'unknown',
+            'total,id',
+            '',
+    ])
+    # fmt: on
+    async def test_invalid_fields(self, client, fields):
+        response = await client.get(
+            '/api/last-results', params={'fields': fields}
+        )
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, (
+            f'Статус {response.status_code} вместо 422'
+        )
+
+
+class TestExport:
+    PARAMS = {'start_date': '2025-01-01', 'end_date': '2025-12-31'}
+
+    async def test_export_ndjson(self, client):
+        response = await client.get('/api/export', params=self.PARAMS)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Статус {response.status_code} вместо 200'
+        )
+        assert response.headers['content-type'].startswith(
+            'application/x-ndjson'
+        ), 'Неверный тип содержимого'
+        trading_results = [
+            TradingResultsDB.parse_raw(line)
+            for line in response.text.splitlines()
+        ]
+        assert len(trading_results) == 5, (
+            f'Ожидали 5 записей, получили {len(trading_results)}'
+        )
+        assert trading_results == sorted(
+            trading_results,
+            key=lambda tr: (-tr.date.toordinal(), tr.exchange_product_id),
+        ), 'Нарушен порядок сортировки'
+
+    async def test_export_csv(self, client):
+        response = await client.get(
+            '/api/export', params={**self.PARAMS, 'format': 'csv'}
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            f'Статус {response.status_code} вместо 200'
+        )
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 5, f'Ожидали 5 записей, получили {len(rows)}'
+        assert TradingResultsDB.parse_obj(rows[0]), 'Строка CSV не читается'
+
+    async def test_export_csv_projection(self, client):
+        response = await client.get(
+            '/api/export',
+            params={**self.PARAMS, 'format': 'csv', 'fields': 'total'},
+        )
+        header, *rows = csv.reader(io.StringIO(response.text))
+        assert header == ['exchange_product_id', 'total', 'date'], (
+            f'Неверный заголовок CSV: {header}'
+        )
+        assert len(rows) == 5 and all(len(row) == 3 for row in rows), (
+            'Строки CSV не совпадают с заголовком'
+        )
+
+    # fmt: off
+    @pytest.mark.parametrize('params', [
+            {'start_date': '2020-01-01', 'end_date': '2025-12-31'},
+            {'start_date': '2025-07-18', 'end_date': '2025-07-17'},
+            {'start_date': '2025-07-17', 'end_date': '2025-07-18', 'format': 'xml'},  # noqa: E501
+    ])
+    # fmt: on
+    async def test_export_invalid_params(self, client, params):
+        response = await client.get('/api/export', params=params)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, (
+            f'Статус {response.status_code} вместо 422'
+        )
+
+
+class TestAggregates:
+    PARAMS = {'start_date': '2025-07-16', 'end_date': '2025-07-18'}
+
+    # fmt: off
+    @pytest.mark.parametrize('params, expected', [
+        ({}, [('2025-07-18', 'C303', 140), ('2025-07-18', 'D410', 150), ('2025-07-17', 'A106', 120), ('2025-07-17', 'B205', 130), ('2025-07-16', 'A106', 100)]),  # noqa: E501
+        ({'period': 'week'}, [('2025-07-14', 'A106', 220), ('2025-07-14', 'B205', 130), ('2025-07-14', 'C303', 140), ('2025-07-14', 'D410', 150)]),  # noqa: E501
+        ({'period': 'week', 'group_by': 'delivery_basis_id'}, [('2025-07-14', 'KZN', 140), ('2025-07-14', 'MST', 120), ('2025-07-14', 'NVO', 130), ('2025-07-14', 'PDK', 250)]),  # noqa: E501
+        ({'period': 'week', 'group_by': 'delivery_type_id'}, [('2025-07-14', 'J', 380), ('2025-07-14', 'K', 120), ('2025-07-14', 'L', 140)]),  # noqa: E501
+        ({'period': 'week', 'oil_id': 'A106'}, [('2025-07-14', 'A106', 220)]),  # noqa: E501
+    ])
+    # fmt: on
+    async def test_get_aggregates(self, client, params, expected):
+        response = await client.get(
+            '/api/aggregates', params={**self.PARAMS, **params}
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            f'Статус {response.status_code} вместо 200'
+        )
+        rows = parse_raw_as(list[AggregateRow], response.content)
+        assert [
+            (row.date.isoformat(), row.key, row.volume) for row in rows
+        ] == expected, 'Неверные итоги по группам'
+
+    async def test_average_price(self, client):
+        response = await client.get(
+            '/api/aggregates',
+            params={**self.PARAMS, 'period': 'week', 'oil_id': 'A106'},
+        )
+        (row,) = parse_raw_as(list[AggregateRow], response.content)
+        assert (row.total, row.count) == (18500000, 5), 'Неверные суммы'
+        assert row.avg_price == pytest.approx(18500000 / 220), (
+            'Средняя цена не равна total/volume'
+        )
+
+    # fmt: off
+    @pytest.mark.parametrize('params', [
+            {'start_date': '2015-01-01', 'end_date': '2025-12-31'},
+            {'start_date': '2025-07-17', 'end_date': '2025-07-18', 'period': 'month'},  # noqa: E501
+            {'start_date': '2025-07-17', 'end_date': '2025-07-18', 'group_by': 'date'},  # noqa: E501
+    ])
+    # fmt: on
+    async def test_aggregates_invalid_params(self, client, params):
+        response = await client.get('/api/aggregates', params=params)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, (
+            f'Статус {response.status_code} вместо 422'
+        )
+
+
+class TestAnalytics:
+    PARAMS = {'start_date': '2025-07-16', 'end_date': '2025-07-18'}
+
+    # fmt: off
+    @pytest.mark.parametrize('params, expected_dates, expected_vwap', [
+        ({'oil_id': 'A106', 'window': 2}, [date(2025, 7, 16), date(2025, 7, 17)], [90000.0, 9500000 / 120]),  # noqa: E501
+        ({'exchange_product_id': 'A106PDK001J'}, [date(2025, 7, 16)], [90000.0]),  # noqa: E501
+        ({'oil_id': 'A106', 'delivery_basis_id': 'MST'}, [date(2025, 7, 17)], [9500000 / 120]),  # noqa: E501
+    ])
+    # fmt: on
+    async def test_get_analytics(
+        self, client, params, expected_dates, expected_vwap
+    ):
+        response = await client.get(
+            '/api/analytics', params={**self.PARAMS, **params}
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            f'Статус {response.status_code} вместо 200'
+        )
+        series = PriceSeries.parse_raw(response.content)
+        assert series.date == expected_dates, 'Неверные даты ряда'
+        assert series.vwap == pytest.approx(expected_vwap), 'Неверный VWAP'
+
+    # fmt: off
+    @pytest.mark.parametrize('params', [
+            {'start_date': '2025-07-16', 'end_date': '2025-07-18'},
+            {'start_date': '2025-07-16', 'end_date': '2025-07-18', 'oil_id': 'A106', 'window': 1},  # noqa: E501
+            {'start_date': '2015-01-01', 'end_date': '2025-12-31', 'oil_id': 'A106'},  # noqa: E501
+    ])
+    # fmt: on
+    async def test_analytics_invalid_params(self, client, params):
+        response = await client.get('/api/analytics', params=params)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, (
+            f'Статус {response.status_code} вместо 422'
+        )
+
+
+class TestBatch:
+    # fmt: off
+    QUERIES = {
+        'last': ({}, '/api/last-results'),
+        'last-oil': ({'oil_id': 'D410'}, '/api/last-results'),
+        'range': ({'start_date': '2025-07-16', 'end_date': '2025-07-18', 'limit': 2}, '/api/results-by-date'),  # noqa: E501
+        'range-basis': ({'start_date': '2025-07-10', 'end_date': '2025-07-17', 'delivery_basis_id': 'PDK'}, '/api/results-by-date'),  # noqa: E501
+        'range-fields': ({'start_date': '2025-07-16', 'end_date': '2025-07-18', 'fields': 'volume,oil_id'}, '/api/results-by-date'),  # noqa: E501
+    }
+    # fmt: on
+
+    async def test_batch_matches_single_requests(self, client):
+        response = await client.post(
+            '/api/batch',
+            json={
+                'queries': {
+                    query_id: params
+                    for query_id, (params, _) in self.QUERIES.items()
+                }
+            },
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            f'Статус {response.status_code} вместо 200'
+        )
+        pages = response.json()
+        assert list(pages) == list(self.QUERIES), (
+            'Ответы не разложены по ключам пакета'
+        )
+        for query_id, (params, url) in self.QUERIES.items():
+            single = await client.get(url, params=params)
+            if url == '/api/last-results':
+                assert single.headers['X-FastAPI-Cache'] == 'HIT', (
+                    f'Ответ на {query_id} не попал в общий кэш'
+                )
+            assert pages[query_id] == single.json(), (
+                f'Ответ на {query_id} отличается от одиночного запроса'
+            )
+        assert pages['range']['next_cursor'] is not None, (
+            'Нет курсора следующей страницы'
+        )
+
+    async def test_batch_reads_cached_entries(self, client, mocker):
+        await client.get('/api/last-results', params={'oil_id': 'C303'})
+        read_pages = mocker.patch('app.batch.read_trading_pages')
+        response = await client.post(
+            '/api/batch', json={'queries': {'cached': {'oil_id': 'C303'}}}
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            f'Статус {response.status_code} вместо 200'
+        )
+        read_pages.assert_not_called()
+        assert len(response.json()['cached']['results']) == 1, (
+            'Из кэша вернулся не тот ответ'
+        )
+
+    # fmt: off
+    @pytest.mark.parametrize('queries', [
+            {},
+            {str(number): {} for number in range(settings.max_batch_size + 1)},  # noqa: E501
+            {'a': {'start_date': '2025-07-16'}},
+            {'a': {'start_date': '2025-07-18', 'end_date': '2025-07-16'}},
+            {'a': {'start_date': '2025-01-01', 'end_date': '2025-07-16'}},
+            {'a': {'cursor': 'broken'}},
+            {'a': {'limit': 0}},
+            {'a': {'fields': 'unknown'}},
+    ])
+    # fmt: on
+    async def test_batch_invalid_params(self, client, queries):
+        response = await client.post('/api/batch', json={'queries': queries})
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, (
+            f'Статус {response.status_code} вместо 422'
+        )
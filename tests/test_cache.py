@@ -0,0 +1,300 @@
+import asyncio
+from datetime import date
+from http import HTTPStatus
+
+import pytest
+from fastapi_cache import FastAPICache
+
+from app.cache import (
+    L1,
+    L2,
+    CacheStats,
+    MemoryBackend,
+    PipelinedRedisBackend,
+    SingleFlight,
+    TieredBackend,
+    cached_endpoints,
+    encode_json,
+    get_many,
+    get_many_with_ttl,
+    key_namespace,
+    key_params,
+    redis_client,
+    request_key_builder,
+    set_many,
+)
+from app.config import settings
+from app.invalidation import DataVersion, data_watcher
+from app.schemas import (
+    AggregatePeriod,
+    AggregateQuery,
+    AnalyticsQuery,
+    DynamicTradingResultsQuery,
+    TradingResultsQuery,
+)
+
+NAMESPACE = 'spimex:results-by-date'
+
+
+def build_key(**kwargs):
+    return request_key_builder(lambda: None, NAMESPACE, kwargs=kwargs)
+
+
+# fmt: off
+@pytest.mark.parametrize('kwargs, expected_key', [
+    ({'days': 5}, f'{NAMESPACE}:days=5'),
+    ({'session': object(), 'days': 5}, f'{NAMESPACE}:days=5'),
+    ({'filters': TradingResultsQuery()}, f'{NAMESPACE}:'),
+    ({'filters': TradingResultsQuery(oil_id='A106', delivery_type_id='J')}, f'{NAMESPACE}:delivery_type_id=J&oil_id=A106'),  # noqa: E501
+    ({'filters': DynamicTradingResultsQuery(start_date='2025-07-17', end_date=date(2025, 7, 18))}, f'{NAMESPACE}:end_date=2025-07-18&start_date=2025-07-17'),  # noqa: E501
+])
+# fmt: on
+def test_request_key_builder(kwargs, expected_key):
+    key = build_key(**kwargs)
+    assert key == expected_key, f'Ключ {key} вместо {expected_key}'
+    assert key_namespace(key) == 'results-by-date', (
+        'Пространство имён не извлекается из ключа'
+    )
+
+
+# fmt: off
+@pytest.mark.parametrize('first, second', [
+    (AnalyticsQuery(start_date='2025-07-01', end_date='2025-07-18', exchange_product_id='X&oil_id=A106'), AnalyticsQuery(start_date='2025-07-01', end_date='2025-07-18', exchange_product_id='X', oil_id='A106')),  # noqa: E501
+    (AnalyticsQuery(start_date='2025-07-01', end_date='2025-07-18', exchange_product_id='A=B'), AnalyticsQuery(start_date='2025-07-01', end_date='2025-07-18', exchange_product_id='A%3DB')),  # noqa: E501
+])
+# fmt: on
+def test_request_key_builder_escapes_values(first, second):
+    assert build_key(filters=first) != build_key(filters=second), (
+        'Разные запросы получили один ключ кэша'
+    )
+
+
+def test_request_key_builder_round_trip():
+    filters = AggregateQuery(
+        start_date='2025-07-01',
+        end_date='2025-07-18',
+        period=AggregatePeriod.WEEK,
+        oil_id='A:06',
+    )
+    key = build_key(filters=filters)
+    assert key_namespace(key) == 'results-by-date', (
+        'Двоеточие в значении сломало пространство имён'
+    )
+    params = key_params(key)
+    assert params['period'] == 'week', 'Enum попал в ключ не значением'
+    assert AggregateQuery.parse_obj(params) == filters, (
+        'Параметры не восстанавливаются из ключа'
+    )
+
+
+def test_request_key_builder_is_stable_between_sessions():
+    filters = TradingResultsQuery(oil_id='A106')
+    assert build_key(session=object(), filters=filters) == build_key(
+        session=object(), filters=filters
+    ), 'Ключ зависит от объекта сессии'
+
+
+def test_cache_stats():
+    stats = CacheStats()
+    stats.record('last-results', hit=False, tier=L1)
+    stats.record('last-results', hit=True, tier=L1)
+    stats.record('last-results', hit=True, tier=L1)
+    stats.record('last-results', hit=False, tier=L2)
+    stats.record('trading-dates', hit=False)
+    stats.record_event('trading-dates', 'coalesced')
+    assert stats.as_dict() == {
+        'last-results': {
+            L1: {'hits': 2, 'misses': 1, 'hit_ratio': 0.6667},
+            L2: {'hits': 0, 'misses': 1, 'hit_ratio': 0.0},
+        },
+        'trading-dates': {
+            L2: {'hits': 0, 'misses': 1, 'hit_ratio': 0.0},
+            'coalesced': 1,
+        },
+    }, 'Неверная статистика кэша'
+
+
+async def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_size=6, expire=60)
+    await backend.set('spimex:a:', b'aa', 100)
+    await backend.set('spimex:b:', b'bb', 100)
+    await backend.get('spimex:a:')
+    await backend.set('spimex:c:', b'cccc', 100)
+    assert await backend.get('spimex:b:') is None, 'Не вытеснена старая запись'
+    assert await backend.get('spimex:a:') == b'aa', 'Вытеснена свежая запись'
+    assert backend.size <= backend.max_size, 'Превышен объём кэша'
+
+
+async def test_memory_backend_expiry(mocker):
+    backend = MemoryBackend(max_size=100, expire=10)
+    monotonic = mocker.patch('app.cache.time.monotonic', return_value=0)
+    await backend.set('spimex:a:', b'a', 3600)
+    assert await backend.get_with_ttl('spimex:a:') == (3600, b'a'), (
+        'L1 должен сообщать TTL уровня L2'
+    )
+    monotonic.return_value = 11
+    assert await backend.get('spimex:a:') is None, 'Запись не истекла в L1'
+
+
+async def test_tiered_backend_fills_memory_from_backend():
+    memory = MemoryBackend(max_size=100, expire=60)
+    shared = MemoryBackend(max_size=100, expire=3600)
+    await shared.set('spimex:a:', b'a', 3600)
+    tiered = TieredBackend(memory, shared)
+    assert await tiered.get('spimex:a:') == b'a', 'Не прочитано из L2'
+    assert await memory.get('spimex:a:') == b'a', 'L1 не заполнен из L2'
+    assert await tiered.clear(namespace='spimex') == 1
+    assert await memory.get('spimex:a:') is None, 'L1 не очищен'
+
+
+async def test_tiered_backend_get_many():
+    memory = MemoryBackend(max_size=100, expire=60)
+    shared = MemoryBackend(max_size=100, expire=3600)
+    await memory.set('spimex:a:1', b'1', 3600)
+    await shared.set('spimex:a:2', b'2', 3600)
+    keys = ['spimex:a:1', 'spimex:a:2', 'spimex:a:3']
+    entries = await get_many_with_ttl(TieredBackend(memory, shared), keys)
+    assert [value for _, value in entries] == [b'1', b'2', None], (
+        'Пакетное чтение вернуло не те значения'
+    )
+    assert await memory.get('spimex:a:2') == b'2', 'L1 не заполнен из L2'
+
+
+async def test_pipelined_redis_backend_get_many(client):
+    backend = PipelinedRedisBackend(redis_client)
+    await backend.set('spimex-test:a:1', b'1', 100)
+    try:
+        entries = await backend.get_many_with_ttl(
+            ['spimex-test:a:1', 'spimex-test:a:2']
+        )
+    finally:
+        await backend.clear(key='spimex-test:a:1')
+    (ttl, value), missing = entries
+    assert value == b'1' and 0 < ttl <= 100, 'Неверная запись из Redis'
+    assert missing[1] is None, 'Отсутствующий ключ вернул значение'
+
+
+async def test_pipelined_redis_backend_set_many(client):
+    backend = PipelinedRedisBackend(redis_client)
+    keys = ['spimex-test:a:1', 'spimex-test:a:2', 'spimex-test:a:3']
+    try:
+        await set_many(backend, [(keys[0], b'1', None), (keys[1], b'2', 100)])
+        values = await get_many(backend, keys)
+        (persistent, _), (expiring, _) = await backend.get_many_with_ttl(
+            keys[:2]
+        )
+    finally:
+        await backend.clear(namespace='spimex-test')
+    assert values == [b'1', b'2', None], 'Пакетное чтение вернуло не то'
+    assert persistent == -1, 'Запись без срока жизни получила TTL'
+    assert 0 < expiring <= 100, 'Запись со сроком жизни записана без TTL'
+
+
+async def test_single_flight_coalesces_concurrent_loads():
+    flight = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return b'payload'
+
+    results = await asyncio.gather(
+        *(flight.run('key', load) for _ in range(5))
+    )
+    assert results == [b'payload'] * 5, 'Ожидающие получили другой результат'
+    assert calls == 1, f'Загрузка выполнена {calls} раз вместо 1'
+    assert not flight.in_flight('key'), 'Ключ не освобождён'
+
+
+async def test_single_flight_propagates_errors():
+    flight = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.01)
+        raise RuntimeError
+
+    results = await asyncio.gather(
+        *(flight.run('key', load) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results), (
+        'Ошибка не передана ожидающим'
+    )
+
+
+def test_encode_json():
+    assert encode_json({'dates': [date(2025, 7, 18)], 'cursor': None}) == (
+        b'{"dates":["2025-07-18"],"cursor":null}'
+    ), 'Неверная сериализация'
+
+
+async def test_repeated_request_hits_cache(client):
+    params = {'oil_id': 'D410'}
+    await client.get('/api/last-results', params=params)
+    response = await client.get('/api/last-results', params=params)
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['X-FastAPI-Cache'] == 'HIT', (
+        'Повторный запрос не попал в кэш'
+    )
+    assert response.headers['content-type'] == 'application/json', (
+        'Неверный тип содержимого'
+    )
+    stats = (await client.get('/service/cache-stats')).json()
+    assert stats['last-results'][L1]['hits'] >= 1, (
+        'Попадание в L1 не отражено в статистике'
+    )
+
+
+async def test_stale_entry_is_served_and_revalidated(client):
+    endpoint = cached_endpoints['trading-dates']
+    key = endpoint.key({'days': 2})
+    await FastAPICache.get_backend().set(key, b'["1999-01-01"]', 10)
+    response = await client.get('/api/trading-dates', params={'days': 2})
+    assert response.headers['X-FastAPI-Cache'] == 'STALE', (
+        'Запись в окне stale не помечена устаревшей'
+    )
+    assert response.json() == ['1999-01-01'], 'Не отдано устаревшее значение'
+    await asyncio.gather(*endpoint.revalidations)
+    response = await client.get('/api/trading-dates', params={'days': 2})
+    assert response.headers['X-FastAPI-Cache'] == 'HIT', (
+        'Запись не обновлена в фоне'
+    )
+    assert response.json() == ['2025-07-18', '2025-07-17'], (
+        'После обновления отдано устаревшее значение'
+    )
+
+
+async def test_if_none_match_returns_not_modified(client, mocker):
+    response = await client.get('/api/last-results')
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache', (
+        'Клиенту передан серверный срок жизни записи'
+    )
+    get_with_ttl = mocker.spy(FastAPICache.get_backend(), 'get_with_ttl')
+    response = await client.get(
+        '/api/last-results', headers={'If-None-Match': etag}
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+        f'Статус {response.status_code} вместо 304'
+    )
+    assert response.headers['ETag'] == etag, 'ETag не совпадает'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert not response.content, 'У ответа 304 есть тело'
+    get_with_ttl.assert_not_called()
+    response = await client.get(
+        '/api/last-results', headers={'If-None-Match': 'W/"other"'}
+    )
+    assert response.status_code == HTTPStatus.OK, (
+        'Несовпадающий ETag должен давать полный ответ'
+    )
+
+
+async def test_no_etag_without_data_version(client, mocker):
+    mocker.patch.object(data_watcher, 'version', DataVersion())
+    response = await client.get('/api/last-results')
+    assert response.status_code == HTTPStatus.OK
+    assert 'ETag' not in response.headers, 'ETag без версии данных'
+    assert response.headers['Cache-Control'] == (
+        f'max-age={settings.client_max_age}'
+    ), 'Срок хранения без ETag не ограничен client_max_age'
@@ -0,0 +1,196 @@
+from datetime import date
+
+import orjson
+import pytest
+from fastapi_cache import FastAPICache
+
+from app.cache import encode_json, payload_coder
+from app.chunks import DAY_NAMESPACE, day_chunks, day_expire, decode_chunk
+from app.config import settings
+from app.crud import read_trading_results_page
+from app.schemas import (
+    DynamicTradingResultsQuery,
+    PaginationQuery,
+    TradingResultsQuery,
+)
+
+MAX_DATE = date(2025, 7, 18)
+
+
+# fmt: off
+@pytest.mark.parametrize('day, max_date, expected', [
+    (date(2025, 7, 17), MAX_DATE, None),
+    (MAX_DATE, MAX_DATE, settings.expire_cache),
+    (date(2025, 7, 19), MAX_DATE, settings.expire_cache),
+    (date(2025, 7, 17), None, settings.expire_cache),
+])
+# fmt: on
+def test_day_expire(day, max_date, expected):
+    assert day_expire(day, max_date) == expected, (
+        f'Неверный срок жизни дня {day}'
+    )
+
+
+@pytest.fixture
+async def empty_chunks(client):
+    await FastAPICache.clear(namespace=DAY_NAMESPACE)
+    yield
+    await FastAPICache.clear(namespace=DAY_NAMESPACE)
+
+
+def period(start_date: str, end_date: str, **filters):
+    return DynamicTradingResultsQuery(
+        start_date=start_date, end_date=end_date, **filters
+    )
+
+
+async def test_overlapping_periods_load_only_missing_days(
+    empty_chunks, db_session, mocker
+):
+    load = mocker.spy(day_chunks, 'load')
+    page = PaginationQuery()
+    await day_chunks.read_page(
+        db_session, period('2025-07-16', '2025-07-18'), page, None, MAX_DATE
+    )
+    loaded = {
+        day
+        for call in load.call_args_list
+        for *_, day in call.args[1].values()
+    }
+    assert loaded == {date(2025, 7, 16), date(2025, 7, 17), MAX_DATE}, (
+        'Загружены не все дни периода'
+    )
+    load.reset_mock()
+    await day_chunks.read_page(
+        db_session, period('2025-07-17', '2025-07-19'), page, None, MAX_DATE
+    )
+    loaded = [
+        day
+        for call in load.call_args_list
+        for *_, day in call.args[1].values()
+    ]
+    assert loaded == [date(2025, 7, 19)], (
+        'Из БД загружены дни, которые уже есть в кэше'
+    )
+
+
+async def test_pages_are_loaded_together(empty_chunks, db_session, mocker):
+    load = mocker.spy(day_chunks, 'load')
+    requests = [
+        (period('2025-07-17', '2025-07-18'), PaginationQuery(), None),
+        (
+            period('2025-07-16', '2025-07-18', oil_id='A106'),
+            PaginationQuery(limit=1),
+            ('exchange_product_id', 'total', 'date'),
+        ),
+    ]
+    pages = await day_chunks.read_pages(db_session, requests, MAX_DATE)
+    for (filters, page, fields), chunked in zip(requests, pages):
+        expected = await read_trading_results_page(
+            db_session, filters, page, fields=fields
+        )
+        assert encode_json(chunked) == encode_json(expected), (
+            'Страница пакета отличается от выборки из БД'
+        )
+    missing = load.call_args_list[0].args[1]
+    first_window = {filters.oil_id for filters, *_ in missing.values()}
+    assert first_window == {None, 'A106'}, (
+        'Первые окна страниц загружены разными запросами'
+    )
+
+
+async def test_closed_days_are_stored_without_expiry(empty_chunks, db_session):
+    await day_chunks.read_page(
+        db_session,
+        period('2025-07-17', '2025-07-18'),
+        PaginationQuery(),
+        None,
+        MAX_DATE,
+    )
+    backend = FastAPICache.get_backend().backend
+    closed, _ = await backend.get_with_ttl(
+        day_chunks.key(TradingResultsQuery(), date(2025, 7, 17))
+    )
+    open_day, _ = await backend.get_with_ttl(
+        day_chunks.key(TradingResultsQuery(), MAX_DATE)
+    )
+    assert closed == -1, 'Прошедший день хранится со сроком жизни'
+    assert 0 < open_day <= settings.expire_cache, (
+        'Последний день хранится без срока жизни'
+    )
+
+
+
+async def test_projected_chunks_keep_only_fields(empty_chunks, db_session):
+    fields = ('exchange_product_id', 'total', 'date')
+    await day_chunks.read_page(
+        db_session,
+        period('2025-07-17', '2025-07-17'),
+        PaginationQuery(),
+        fields,
+        MAX_DATE,
+    )
+    key = day_chunks.key(TradingResultsQuery(), date(2025, 7, 17), fields)
+    value = await FastAPICache.get_backend().get(key)
+    assert value is not None, 'Часть с выбором полей не сохранена'
+    _, rows = decode_chunk(payload_coder().to_json(value))
+    assert rows, 'Часть дня пуста'
+    assert all(tuple(orjson.loads(row)) == fields for row in rows), (
+        'В части хранятся невыбранные поля'
+    )
+
+
+
+async def test_chunk_is_not_stored_after_invalidation(
+    empty_chunks, db_session, mocker
+):
+    day = date(2025, 7, 17)
+    generations = day_chunks.generations
+
+    async def invalidated_while_loading(days):
+        result = await generations(days)
+        await day_chunks.invalidate([day])
+        return result
+
+    mocker.patch.object(
+        day_chunks, 'generations', side_effect=invalidated_while_loading
+    )
+    filters, page = period('2025-07-17', '2025-07-17'), PaginationQuery()
+    chunked = await day_chunks.read_page(db_session, filters, page)
+    expected = await read_trading_results_page(db_session, filters, page)
+    assert encode_json(chunked) == encode_json(expected), (
+        'Страница не собрана из прочитанных строк'
+    )
+    key = day_chunks.key(TradingResultsQuery(), day)
+    assert await FastAPICache.get_backend().get(key) is None, (
+        'Часть, прочитанная до изменения дня, записана в кэш'
+    )
+
+
+# fmt: off
+@pytest.mark.parametrize('filters, limit, fields', [
+    (period('2025-07-10', '2025-07-20'), 1, None),
+    (period('2025-07-10', '2025-07-20'), 2, ('exchange_product_id', 'total', 'date')),  # noqa: E501
+    (period('2025-07-16', '2025-07-18', delivery_basis_id='PDK'), 1, None),
+])
+# fmt: on
+async def test_pages_match_database(
+    empty_chunks, db_session, filters, limit, fields
+):
+    cursor, pages = None, 0
+    while True:
+        page = PaginationQuery(limit=limit, cursor=cursor)
+        expected = await read_trading_results_page(
+            db_session, filters, page, fields=fields
+        )
+        chunked = await day_chunks.read_page(
+            db_session, filters, page, fields, MAX_DATE
+        )
+        assert encode_json(chunked) == encode_json(expected), (
+            f'Страница {pages} отличается от выборки из БД'
+        )
+        pages += 1
+        cursor = chunked['next_cursor']
+        if cursor is None:
+            break
+    assert pages > 1, 'Выборка уместилась на одну страницу'
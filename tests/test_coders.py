@@ -0,0 +1,83 @@
+import pytest
+from fastapi_cache import FastAPICache
+
+from app.cache import cached_endpoints
+from app.coders import ZSTD, OrjsonCoder, ZstdCoder, accepts_encoding
+from app.schemas import PaginationQuery, ProjectionQuery, TradingResultsQuery
+from app.validators import valid_projection
+
+PAYLOAD = b'{"results":[' + b','.join([b'{"total":1000}'] * 200) + b']}'
+
+
+# fmt: off
+@pytest.mark.parametrize('accept_encoding, expected', [
+    ('gzip, deflate, br, zstd', True),
+    ('ZSTD', True),
+    ('gzip;q=1.0, zstd;q=0.5', True),
+    ('*', True),
+    ('*;q=0, zstd', True),
+    ('zstd;q=0, *', False),
+    ('*, zstd;q=0', False),
+    ('zstd;q=0', False),
+    ('gzip, deflate', False),
+    ('', False),
+])
+# fmt: on
+def test_accepts_encoding(accept_encoding, expected):
+    assert accepts_encoding(accept_encoding, ZSTD) is expected, (
+        f'Неверно разобран Accept-Encoding: {accept_encoding!r}'
+    )
+
+
+def test_zstd_coder_compresses_above_threshold():
+    value = ZstdCoder.compress(PAYLOAD)
+    assert ZstdCoder.is_compressed(value), 'Значение не сжато'
+    assert len(value) < len(PAYLOAD), 'Сжатое значение не меньше исходного'
+    assert ZstdCoder.to_json(value) == PAYLOAD, 'Распаковка не совпадает'
+    assert ZstdCoder.decode(value) == OrjsonCoder.decode(PAYLOAD), (
+        'Декодированные значения различаются'
+    )
+
+
+def test_zstd_coder_keeps_small_and_plain_values():
+    small = b'["2025-07-18"]'
+    assert ZstdCoder.compress(small) == small, 'Сжато короткое значение'
+    assert ZstdCoder.to_json(PAYLOAD) == PAYLOAD, (
+        'Несжатая запись прочитана неверно'
+    )
+
+
+async def test_compressed_entry_is_served_precompressed(client, mocker):
+    mocker.patch.object(ZstdCoder, 'threshold', 0)
+    params = {'fields': 'volume,total,count'}
+    key = cached_endpoints['last-results'].key(
+        {
+            'filters': TradingResultsQuery(),
+            'page': PaginationQuery(),
+            'projection': valid_projection(ProjectionQuery(**params)),
+        }
+    )
+    plain = await client.get(
+        '/api/last-results',
+        params=params,
+        headers={'Accept-Encoding': 'identity'},
+    )
+    assert FastAPICache.get_coder().is_compressed(
+        await FastAPICache.get_backend().get(key)
+    ), 'В кэше хранится несжатое значение'
+    assert 'content-encoding' not in plain.headers, (
+        'Сжатый ответ клиенту, не принимающему zstd'
+    )
+    response = await client.get(
+        '/api/last-results', params=params, headers={'Accept-Encoding': ZSTD}
+    )
+    assert response.headers['content-encoding'] == ZSTD, (
+        'Сжатое значение кэша распаковано для клиента с zstd'
+    )
+    assert response.headers['vary'] == 'Accept-Encoding', 'Нет Vary'
+    assert response.json() == plain.json(), 'Ответы различаются'
+    stats = (await client.get('/service/cache-stats')).json()['last-results']
+    assert stats['precompressed'] >= 1, 'Не учтена отдача сжатого ответа'
+    assert 0 < stats['stored_bytes'] <= stats['raw_bytes'], (
+        'Неверный учёт объёма до и после сжатия'
+    )
@@ -0,0 +1,156 @@
+import gzip
+
+import brotli
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app import cache
+from app.coders import ZstdCoder
+from app.compression import (
+    BROTLI,
+    GZIP,
+    CompressionMiddleware,
+    choose_encoding,
+    compress,
+)
+from app.config import settings
+
+BODY = b'{"total":1000}' * 100
+
+
+async def plain(request):
+    return PlainTextResponse(BODY)
+
+
+async def small(request):
+    return PlainTextResponse(b'ok')
+
+
+async def stream(request):
+    async def chunks():
+        for _ in range(3):
+            yield BODY
+
+    return StreamingResponse(chunks())
+
+
+async def events(request):
+    async def chunks():
+        for _ in range(3):
+            yield BODY
+
+    return StreamingResponse(chunks(), media_type='text/event-stream')
+
+
+async def precompressed(request):
+    return PlainTextResponse(
+        ZstdCoder.compress(BODY), headers={'Content-Encoding': 'zstd'}
+    )
+
+
+compressed_app = CompressionMiddleware(
+    Starlette(
+        routes=[
+            Route('/plain', plain),
+            Route('/small', small),
+            Route('/stream', stream),
+            Route('/events', events),
+            Route('/precompressed', precompressed),
+        ]
+    ),
+    minimum_size=100,
+)
+
+
+@pytest.fixture
+async def raw_client():
+    async with AsyncClient(
+        transport=ASGITransport(app=compressed_app),
+        base_url='http://test',
+    ) as client:
+        yield client
+
+
+# fmt: off
+@pytest.mark.parametrize('accept_encoding, expected', [
+    ('gzip, deflate, br, zstd', BROTLI),
+    ('gzip', GZIP),
+    ('br;q=0, gzip', GZIP),
+    ('*;q=0, gzip', GZIP),
+    ('br;q=0, *', GZIP),
+    ('zstd', None),
+    ('identity', None),
+])
+# fmt: on
+def test_choose_encoding(accept_encoding, expected):
+    assert choose_encoding(accept_encoding) == expected, (
+        f'Неверная кодировка для {accept_encoding!r}'
+    )
+
+
+@pytest.mark.parametrize('encoding', [BROTLI, GZIP])
+def test_compress_round_trip(encoding):
+    decompress = brotli.decompress if encoding == BROTLI else gzip.decompress
+    assert decompress(compress(BODY, encoding)) == BODY, (
+        'Распакованное тело не совпадает'
+    )
+
+
+# fmt: off
+@pytest.mark.parametrize('url, accept_encoding, expected_encoding, expected_body', [  # noqa: E501
+    ('/plain', 'gzip', GZIP, BODY),
+    ('/plain', 'gzip, br', BROTLI, BODY),
+    ('/plain', 'identity', None, BODY),
+    ('/small', 'gzip', None, b'ok'),
+    ('/stream', 'gzip', GZIP, BODY * 3),
+    ('/stream', 'br', BROTLI, BODY * 3),
+    ('/events', 'gzip, br', None, BODY * 3),
+    ('/precompressed', 'gzip, zstd', 'zstd', BODY),
+])
+# fmt: on
+async def test_compression_middleware(
+    raw_client, url, accept_encoding, expected_encoding, expected_body
+):
+    response = await raw_client.get(
+        url, headers={'Accept-Encoding': accept_encoding}
+    )
+    assert response.headers.get('content-encoding') == expected_encoding, (
+        f'Кодировка {response.headers.get("content-encoding")} '
+        f'вместо {expected_encoding}'
+    )
+    assert response.content == expected_body, 'Тело ответа искажено'
+
+
+async def test_cached_response_is_compressed_once(client, mocker):
+    mocker.patch.object(settings, 'compression_min_size', 0)
+    compress_spy = mocker.spy(cache, 'compress')
+    params = {'fields': 'volume'}
+    responses = [
+        await client.get(
+            '/api/last-results',
+            params=params,
+            headers={'Accept-Encoding': GZIP},
+        )
+        for _ in range(3)
+    ]
+    for response in responses:
+        assert response.headers['content-encoding'] == GZIP, (
+            'Ответ из кэша не сжат'
+        )
+        assert response.headers['vary'] == 'Accept-Encoding', 'Нет Vary'
+        assert response.json() == responses[0].json(), 'Ответы различаются'
+    assert compress_spy.call_count == 1, (
+        f'Тело сжато {compress_spy.call_count} раз вместо одного'
+    )
+    identity = await client.get(
+        '/api/last-results',
+        params=params,
+        headers={'Accept-Encoding': 'identity'},
+    )
+    assert 'content-encoding' not in identity.headers, (
+        'Сжатый ответ клиенту без поддержки сжатия'
+    )
+    assert identity.json() == responses[0].json(), 'Ответы различаются'
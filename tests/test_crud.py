@@ -1,10 +1,21 @@
 from datetime import date
 
 import pytest
+from sqlalchemy import select, update
 
-from app.crud import get_trading_dates, read_trading_results_from_db
-from app.db import TradingResults
-from app.schemas import DynamicTradingResultsQuery, TradingResultsQuery
+from app.crud import (
+    get_trading_dates,
+    read_trading_results_from_db,
+    read_trading_rows,
+    stream_trading_results,
+    sync_rollups,
+)
+from app.db import DailyRollup, TradingResults
+from app.schemas import (
+    DynamicTradingResultsQuery,
+    TradingResultsDB,
+    TradingResultsQuery,
+)
 
 
 @pytest.mark.parametrize('days, expected_len', [(0, 0), (1, 1), (10, 3)])
@@ -74,3 +85,62 @@ async def test_read_trading_results_from_db(
         assert all(tr.date == max_date for tr in rows), (
             'Есть строки не с последней датой'
         )
+
+
+async def test_stream_trading_results(db_session):
+    filters = DynamicTradingResultsQuery(
+        start_date=date(2025, 7, 16), end_date=date(2025, 7, 18)
+    )
+    chunks = [
+        chunk
+        async for chunk in stream_trading_results(
+            db_session, filters, chunk_size=2
+        )
+    ]
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1], (
+        'Строки не разбиты на порции по chunk_size'
+    )
+    rows = [row for chunk in chunks for row in chunk]
+    assert list(rows[0]._fields) == list(TradingResultsDB.__fields__), (
+        'Выгружаются лишние или не все столбцы'
+    )
+
+
+@pytest.mark.parametrize('last', [False, True])
+async def test_read_trading_rows_matches_orm(db_session, last):
+    filters = TradingResultsQuery()
+    rows = await read_trading_rows(db_session, filters, last=last)
+    orm_rows = await read_trading_results_from_db(
+        db_session, filters, last=last
+    )
+    assert [row._asdict() for row in rows] == [
+        TradingResultsDB.from_orm(tr).dict() for tr in orm_rows
+    ], 'Быстрый путь расходится с ORM'
+
+
+async def test_sync_rollups_is_incremental(db_session):
+    await sync_rollups(db_session)
+    assert await sync_rollups(db_session) == [], (
+        'Итоги пересчитаны без изменения данных'
+    )
+    product = TradingResults.exchange_product_id == 'C303KZN004L'
+    await db_session.execute(
+        update(TradingResults)
+        .where(product)
+        .values(volume=1140)
+    )
+    await db_session.commit()
+    try:
+        assert await sync_rollups(db_session) == [date(2025, 7, 18)], (
+            'Пересчитаны не только изменившиеся даты'
+        )
+        volume = await db_session.scalar(
+            select(DailyRollup.volume).where(DailyRollup.oil_id == 'C303')
+        )
+        assert volume == 1140, 'Итог не обновился после изменения данных'
+    finally:
+        await db_session.execute(
+            update(TradingResults).where(product).values(volume=140)
+        )
+        await db_session.commit()
+        await sync_rollups(db_session)
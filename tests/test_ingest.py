@@ -0,0 +1,211 @@
+from datetime import date
+from http import HTTPStatus
+
+import orjson
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import Base, TradingResults, engine
+from app.ingest import (
+    INGEST_COLUMNS,
+    IngestError,
+    ingest,
+    parse_csv,
+    parse_ndjson,
+    read_lines,
+)
+
+SCHEMA = 'ingest_test'
+TOKEN = 'secret'
+HEADER = ','.join(INGEST_COLUMNS)
+VALUES = (
+    'A106PDK001J',
+    'Бензин АИ-100-К5, ПДК',
+    'Предкомбинатская-группа станций',
+    100,
+    9000000,
+    2,
+    date(2025, 7, 16),
+)
+ROW = (
+    'A106PDK001J,"Бензин АИ-100-К5, ПДК",Предкомбинатская-группа станций,'
+    '100,9000000,2,2025-07-16'
+)
+NDJSON_ROW = orjson.dumps(dict(zip(INGEST_COLUMNS, VALUES))).decode()
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(batches) -> list[tuple]:
+    return [record async for batch in batches for record in batch]
+
+
+def record(product, volume, day, position=1) -> tuple:
+    return (position, product, 'Название', 'Базис', volume, 1000, 1, day)
+
+
+async def batches(*records):
+    yield list(records)
+
+
+async def test_read_lines_joins_split_chunks():
+    lines = [
+        line
+        async for batch in read_lines(stream(b'ab', b'c\nde', b'\n\nf'))
+        for line in batch
+    ]
+    assert lines == ['abc', 'de', 'f'], (
+        'Строки на границе чанков склеены неверно'
+    )
+
+
+async def test_parse_csv():
+    payload = f'{HEADER}\n{ROW}\n'.encode()
+    records = await collect(
+        parse_csv(read_lines(stream(payload[:50], payload[50:])))
+    )
+    assert records == [(2, *VALUES)], 'CSV разобран неверно'
+
+
+async def test_parse_ndjson():
+    records = await collect(
+        parse_ndjson(read_lines(stream(f'{NDJSON_ROW}\n'.encode())))
+    )
+    assert records == [(1, *VALUES)], 'NDJSON разобран неверно'
+
+
+# fmt: off
+@pytest.mark.parametrize('parser, payload, message', [
+    (parse_csv, 'exchange_product_id,date\n', 'volume'),
+    (parse_csv, f'{HEADER}\n{ROW}\nA106PDK001J,x\n', 'Строка 3'),
+    (parse_csv, f'{HEADER}\n{ROW.replace(",100,", ",много,")}\n', 'Строка 2'),
+    (parse_ndjson, f'{NDJSON_ROW}\n{{"date": "2025-07-16"}}\n', 'Строка 2'),
+    (parse_ndjson, f'{NDJSON_ROW.replace("2025-07-16", "16.07.2025")}\n', 'Строка 1'),  # noqa: E501
+])
+# fmt: on
+async def test_parse_errors(parser, payload, message):
+    with pytest.raises(IngestError, match=message):
+        await collect(parser(read_lines(stream(payload.encode()))))
+
+
+@pytest.fixture
+async def ingest_session():
+    """Сессия на пустой копии таблиц в отдельной схеме; откатывается."""
+    async with engine.connect() as connection:
+        await connection.execute(text(f'CREATE SCHEMA {SCHEMA}'))
+        await connection.execute(text(f'SET LOCAL search_path TO {SCHEMA}'))
+        await connection.run_sync(Base.metadata.create_all)
+        async with AsyncSession(bind=connection) as session:
+            yield session
+        await connection.rollback()
+
+
+async def stored(session) -> dict:
+    result = await session.execute(
+        select(
+            TradingResults.exchange_product_id,
+            TradingResults.date,
+            TradingResults.volume,
+        )
+    )
+    return {(product, day): volume for product, day, volume in result}
+
+
+async def test_ingest_inserts_and_keeps_last_duplicate(ingest_session):
+    rows, dates = await ingest(
+        ingest_session,
+        batches(
+            record('A1', 10, date(2025, 7, 16), 1),
+            record('A1', 20, date(2025, 7, 16), 2),
+            record('B2', 30, date(2025, 7, 17), 3),
+        ),
+    )
+    assert rows == 3, 'Неверное число загруженных строк'
+    assert dates == [date(2025, 7, 16), date(2025, 7, 17)], (
+        'Неверный список изменившихся дат'
+    )
+    assert await stored(ingest_session) == {
+        ('A1', date(2025, 7, 16)): 20,
+        ('B2', date(2025, 7, 17)): 30,
+    }, 'Из повторов сохранена не последняя строка'
+
+
+async def test_ingest_updates_only_changed_rows(ingest_session):
+    await ingest(
+        ingest_session,
+        batches(
+            record('A1', 10, date(2025, 7, 16)),
+            record('B2', 30, date(2025, 7, 17)),
+        ),
+    )
+    rows, dates = await ingest(
+        ingest_session,
+        batches(
+            record('A1', 10, date(2025, 7, 16)),
+            record('B2', 40, date(2025, 7, 17)),
+        ),
+    )
+    assert rows == 2, 'Неверное число загруженных строк'
+    assert dates == [date(2025, 7, 17)], (
+        'Неизменённая строка попала в изменившиеся даты'
+    )
+    assert await stored(ingest_session) == {
+        ('A1', date(2025, 7, 16)): 10,
+        ('B2', date(2025, 7, 17)): 40,
+    }, 'Строка не обновлена по uix_date_product'
+
+
+async def test_ingest_endpoint_disabled(client, mocker):
+    mocker.patch.object(settings, 'ingest_token', None)
+    response = await client.post(
+        '/service/ingest', headers={'Authorization': f'Bearer {TOKEN}'}
+    )
+    assert response.status_code == HTTPStatus.FORBIDDEN, (
+        f'Статус {response.status_code} вместо 403 без INGEST_TOKEN'
+    )
+
+
+# fmt: off
+@pytest.mark.parametrize('headers', [
+    {},
+    {'Authorization': 'Bearer wrong'},
+])
+# fmt: on
+async def test_ingest_endpoint_unauthorized(client, mocker, headers):
+    mocker.patch.object(settings, 'ingest_token', TOKEN)
+    response = await client.post('/service/ingest', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+        f'Статус {response.status_code} вместо 401'
+    )
+
+
+async def test_ingest_endpoint(client, mocker):
+    mocker.patch.object(settings, 'ingest_token', TOKEN)
+    apply = mocker.patch('app.api.apply_ingest_task')
+    headers = {'Authorization': f'Bearer {TOKEN}'}
+    response = await client.post(
+        '/service/ingest',
+        headers=headers,
+        content=f'{HEADER}\n{ROW.replace(",100,", ",много,")}\n',
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, (
+        f'Статус {response.status_code} вместо 422 для неверной строки'
+    )
+    response = await client.post(
+        '/service/ingest',
+        params={'format': 'ndjson'},
+        headers=headers,
+        content=f'{NDJSON_ROW}\n',
+    )
+    assert response.status_code == HTTPStatus.OK, (
+        f'Статус {response.status_code} вместо 200'
+    )
+    assert response.json() == {'rows': 1, 'dates': []}, (
+        'Повторная загрузка тех же данных изменила даты'
+    )
+    apply.assert_not_called()
@@ -0,0 +1,146 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi_cache import FastAPICache
+from sqlalchemy import update
+
+from app.cache import redis_client
+from app.chunks import day_chunks
+from app.config import settings
+from app.crud import get_data_version
+from app.db import TradingResults
+from app.invalidation import (
+    DataVersion,
+    closed_range_expire,
+    data_watcher,
+    key_covers,
+)
+from app.schemas import (
+    DynamicTradingResultsQuery,
+    PaginationQuery,
+    TradingResultsQuery,
+)
+from app.tasks import refresh_cache_task
+
+RANGE_KEY = 'spimex:aggregates:end_date={}&start_date={}'
+LAST_KEY = 'spimex:last-results:limit=500'
+
+
+# fmt: off
+@pytest.mark.parametrize('key, dates, expected', [
+    (RANGE_KEY.format('2025-07-18', '2025-07-17'), [date(2025, 7, 17)], True),
+    (RANGE_KEY.format('2025-07-18', '2025-07-17'), [date(2025, 7, 19)], False),
+    (RANGE_KEY.format('2025-07-16', '2025-07-16'), [date(2025, 7, 17), date(2025, 7, 16)], True),  # noqa: E501
+    (LAST_KEY, [date(2025, 7, 19)], True),
+])
+# fmt: on
+def test_key_covers(key, dates, expected):
+    assert key_covers(key, dates) is expected, (
+        f'Неверное покрытие ключа {key} датами {dates}'
+    )
+
+
+def test_data_version_round_trip():
+    version = DataVersion(date(2025, 7, 18), datetime(2025, 7, 18, 14, 11))
+    assert DataVersion.loads(version.dumps()) == version
+    assert DataVersion.loads(DataVersion().dumps()) == DataVersion()
+
+
+async def test_refresh_evicts_only_affected_keys(client, db_session):
+    await redis_client.delete(data_watcher.version_key)
+    assert await data_watcher.refresh(db_session) == []
+    assert data_watcher.version.max_date == date(2025, 7, 18), (
+        'Не определена последняя дата торгов'
+    )
+    assert await data_watcher.refresh(db_session) == [], (
+        'Без изменений данных ничего не должно удаляться'
+    )
+    backend = FastAPICache.get_backend()
+    closed_key = RANGE_KEY.format('2025-07-16', '2025-07-16')
+    affected_key = RANGE_KEY.format('2025-07-18', '2025-07-17')
+    day_filters = TradingResultsQuery(oil_id='A106')
+    closed_day_key = day_chunks.key(day_filters, date(2025, 7, 16))
+    affected_day_key = day_chunks.key(day_filters, date(2025, 7, 17))
+    for key in (closed_key, affected_key, LAST_KEY):
+        await backend.set(key, b'[]', settings.expire_cache)
+    await day_chunks.read_page(
+        db_session,
+        DynamicTradingResultsQuery(
+            start_date=date(2025, 7, 16),
+            end_date=date(2025, 7, 17),
+            oil_id='A106',
+        ),
+        PaginationQuery(),
+    )
+    closed_chunk = await backend.get(closed_day_key)
+    await db_session.execute(
+        update(TradingResults)
+        .where(TradingResults.date == date(2025, 7, 17))
+        .values(updated_on=datetime.now())
+    )
+    await db_session.commit()
+    assert await data_watcher.refresh(db_session) == [date(2025, 7, 17)], (
+        'Не обнаружена изменённая дата'
+    )
+    assert await backend.get(closed_key) == b'[]', 'Удалён закрытый период'
+    assert await backend.get(affected_key) is None, 'Не удалён период'
+    assert await backend.get(LAST_KEY) is None, 'Не удалены last-results'
+    assert await backend.get(closed_day_key) == closed_chunk, (
+        'Удалён закрытый день'
+    )
+    assert await backend.get(affected_day_key) is None, 'Не удалён день'
+    assert not await redis_client.exists(
+        day_chunks.index_key(date(2025, 7, 17))
+    ), 'Не удалён список ключей дня'
+
+
+
+async def test_apply_changes_ignores_updated_on(client, db_session):
+    saved = await redis_client.get(data_watcher.version_key)
+    current = DataVersion(*await get_data_version(db_session))
+    ahead = current._replace(updated_on=current.updated_on + timedelta(1))
+    await data_watcher.save(ahead)
+    backend = FastAPICache.get_backend()
+    closed_key = RANGE_KEY.format('2025-07-16', '2025-07-16')
+    affected_key = RANGE_KEY.format('2025-07-18', '2025-07-17')
+    for key in (closed_key, affected_key):
+        await backend.set(key, b'[]', settings.expire_cache)
+    try:
+        await data_watcher.apply_changes(db_session, [date(2025, 7, 17)])
+        assert await backend.get(affected_key) is None, 'Не удалён период'
+        assert await backend.get(closed_key) == b'[]', (
+            'Удалён закрытый период'
+        )
+        version = data_watcher.version
+        assert version.token != ahead.token, 'Версия данных не сменилась'
+        assert await data_watcher.stored() == version
+        assert await data_watcher.refresh(db_session) == []
+        assert data_watcher.version == version, (
+            'Версия данных вернулась к значению по базе'
+        )
+    finally:
+        await redis_client.set(data_watcher.version_key, saved)
+        await backend.clear(key=closed_key)
+
+
+# fmt: off
+@pytest.mark.parametrize('end_date, expected', [
+    (date(2025, 7, 17), None),
+    (date(2025, 7, 18), settings.expire_cache),
+])
+# fmt: on
+def test_closed_range_expire(mocker, end_date, expected):
+    mocker.patch.object(
+        data_watcher, 'version', DataVersion(max_date=date(2025, 7, 18))
+    )
+    filters = DynamicTradingResultsQuery(
+        start_date=date(2025, 7, 16), end_date=end_date
+    )
+    assert closed_range_expire({'filters': filters}) == expected
+
+
+async def test_refresh_survives_rollup_failure(client, mocker):
+    mocker.patch('app.tasks.sync_rollups', side_effect=RuntimeError)
+    refresh = mocker.patch.object(data_watcher, 'refresh', return_value=[])
+    await refresh_cache_task()
+    refresh.assert_awaited_once()
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import date
+
+import pytest
+from fastapi_cache import FastAPICache
+
+from app.cache import redis_client
+from app.invalidation import DataVersion, DataWatcher, data_watcher
+from app.leader import LeaderLease, leader_lease
+from app.tasks import sync_worker_task
+
+NEW_VERSION = DataVersion(max_date=date(2030, 1, 1))
+
+
+@pytest.fixture
+async def leases(client):
+    first, second = LeaderLease(lease=30), LeaderLease(lease=30)
+    saved = await redis_client.get(first.key)
+    await redis_client.delete(first.key)
+    yield first, second
+    await redis_client.delete(first.key)
+    if saved is not None:
+        await redis_client.set(first.key, saved, px=leader_lease.lease * 1000)
+
+
+async def test_only_one_worker_holds_lease(leases):
+    first, second = leases
+    assert await first.renew(), 'Свободная аренда не занята'
+    assert await first.renew(), 'Лидер не продлил свою аренду'
+    assert not await second.renew(), 'Аренду занял второй воркер'
+    ttl = await redis_client.pttl(first.key)
+    assert 0 < ttl <= first.lease * 1000, 'Аренда записана без срока жизни'
+
+
+async def test_lease_fails_over(leases):
+    first, second = leases
+    await first.renew()
+    await redis_client.delete(first.key)
+    assert await second.renew(), 'Истёкшая аренда не перешла к воркеру'
+    assert not await first.renew(), 'Бывший лидер сохранил лидерство'
+    await second.release()
+    assert await first.renew(), 'Освобождённая аренда не занята'
+
+
+async def test_only_runs_job_on_leader(leases, mocker):
+    first, second = leases
+    job = mocker.AsyncMock(return_value=1)
+    await first.renew()
+    assert await second.only(job)() is None
+    job.assert_not_called()
+    assert await first.only(job)() == 1, 'Лидер не выполнил задачу'
+    job.assert_awaited_once()
+
+
+async def test_sync_worker_applies_stored_version(client, mocker):
+    mocker.patch.object(data_watcher, 'version', DataVersion())
+    mocker.patch.object(leader_lease, 'is_leader', False)
+    saved = await redis_client.get(data_watcher.version_key)
+    backend = FastAPICache.get_backend()
+    await backend.memory.set('spimex:last-results:', b'[]')
+    try:
+        await redis_client.set(data_watcher.version_key, NEW_VERSION.dumps())
+        await sync_worker_task()
+    finally:
+        await redis_client.set(data_watcher.version_key, saved)
+    assert data_watcher.version == NEW_VERSION, 'Версия из Redis не принята'
+    assert await backend.memory.get('spimex:last-results:') is None, (
+        'L1 не очищен после смены версии'
+    )
+
+
+async def subscribers(channel: str) -> int:
+    ((_, count),) = await redis_client.pubsub_numsub(channel)
+    return count
+
+
+async def test_listen_receives_published_version(client, mocker):
+    mocker.patch(
+        'app.invalidation.DATA_VERSION_CHANNEL', '{prefix}-test-channel'
+    )
+    watcher, received = DataWatcher(), asyncio.Queue()
+    listener = asyncio.create_task(watcher.listen(received.put))
+    try:
+        while not await subscribers(watcher.channel):
+            await asyncio.sleep(0.01)
+        await redis_client.publish(watcher.channel, watcher.version.dumps())
+        await redis_client.publish(watcher.channel, NEW_VERSION.dumps())
+        version = await asyncio.wait_for(received.get(), timeout=5)
+    finally:
+        listener.cancel()
+    assert version == NEW_VERSION, 'Получена не новая версия'
+    assert received.empty(), 'Текущая версия передана как новая'
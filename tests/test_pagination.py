@@ -0,0 +1,45 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from app.pagination import decode_cursor, encode_cursor, paginate
+
+
+def test_cursor_round_trip():
+    sort_key = (date(2025, 7, 17), 'A106MST002K')
+    assert decode_cursor(encode_cursor(sort_key)) == sort_key, (
+        'Курсор не восстанавливает ключ сортировки'
+    )
+
+
+@pytest.mark.parametrize('cursor', ['!!!', 'MjAyNS0wNy0xNw==', 'eHw='])
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+# fmt: off
+@pytest.mark.parametrize('rows_count, limit, has_next', [
+    (0, 2, False),
+    (2, 2, False),
+    (3, 2, True),
+])
+# fmt: on
+def test_paginate(rows_count, limit, has_next):
+    rows = [
+        SimpleNamespace(date=date(2025, 7, 18), exchange_product_id=str(i))
+        for i in range(rows_count)
+    ]
+    page = paginate(rows, limit)
+    assert len(page['results']) == min(rows_count, limit), (
+        'Неверный размер страницы'
+    )
+    assert (page['next_cursor'] is not None) == has_next, (
+        'Неверный признак следующей страницы'
+    )
+    if has_next:
+        assert decode_cursor(page['next_cursor']) == (
+            date(2025, 7, 18),
+            str(limit - 1),
+        ), 'Курсор указывает не на последнюю строку страницы'
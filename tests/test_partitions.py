@@ -0,0 +1,155 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import ORDERING, OUTPUT_COLUMNS, filter_conditions
+from app.db import Base, TradingResults, engine
+from app.ingest import ingest
+from app.partitions import (
+    INSERT_COLUMNS,
+    MONTH,
+    TABLE,
+    YEAR,
+    ensure_partitions,
+    is_partitioned,
+    migrate_table,
+    partition_ranges,
+)
+from app.schemas import DynamicTradingResultsQuery, TradingResultsQuery
+
+SCHEMA = 'partition_test'
+TODAY = date(2025, 9, 10)
+
+
+# fmt: off
+@pytest.mark.parametrize('first, last, interval, expected', [
+    (date(2025, 7, 16), date(2025, 7, 18), MONTH, [(date(2025, 7, 1), date(2025, 8, 1))]),  # noqa: E501
+    (date(2025, 11, 30), date(2026, 1, 1), MONTH, [(date(2025, 11, 1), date(2025, 12, 1)), (date(2025, 12, 1), date(2026, 1, 1)), (date(2026, 1, 1), date(2026, 2, 1))]),  # noqa: E501
+    (date(2024, 5, 1), date(2025, 2, 1), YEAR, [(date(2024, 1, 1), date(2025, 1, 1)), (date(2025, 1, 1), date(2026, 1, 1))]),  # noqa: E501
+])
+# fmt: on
+def test_partition_ranges(first, last, interval, expected):
+    assert partition_ranges(first, last, interval) == expected, (
+        'Неверные границы секций'
+    )
+
+
+@pytest.fixture
+async def partition_connection():
+    """Копия таблицы с данными фикстуры в отдельной схеме.
+
+    search_path указывает на эту схему, поэтому запросы и инструменты
+    секционирования работают с копией; всё откатывается после теста.
+    """
+    async with engine.connect() as connection:
+        await connection.execute(text(f'CREATE SCHEMA {SCHEMA}'))
+        await connection.execute(text(f'SET LOCAL search_path TO {SCHEMA}'))
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(
+            text(
+                f'INSERT INTO {TABLE} ({INSERT_COLUMNS}) '
+                f'SELECT {INSERT_COLUMNS} FROM public.{TABLE}'
+            )
+        )
+        yield connection
+        await connection.rollback()
+
+
+async def scanned_relations(connection, query) -> set[str]:
+    sql = query.compile(
+        dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}
+    )
+    result = await connection.execute(text(f'EXPLAIN (FORMAT JSON) {sql}'))
+    relations, plans = set(), [result.scalar()[0]['Plan']]
+    while plans:
+        plan = plans.pop()
+        if 'Relation Name' in plan:
+            relations.add(plan['Relation Name'])
+        plans.extend(plan.get('Plans', ()))
+    return relations
+
+
+async def test_migrate_table(partition_connection):
+    moved = await migrate_table(partition_connection, MONTH, today=TODAY)
+    assert moved == 5, 'Перенесены не все строки'
+    assert await is_partitioned(partition_connection, TABLE), (
+        'Таблица не секционирована'
+    )
+    count = await partition_connection.execute(
+        select(func.count()).select_from(TradingResults)
+    )
+    assert count.scalar() == 5, 'Строки не читаются через родительскую таблицу'
+    with pytest.raises(ValueError):
+        await migrate_table(partition_connection, MONTH, today=TODAY)
+
+
+async def test_ensure_partitions(partition_connection):
+    await migrate_table(partition_connection, MONTH, ahead=0, today=TODAY)
+    names = await ensure_partitions(
+        partition_connection, MONTH, ahead=2, today=date(2025, 12, 5)
+    )
+    assert names == [
+        f'{TABLE}_2025_12',
+        f'{TABLE}_2026_01',
+        f'{TABLE}_2026_02',
+    ], 'Секции наперёд созданы не за те месяцы'
+    await partition_connection.execute(
+        text(
+            f"INSERT INTO {TABLE} (exchange_product_id, date) "
+            "VALUES ('A106PDK001J', '2026-02-27')"
+        )
+    )
+
+
+
+async def staged(*days):
+    yield [
+        (position, 'A106PDK001J', 'Название', 'Базис', 10, 1000, 1, day)
+        for position, day in enumerate(days)
+    ]
+
+
+async def test_ingest_creates_partitions(partition_connection):
+    await migrate_table(partition_connection, MONTH, ahead=0, today=TODAY)
+    session = AsyncSession(bind=partition_connection)
+    _, dates = await ingest(
+        session,
+        staged(date(2020, 1, 15), date(2020, 3, 2)),
+    )
+    assert dates == [date(2020, 1, 15), date(2020, 3, 2)], (
+        'Строки истории не загружены'
+    )
+    relations = await scanned_relations(
+        partition_connection,
+        select(TradingResults.id).where(
+            TradingResults.date == date(2020, 3, 2)
+        ),
+    )
+    assert relations == {f'{TABLE}_2020_03'}, (
+        'Для дат загрузки не созданы секции'
+    )
+
+
+# fmt: off
+@pytest.mark.parametrize('filters, trading_date', [
+    (DynamicTradingResultsQuery(start_date=date(2025, 7, 1), end_date=date(2025, 7, 7)), None),  # noqa: E501
+    (TradingResultsQuery(), date(2025, 7, 18)),
+    (TradingResultsQuery(oil_id='A106'), date(2025, 7, 18)),
+])
+# fmt: on
+async def test_queries_prune_partitions(
+    partition_connection, filters, trading_date
+):
+    await migrate_table(partition_connection, MONTH, today=TODAY)
+    query = (
+        select(*OUTPUT_COLUMNS)
+        .where(*filter_conditions(filters, trading_date=trading_date))
+        .order_by(*ORDERING)
+    )
+    relations = await scanned_relations(partition_connection, query)
+    assert relations == {f'{TABLE}_2025_07'}, (
+        f'Запрос читает лишние секции: {sorted(relations)}'
+    )
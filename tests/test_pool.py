@@ -0,0 +1,70 @@
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.pool import (
+    InstrumentedPool,
+    engine_options,
+    pool_stats,
+    unique_statement_name,
+)
+
+
+def test_engine_options(mocker):
+    mocker.patch.object(settings, 'db_statement_cache_size', 0)
+    mocker.patch.object(settings, 'db_unique_statement_names', True)
+    options = engine_options()
+    assert options['poolclass'] is InstrumentedPool, 'Пул без статистики'
+    assert options['pool_size'] == settings.db_pool_size, 'Не тот pool_size'
+    connect_args = options['connect_args']
+    assert connect_args['statement_cache_size'] == 0, (
+        'Не передан statement_cache_size'
+    )
+    assert (
+        connect_args['prepared_statement_name_func'] is unique_statement_name
+    ), 'Не включены уникальные имена подготовленных запросов'
+    assert unique_statement_name() != unique_statement_name(), (
+        'Имена подготовленных запросов повторяются'
+    )
+
+
+async def test_pool_stats_count_waits_and_timeouts():
+    engine = create_async_engine(
+        settings.database_url,
+        **{
+            **engine_options(),
+            'pool_size': 1,
+            'max_overflow': 0,
+            'pool_timeout': 0.1,
+        },
+    )
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text('SELECT 1'))
+            assert pool_stats(engine)['checked_out'] == 1, (
+                'Не учтено выданное соединение'
+            )
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+        stats = pool_stats(engine)
+    finally:
+        await engine.dispose()
+    assert stats['checked_out'] == 0, 'Соединение не вернулось в пул'
+    assert stats['checkouts'] == 2, f'Выдач {stats["checkouts"]} вместо 2'
+    assert stats['timeouts'] == 1, 'Не учтён таймаут ожидания'
+    assert stats['waiting'] == 0, 'Ожидающие не сброшены'
+    assert stats['wait_time_max'] >= 0.1, 'Не учтено время ожидания'
+
+
+async def test_get_pool_stats(client):
+    response = await client.get('/service/pool-stats')
+    assert response.status_code == HTTPStatus.OK, (
+        f'Статус {response.status_code} вместо 200'
+    )
+    stats = response.json()
+    assert stats['size'] == settings.db_pool_size, 'Неверный размер пула'
+    assert stats['checkouts'] >= 1, 'Не учтены выдачи соединений'
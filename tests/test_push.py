@@ -0,0 +1,69 @@
+import asyncio
+from datetime import date
+
+import orjson
+import pytest
+
+from app.config import settings
+from app.invalidation import DataVersion, data_watcher
+from app.push import SSE_PING, LastResultsFeed
+from app.schemas import TradingResultsQuery
+
+VERSION = DataVersion(max_date=date(2025, 7, 18))
+NEW_VERSION = DataVersion(max_date=date(2025, 7, 21))
+
+
+def parse_event(event: bytes) -> dict:
+    fields = dict(
+        line.split(': ', 1) for line in event.decode().strip().splitlines()
+    )
+    return {**fields, 'data': orjson.loads(fields['data'])}
+
+
+@pytest.fixture
+def feed(client, mocker):
+    mocker.patch.object(data_watcher, 'version', VERSION)
+    return LastResultsFeed()
+
+
+async def test_stream_sends_snapshot_per_data_version(feed, client):
+    filters = TradingResultsQuery(oil_id='A106')
+    events = feed.stream(filters)
+    first = parse_event(await anext(events))
+    expected = await client.get('/api/last-results', params={'oil_id': 'A106'})
+    assert first['event'] == 'last-results', 'Неверный тип события'
+    assert first['id'] == VERSION.token, 'Событие без версии данных'
+    assert first['data'] == expected.json(), (
+        'Снимок отличается от ответа /api/last-results'
+    )
+    pending = asyncio.ensure_future(anext(events))
+    await asyncio.sleep(0)
+    assert not pending.done(), 'Событие без смены версии данных'
+    data_watcher.version = NEW_VERSION
+    feed.notify()
+    second = parse_event(await asyncio.wait_for(pending, timeout=5))
+    assert second['id'] == NEW_VERSION.token, 'Новая версия не отправлена'
+    await events.aclose()
+    assert not feed.subscribers, 'Подписчик не удалён после отключения'
+
+
+async def test_snapshot_is_shared_by_subscribers(feed, mocker):
+    render = mocker.spy(feed, 'render')
+    filters = TradingResultsQuery(delivery_basis_id='PDK')
+    streams = [feed.stream(filters) for _ in range(3)]
+    events = await asyncio.gather(*(anext(stream) for stream in streams))
+    assert len(set(events)) == 1, 'Подписчики получили разные события'
+    assert render.call_count == 1, (
+        f'Снимок построен {render.call_count} раз вместо одного'
+    )
+    for stream in streams:
+        await stream.aclose()
+
+
+async def test_stream_resumes_from_last_event_id(feed, mocker):
+    mocker.patch.object(settings, 'sse_heartbeat', 0.01)
+    events = feed.stream(TradingResultsQuery(), VERSION.token)
+    assert [await anext(events) for _ in range(2)] == [SSE_PING] * 2, (
+        'Повторно отправлен снимок версии из Last-Event-ID'
+    )
+    await events.aclose()
@@ -0,0 +1,101 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import desc, distinct, func, select, text
+from sqlalchemy.dialects import postgresql
+
+from app.chunks import chunk_query
+from app.crud import (
+    ORDERING,
+    OUTPUT_COLUMNS,
+    changed_dates_query,
+    filter_conditions,
+)
+from app.db import TradingResults
+from app.schemas import DynamicTradingResultsQuery, TradingResultsQuery
+
+TABLE = TradingResults.__tablename__
+START, END = date(2025, 7, 1), date(2025, 7, 31)
+AFTER = (date(2025, 7, 17), 'A106MST002K')
+DAYS = [date(2025, 7, 16), date(2025, 7, 17), date(2025, 7, 18)]
+DATE_INDEX = 'uix_date_product'
+
+
+def rows_query(filters, **kwargs):
+    return (
+        select(*OUTPUT_COLUMNS)
+        .where(*filter_conditions(filters, **kwargs))
+        .order_by(*ORDERING)
+        .limit(501)
+    )
+
+
+def dynamic(**kwargs):
+    return DynamicTradingResultsQuery(start_date=START, end_date=END, **kwargs)
+
+
+# fmt: off
+QUERY_SHAPES = {
+    'last-results': (rows_query(TradingResultsQuery(), last=True), {DATE_INDEX}),  # noqa: E501
+    'last-results-calendar': (rows_query(TradingResultsQuery(), trading_date=END), {DATE_INDEX}),  # noqa: E501
+    'last-results-oil': (rows_query(TradingResultsQuery(oil_id='A106'), trading_date=END), {DATE_INDEX}),  # noqa: E501
+    'results-by-date': (rows_query(dynamic()), {DATE_INDEX}),
+    'results-by-date-oil': (rows_query(dynamic(oil_id='A106')), {'ix_oil_date'}),  # noqa: E501
+    'results-by-date-basis': (rows_query(dynamic(delivery_basis_id='PDK')), {'ix_delivery_basis_date'}),  # noqa: E501
+    'results-by-date-type': (rows_query(dynamic(delivery_type_id='J')), {DATE_INDEX}),  # noqa: E501
+    'results-by-date-page': (rows_query(dynamic(), after=AFTER), {DATE_INDEX}),  # noqa: E501
+    'trading-calendar': (select(distinct(TradingResults.date)).order_by(desc(TradingResults.date)).limit(365), {DATE_INDEX}),  # noqa: E501
+    'trading-calendar-new': (select(distinct(TradingResults.date)).where(TradingResults.date > END), {DATE_INDEX}),  # noqa: E501
+    'data-version': (select(func.max(TradingResults.date), func.max(TradingResults.updated_on)), {DATE_INDEX, 'ix_updated_on_date'}),  # noqa: E501
+    'day-chunks': (chunk_query(TradingResultsQuery(), None, DAYS), {DATE_INDEX}),  # noqa: E501
+    'day-chunks-oil': (chunk_query(TradingResultsQuery(oil_id='A106'), None, DAYS), {'ix_oil_date'}),  # noqa: E501
+    'day-chunks-basis': (chunk_query(TradingResultsQuery(delivery_basis_id='PDK'), None, DAYS), {'ix_delivery_basis_date'}),  # noqa: E501
+    'day-chunks-fields': (chunk_query(TradingResultsQuery(), ('exchange_product_id', 'total', 'date'), DAYS), {DATE_INDEX}),  # noqa: E501
+    'changed-dates': (changed_dates_query(END, datetime(2025, 7, 31)), {DATE_INDEX, 'ix_updated_on_date'}),  # noqa: E501
+}
+# fmt: on
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+async def explain(session, query):
+    sql = query.compile(
+        dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}
+    )
+    result = await session.execute(text(f'EXPLAIN (FORMAT JSON) {sql}'))
+    return list(plan_nodes(result.scalar()[0]['Plan']))
+
+
+@pytest.fixture
+async def planner_session(db_session):
+    """Сессия, в которой планировщик избегает Seq Scan, если может.
+
+    На нескольких строках фикстуры полный просмотр всегда дешевле, поэтому
+    seq scan запрещается: остаётся он только там, где запросу не
+    подходит ни один индекс.
+    """
+    await db_session.execute(text(f'ANALYZE {TABLE}'))
+    await db_session.execute(text('SET LOCAL enable_seqscan = off'))
+    yield db_session
+    await db_session.rollback()
+
+
+@pytest.mark.parametrize('shape', QUERY_SHAPES)
+async def test_query_uses_index(planner_session, shape):
+    query, indexes = QUERY_SHAPES[shape]
+    nodes = await explain(planner_session, query)
+    seq_scans = [
+        node
+        for node in nodes
+        if node['Node Type'] == 'Seq Scan'
+        and node.get('Relation Name') == TABLE
+    ]
+    assert not seq_scans, f'Запрос {shape} читает таблицу целиком'
+    used = {node['Index Name'] for node in nodes if 'Index Name' in node}
+    assert used == indexes, (
+        f'Запрос {shape} читает {sorted(used)} вместо {sorted(indexes)}'
+    )
@@ -0,0 +1,107 @@
+from datetime import date, datetime, timedelta
+from http import HTTPStatus
+
+import pytest
+
+from app.config import settings
+from app.crud import get_data_version
+from app.db import AsyncSessionLocal
+from app.replicas import LEAST_CONNECTIONS, ReplicaRouter, is_fresh
+
+UNREACHABLE_URL = 'postgresql+asyncpg://postgres@/spimex_test?host=/nowhere'
+DAY = date(2025, 7, 18)
+MOMENT = datetime(2025, 7, 18, 12)
+
+
+# fmt: off
+@pytest.mark.parametrize('replica, primary, expected', [
+    ((DAY, MOMENT), (DAY, MOMENT), True),
+    ((DAY, MOMENT + timedelta(1)), (DAY, MOMENT), True),
+    ((DAY - timedelta(1), MOMENT), (DAY, MOMENT), False),
+    ((DAY, MOMENT - timedelta(1)), (DAY, MOMENT), False),
+    ((None, None), (DAY, MOMENT), False),
+    ((None, None), (None, None), True),
+])
+# fmt: on
+def test_is_fresh(replica, primary, expected):
+    assert is_fresh(replica, primary) is expected, (
+        f'Неверная оценка отставания {replica} от {primary}'
+    )
+
+
+@pytest.fixture
+async def router():
+    router = ReplicaRouter(
+        AsyncSessionLocal, [settings.database_url, settings.database_url]
+    )
+    yield router
+    await router.dispose()
+
+
+async def test_router_uses_primary_until_checked(router):
+    assert router.session_factory() is AsyncSessionLocal, (
+        'Непроверенная реплика получила запрос'
+    )
+
+
+async def test_router_round_robin(router):
+    async with AsyncSessionLocal() as session:
+        primary = await get_data_version(session)
+    await router.check(primary, get_data_version)
+    assert all(replica.healthy for replica in router.replicas), (
+        'Реплика без отставания помечена отстающей'
+    )
+    factories = [router.session_factory() for _ in range(4)]
+    expected = [replica.session_factory for replica in router.replicas] * 2
+    assert factories == expected, 'Реплики выбираются не по очереди'
+
+
+async def test_router_falls_back_to_primary_when_replica_lags(router):
+    async with AsyncSessionLocal() as session:
+        max_date, updated_on = await get_data_version(session)
+    await router.check(
+        (max_date + timedelta(days=1), updated_on), get_data_version
+    )
+    assert not any(replica.healthy for replica in router.replicas), (
+        'Отстающая реплика не исключена'
+    )
+    assert router.session_factory() is AsyncSessionLocal, (
+        'При отставании реплик запрос не ушёл на основную БД'
+    )
+
+
+async def test_router_skips_unreachable_replica():
+    router = ReplicaRouter(
+        AsyncSessionLocal, [UNREACHABLE_URL, settings.database_url]
+    )
+    try:
+        async with AsyncSessionLocal() as session:
+            primary = await get_data_version(session)
+        await router.check(primary, get_data_version)
+        unreachable, reachable = router.replicas
+        assert not unreachable.healthy, 'Недоступная реплика не исключена'
+        assert {router.session_factory() for _ in range(3)} == {
+            reachable.session_factory
+        }, 'Запрос ушёл на недоступную реплику'
+    finally:
+        await router.dispose()
+
+
+async def test_router_least_connections(router):
+    router.strategy = LEAST_CONNECTIONS
+    async with AsyncSessionLocal() as session:
+        primary = await get_data_version(session)
+    await router.check(primary, get_data_version)
+    busy, idle = router.replicas
+    async with busy.engine.connect():
+        assert router.session_factory() is idle.session_factory, (
+            'Выбрана реплика с большим числом соединений'
+        )
+
+
+async def test_get_replicas(client):
+    response = await client.get('/service/replicas')
+    assert response.status_code == HTTPStatus.OK, (
+        f'Статус {response.status_code} вместо 200'
+    )
+    assert response.json() == [], 'Реплики без REPLICA_URLS'
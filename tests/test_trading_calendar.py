@@ -0,0 +1,66 @@
+from datetime import date
+
+from sqlalchemy import delete
+
+from app.db import TradingResults
+from app.trading_calendar import TradingCalendar
+
+
+async def test_calendar_loads_last_dates(db_session):
+    calendar = TradingCalendar(size=2)
+    assert await calendar.last_dates(db_session, 10) == [
+        date(2025, 7, 18),
+        date(2025, 7, 17),
+    ], 'Календарь хранит больше дат, чем его размер'
+    assert await calendar.latest(db_session) == date(2025, 7, 18), (
+        'Неверная последняя дата торгов'
+    )
+
+
+async def test_calendar_picks_up_new_dates(db_session):
+    calendar = TradingCalendar(size=10)
+    await calendar.latest(db_session)
+    new_date = date(2025, 7, 19)
+    db_session.add(
+        TradingResults(
+            exchange_product_id='A106PDK001J',
+            exchange_product_name='Бензин АИ-100-К5, ПДК',
+            delivery_basis_name='Предкомбинатская-группа станций',
+            volume=100,
+            total=9000000,
+            count=2,
+            date=new_date,
+        )
+    )
+    await db_session.commit()
+    try:
+        assert await calendar.latest(db_session) == date(2025, 7, 18), (
+            'Календарь перечитан без смены версии данных'
+        )
+        assert await calendar.update(db_session, [new_date]) == [new_date], (
+            'Новая дата торгов не подхватилась'
+        )
+        assert await calendar.refresh(db_session) == [], (
+            'Повторное обновление вернуло уже известные даты'
+        )
+        assert calendar.dates[:2] == [new_date, date(2025, 7, 18)], (
+            'Новая дата не встала в начало календаря'
+        )
+    finally:
+        await db_session.execute(
+            delete(TradingResults).where(TradingResults.date == new_date)
+        )
+        await db_session.commit()
+
+
+async def test_calendar_reloads_on_old_dates(db_session, mocker):
+    calendar = TradingCalendar(size=10)
+    await calendar.latest(db_session)
+    calendar.dates.remove(date(2025, 7, 17))
+    execute = mocker.spy(db_session, 'execute')
+    await calendar.last_dates(db_session, 10)
+    execute.assert_not_called()
+    await calendar.update(db_session, [date(2025, 7, 17)])
+    assert date(2025, 7, 17) in calendar.dates, (
+        'Календарь не перезагружен после изменения старой даты'
+    )
@@ -0,0 +1,56 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi_cache import FastAPICache
+
+from app.api import SLUG_LAST_RESULTS, SLUG_TRADING_DATES
+from app.cache import cached_endpoints, redis_client, request_frequencies
+from app.schemas import PaginationQuery, TradingResultsQuery
+from app.warmup import warm_up_cache
+
+
+# fmt: off
+@pytest.mark.parametrize('namespace, kwargs', [
+    (SLUG_TRADING_DATES, {'days': 5}),
+    (SLUG_LAST_RESULTS, {'filters': TradingResultsQuery(oil_id='D410'), 'page': PaginationQuery()}),  # noqa: E501
+])
+# fmt: on
+async def test_kwargs_from_key(client, db_session, namespace, kwargs):
+    endpoint = cached_endpoints[namespace]
+    key = endpoint.key(kwargs)
+    restored = endpoint.kwargs_from_key(key, db_session)
+    assert restored['session'] is db_session, 'Не подставлена сессия'
+    assert endpoint.key(restored) == key, 'Ключ не восстанавливается'
+
+
+async def test_warm_up_cache_fills_popular_keys(client):
+    params = {'oil_id': 'D410', 'delivery_type_id': 'J'}
+    for _ in range(3):
+        await client.get('/api/last-results', params=params)
+    await client.get('/api/trading-dates', params={'days': 3})
+    await request_frequencies.flush()
+    for namespace in (SLUG_LAST_RESULTS, SLUG_TRADING_DATES):
+        await FastAPICache.clear(namespace=namespace)
+    assert await warm_up_cache() > 0, 'Ни один ключ не прогрет'
+    response = await client.get('/api/last-results', params=params)
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['X-FastAPI-Cache'] == 'HIT', (
+        'Популярный ключ не прогрет'
+    )
+    response = await client.get('/api/trading-dates', params={'days': 3})
+    assert response.headers['X-FastAPI-Cache'] == 'HIT', (
+        'Окно trading-dates не прогрето'
+    )
+
+
+async def test_decay_keeps_only_top_keys(client):
+    namespace = 'decay-test'
+    redis_key = request_frequencies.redis_key(namespace)
+    await redis_client.zadd(redis_key, {'a': 4, 'b': 3, 'c': 2, 'd': 1})
+    try:
+        await request_frequencies.decay(namespace, 0.5, keep=2)
+        assert await redis_client.zrevrange(
+            redis_key, 0, -1, withscores=True
+        ) == [(b'a', 2.0), (b'b', 1.5)], 'Редкие ключи не удалены'
+    finally:
+        await redis_client.delete(redis_key)